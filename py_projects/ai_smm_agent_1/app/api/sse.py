@@ -0,0 +1,13 @@
+from typing import Any
+import json
+
+from pydantic import BaseModel
+
+
+def format_sse_event(event: str, data: Any) -> str:
+    """Форматирование события Server-Sent Events"""
+    if isinstance(data, BaseModel):
+        payload = data.model_dump_json()
+    else:
+        payload = json.dumps(data, ensure_ascii=False, default=str)
+    return f"event: {event}\ndata: {payload}\n\n"
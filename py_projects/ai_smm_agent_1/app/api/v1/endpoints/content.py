@@ -1,12 +1,14 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 
 from app.core.database import get_db
+from app.api.sse import format_sse_event
 from app.models.content import ContentGenerationRequest, GeneratedContent, PostCreate
 from app.models.product import Product
-from app.services.content.generator import ContentGenerator
+from app.services.content.generator import ContentGenerator, get_content_generator
 from app.models.product import PlatformType
 
 router = APIRouter()
@@ -15,7 +17,8 @@ router = APIRouter()
 @router.post("/generate", response_model=GeneratedContent)
 async def generate_content(
     request: ContentGenerationRequest,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    generator: ContentGenerator = Depends(get_content_generator)
 ):
     """Генерация контента для продукта"""
     
@@ -31,18 +34,58 @@ async def generate_content(
         updated_at=datetime.now()
     )
     
-    generator = ContentGenerator()
     content = await generator.generate_content(product, request)
     
     return content
 
 
+@router.post("/generate/stream")
+async def generate_content_stream(
+    request: ContentGenerationRequest,
+    db: Session = Depends(get_db),
+    generator: ContentGenerator = Depends(get_content_generator)
+):
+    """Потоковая генерация постов (Server-Sent Events)
+
+    Каждый пост отправляется событием `post`, как только он дописан;
+    в конце приходит `done` (или `error` при сбое генерации).
+    """
+    
+    product = Product(
+        id=request.product_id,
+        name="Тестовый продукт",
+        description="Описание тестового продукта",
+        target_audience="Целевая аудитория",
+        platforms=request.platforms,
+        created_at=datetime.now(),
+        updated_at=datetime.now()
+    )
+    
+    async def event_stream():
+        sent = 0
+        try:
+            async for post in generator.stream_posts(product, request):
+                sent += 1
+                yield format_sse_event("post", post)
+        except Exception as e:
+            yield format_sse_event("error", {"detail": str(e)})
+            return
+        yield format_sse_event("done", {"count": sent})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.post("/generate/posts", response_model=List[PostCreate])
 async def generate_posts(
     product_id: int,
     count: int = 5,
     tone: str = "professional",
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    generator: ContentGenerator = Depends(get_content_generator)
 ):
     """Генерация только постов"""
     
@@ -57,7 +100,6 @@ async def generate_posts(
         updated_at=datetime.now()
     )
     
-    generator = ContentGenerator()
     posts = await generator.generate_posts(product, count, tone)
     
     return posts
@@ -67,7 +109,9 @@ async def generate_posts(
 async def generate_images(
     product_id: int,
     count: int = 3,
-    db: Session = Depends(get_db)
+    concurrency: Optional[int] = None,
+    db: Session = Depends(get_db),
+    generator: ContentGenerator = Depends(get_content_generator)
 ):
     """Генерация изображений для продукта"""
     
@@ -81,17 +125,21 @@ async def generate_images(
         updated_at=datetime.now()
     )
     
-    generator = ContentGenerator()
-    images = await generator.generate_images(product, count)
+    results = await generator.generate_images(product, count, concurrency)
     
-    return {"images": images}
+    return {
+        "images": [result.value for result in results if result.success],
+        "results": results
+    }
 
 
 @router.post("/generate/video-scripts")
 async def generate_video_scripts(
     product_id: int,
     count: int = 2,
-    db: Session = Depends(get_db)
+    concurrency: Optional[int] = None,
+    db: Session = Depends(get_db),
+    generator: ContentGenerator = Depends(get_content_generator)
 ):
     """Генерация видео-скриптов"""
     
@@ -105,21 +153,23 @@ async def generate_video_scripts(
         updated_at=datetime.now()
     )
     
-    generator = ContentGenerator()
-    scripts = await generator.generate_video_scripts(product, count)
+    results = await generator.generate_video_scripts(product, count, concurrency)
     
-    return {"video_scripts": scripts}
+    return {
+        "video_scripts": [result.value for result in results if result.success],
+        "results": results
+    }
 
 
 @router.post("/optimize")
 async def optimize_content_for_platform(
     post: PostCreate,
     platform: str,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    generator: ContentGenerator = Depends(get_content_generator)
 ):
     """Оптимизация контента под конкретную платформу"""
     
-    generator = ContentGenerator()
     optimized_post = await generator.optimize_content_for_platform(
         post, PlatformType(platform)
     )
@@ -130,22 +180,37 @@ async def optimize_content_for_platform(
 @router.post("/analyze")
 async def analyze_content_effectiveness(
     post: PostCreate,
-    db: Session = Depends(get_db)
+    use_llm: bool = False,
+    keywords: Optional[List[str]] = Query(None),
+    db: Session = Depends(get_db),
+    generator: ContentGenerator = Depends(get_content_generator)
 ):
-    """Анализ эффективности контента"""
+    """Анализ эффективности контента (use_llm=true — разбор с помощью LLM)"""
     
-    generator = ContentGenerator()
-    analysis = await generator.analyze_content_effectiveness(post)
+    analysis = await generator.analyze_content_effectiveness(post, use_llm, keywords)
     
     return analysis
 
 
+@router.post("/analyze/batch")
+async def analyze_posts(
+    posts: List[PostCreate],
+    keywords: Optional[List[str]] = Query(None),
+    generator: ContentGenerator = Depends(get_content_generator)
+):
+    """Локальная оценка пачки постов"""
+    
+    return {"results": generator.analyze_posts(posts, keywords)}
+
+
 @router.post("/calendar")
 async def generate_content_calendar(
     product_id: int,
     days: int = 30,
     posts_per_day: int = 1,
-    db: Session = Depends(get_db)
+    concurrency: Optional[int] = None,
+    db: Session = Depends(get_db),
+    generator: ContentGenerator = Depends(get_content_generator)
 ):
     """Генерация календаря контента"""
     
@@ -159,9 +224,8 @@ async def generate_content_calendar(
         updated_at=datetime.now()
     )
     
-    generator = ContentGenerator()
     calendar = await generator.generate_content_calendar(
-        product, days, posts_per_day
+        product, days, posts_per_day, concurrency
     )
     
     return {"calendar": calendar}
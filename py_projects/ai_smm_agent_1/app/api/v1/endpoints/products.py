@@ -5,7 +5,8 @@ from datetime import datetime
 
 from app.core.database import get_db
 from app.models.product import ProductCreate, Product, ProductUpdate
-from app.services.content.generator import ContentGenerator
+from app.services.content.generator import ContentGenerator, get_content_generator
+from app.services.content.memo import product_memo
 
 router = APIRouter()
 
@@ -79,6 +80,7 @@ async def delete_product(
     """Удаление продукта"""
     
     # Здесь должна быть логика удаления из БД
+    product_memo.invalidate(product_id)
     return {"message": "Продукт удален"}
 
 
@@ -87,7 +89,8 @@ async def create_content_plan(
     product_id: int,
     content_type: str = "post",
     post_count: int = 5,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    generator: ContentGenerator = Depends(get_content_generator)
 ):
     """Создание плана контента для продукта"""
     
@@ -103,7 +106,6 @@ async def create_content_plan(
         updated_at=datetime.now()
     )
     
-    generator = ContentGenerator()
     content_plan = await generator.create_content_plan(
         product=product,
         content_type=content_type,
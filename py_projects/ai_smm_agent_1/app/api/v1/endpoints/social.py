@@ -1,8 +1,10 @@
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List
 
 from app.core.database import get_db
+from app.api.sse import format_sse_event
 from app.models.content import PostCreate
 from app.models.product import PlatformType
 from app.services.social.manager import SocialMediaManager
@@ -24,6 +26,37 @@ async def publish_post(
     return results
 
 
+@router.post("/publish/stream")
+async def publish_post_stream(
+    post: PostCreate,
+    platforms: List[PlatformType],
+    db: Session = Depends(get_db)
+):
+    """Публикация поста с результатами по мере готовности (Server-Sent Events)
+
+    Результат каждой платформы отправляется событием `result`, как только
+    она завершилась; в конце приходит `done` с числом успешных и неудачных.
+    """
+    
+    manager = SocialMediaManager()
+    
+    async def event_stream():
+        succeeded = failed = 0
+        async for platform, result in manager.publish_post_stream(post, platforms):
+            if result["success"]:
+                succeeded += 1
+            else:
+                failed += 1
+            yield format_sse_event("result", {"platform": platform, **result})
+        yield format_sse_event("done", {"success": succeeded, "failed": failed})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.post("/schedule")
 async def schedule_posts(
     posts: List[PostCreate],
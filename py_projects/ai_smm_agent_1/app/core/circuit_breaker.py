@@ -0,0 +1,245 @@
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple, Type, TypeVar
+import functools
+import time
+
+from app.core.config import settings
+
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Зависимость недоступна: вызов отклонён без обращения к ней"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(
+            f"Сервис {name} временно недоступен, повторите через {retry_after:.0f} с"
+        )
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Автомат защиты внешней зависимости
+
+    В закрытом состоянии считает долю ошибок и медленных вызовов по
+    скользящему окну последних window вызовов. При превышении порогов
+    размыкается: вызовы сразу получают CircuitOpenError. Через
+    open_seconds пропускает пробные вызовы (half-open) и замыкается,
+    если они прошли успешно. Исключения из excluded_exceptions (например,
+    429, который обрабатывается повтором) не считаются ни успехом, ни ошибкой.
+    Медленным считается вызов дольше slow_call_seconds плюс ожидаемой
+    длительности, переданной в guard (например, времени генерации ответа).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float = 0.5,
+        slow_call_rate_threshold: float = 0.8,
+        slow_call_seconds: float = 30.0,
+        window: int = 20,
+        min_calls: int = 10,
+        open_seconds: float = 30.0,
+        half_open_max_calls: int = 1,
+        excluded_exceptions: Tuple[Type[BaseException], ...] = ()
+    ):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self.excluded_exceptions = excluded_exceptions
+
+        self.state = CLOSED
+        self._calls = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._half_open_in_flight = 0
+        self._half_open_successes = 0
+
+        self.rejected_calls = 0
+        self.times_opened = 0
+
+    @asynccontextmanager
+    async def guard(self, expected_seconds: float = 0.0) -> AsyncIterator[None]:
+        """Контекст одного вызова зависимости
+
+        expected_seconds — нормальная для этого вызова длительность сверх
+        slow_call_seconds: долгий, но ожидаемо долгий вызов медленным не считается.
+        """
+        probe = self._before_call()
+        started = time.monotonic()
+        try:
+            yield
+        except BaseException as e:
+            # Отмена вызывающим не говорит о состоянии зависимости
+            if isinstance(e, self.excluded_exceptions) or not isinstance(e, Exception):
+                if probe:
+                    self._half_open_in_flight -= 1
+            else:
+                self._on_result(False, time.monotonic() - started, probe, expected_seconds)
+            raise
+        else:
+            self._on_result(True, time.monotonic() - started, probe, expected_seconds)
+
+    async def call(self, func: Callable[..., Awaitable[T]], *args, **kwargs) -> T:
+        async with self.guard():
+            return await func(*args, **kwargs)
+
+    def _before_call(self) -> bool:
+        """Проверка перед вызовом; True, если это пробный вызов half-open"""
+        if self.state == OPEN:
+            retry_after = self._opened_at + self.open_seconds - time.monotonic()
+            if retry_after > 0:
+                self.rejected_calls += 1
+                raise CircuitOpenError(self.name, retry_after)
+            self.state = HALF_OPEN
+            self._half_open_in_flight = 0
+            self._half_open_successes = 0
+
+        if self.state == HALF_OPEN:
+            if self._half_open_in_flight >= self.half_open_max_calls:
+                self.rejected_calls += 1
+                raise CircuitOpenError(self.name, self.open_seconds)
+            self._half_open_in_flight += 1
+            return True
+        return False
+
+    def _on_result(self, success: bool, duration: float, probe: bool, expected_seconds: float = 0.0):
+        slow = duration >= self.slow_call_seconds + expected_seconds
+        if probe:
+            self._half_open_in_flight -= 1
+            if not success or slow:
+                self._open()
+                return
+            self._half_open_successes += 1
+            if self._half_open_successes >= self.half_open_max_calls:
+                self.state = CLOSED
+                self._calls.clear()
+            return
+
+        self._calls.append((success, slow, duration))
+        if self.state == CLOSED and len(self._calls) >= self.min_calls:
+            if (
+                self._failure_rate() >= self.failure_rate_threshold
+                or self._slow_call_rate() >= self.slow_call_rate_threshold
+            ):
+                self._open()
+
+    def _open(self):
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self.times_opened += 1
+
+    def _failure_rate(self) -> float:
+        if not self._calls:
+            return 0.0
+        return sum(1 for success, _, _ in self._calls if not success) / len(self._calls)
+
+    def _slow_call_rate(self) -> float:
+        if not self._calls:
+            return 0.0
+        return sum(1 for _, slow, _ in self._calls if slow) / len(self._calls)
+
+    def stats(self) -> Dict[str, Any]:
+        """Состояние и метрики окна"""
+        durations = [duration for _, _, duration in self._calls]
+        return {
+            "state": self.state,
+            "calls_in_window": len(self._calls),
+            "failure_rate": round(self._failure_rate(), 3),
+            "slow_call_rate": round(self._slow_call_rate(), 3),
+            "avg_latency_seconds": round(sum(durations) / len(durations), 3) if durations else None,
+            "rejected_calls": self.rejected_calls,
+            "times_opened": self.times_opened,
+            "retry_after_seconds": round(
+                max(0.0, self._opened_at + self.open_seconds - time.monotonic()), 3
+            ) if self.state == OPEN else 0.0
+        }
+
+
+# Автоматы общие на процесс: состояние зависимости не зависит от экземпляра сервиса
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_circuit_breaker(
+    name: str,
+    slow_call_seconds: Optional[float] = None,
+    excluded_exceptions: Tuple[Type[BaseException], ...] = ()
+) -> CircuitBreaker:
+    """Получение автомата зависимости name (создаётся с настройками CIRCUIT_BREAKER_*)
+
+    Автомат один на имя: запрос уже созданного автомата с другими
+    slow_call_seconds или excluded_exceptions — ошибка (ValueError), а не
+    молчаливая работа с настройками первого вызывающего.
+    """
+    slow_call_seconds = slow_call_seconds or settings.CIRCUIT_BREAKER_SLOW_CALL_SECONDS
+    breaker = _breakers.get(name)
+    if breaker is not None and (
+        breaker.slow_call_seconds != slow_call_seconds
+        or set(breaker.excluded_exceptions) != set(excluded_exceptions)
+    ):
+        raise ValueError(
+            f"Автомат {name} уже создан с другими настройками: "
+            f"slow_call_seconds={breaker.slow_call_seconds}, "
+            f"excluded_exceptions={breaker.excluded_exceptions}"
+        )
+    if breaker is None:
+        breaker = CircuitBreaker(
+            name,
+            failure_rate_threshold=settings.CIRCUIT_BREAKER_FAILURE_RATE,
+            slow_call_rate_threshold=settings.CIRCUIT_BREAKER_SLOW_CALL_RATE,
+            slow_call_seconds=slow_call_seconds,
+            window=settings.CIRCUIT_BREAKER_WINDOW,
+            min_calls=settings.CIRCUIT_BREAKER_MIN_CALLS,
+            open_seconds=settings.CIRCUIT_BREAKER_OPEN_SECONDS,
+            half_open_max_calls=settings.CIRCUIT_BREAKER_HALF_OPEN_MAX_CALLS,
+            excluded_exceptions=excluded_exceptions
+        )
+        _breakers[name] = breaker
+    return breaker
+
+
+@asynccontextmanager
+async def circuit_guard(
+    name: str,
+    slow_call_seconds: Optional[float] = None,
+    excluded_exceptions: Tuple[Type[BaseException], ...] = (),
+    expected_seconds: float = 0.0
+) -> AsyncIterator[None]:
+    """Контекст вызова зависимости name (без проверок, если автоматы отключены)"""
+    if not settings.CIRCUIT_BREAKER_ENABLED:
+        yield
+        return
+    async with get_circuit_breaker(name, slow_call_seconds, excluded_exceptions).guard(expected_seconds):
+        yield
+
+
+def circuit_breaker(
+    name: str,
+    slow_call_seconds: Optional[float] = None,
+    excluded_exceptions: Tuple[Type[BaseException], ...] = ()
+):
+    """Декоратор асинхронной функции: вызов через автомат зависимости name"""
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            async with circuit_guard(name, slow_call_seconds, excluded_exceptions):
+                return await func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def circuit_breakers_stats() -> Dict[str, Dict[str, Any]]:
+    """Состояние всех автоматов для /health"""
+    return {name: breaker.stats() for name, breaker in _breakers.items()}
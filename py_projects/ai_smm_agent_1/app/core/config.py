@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List, Optional
+from typing import Dict, List, Optional
 import os
 from dotenv import load_dotenv
 
@@ -23,7 +23,81 @@ class Settings(BaseSettings):
     OPENAI_MODEL: str = "gpt-4o-mini"
     OPENAI_MAX_TOKENS: int = 2000
     OPENAI_TEMPERATURE: float = 0.7
-    
+    OPENAI_BASE_URL: Optional[str] = os.getenv("OPENAI_BASE_URL")
+
+    # Пул соединений OpenAI
+    OPENAI_TIMEOUT_SECONDS: float = 60.0
+    # Худшая ожидаемая скорость генерации: постов в одном вызове не больше, чем
+    # дописывается за OPENAI_TIMEOUT_SECONDS при этой скорости (токенов в секунду)
+    OPENAI_MIN_OUTPUT_TOKENS_PER_SECOND: float = 50.0
+    OPENAI_MAX_CONNECTIONS: int = 100
+    OPENAI_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    OPENAI_KEEPALIVE_EXPIRY_SECONDS: float = 60.0
+
+    # Лимиты OpenAI (RPM/TPM)
+    OPENAI_RPM_LIMIT: int = 500
+    OPENAI_TPM_LIMIT: int = 200000
+    OPENAI_RATE_LIMIT_MAX_RETRIES: int = 5
+
+    # Кэш ответов LLM
+    OPENAI_CACHE_ENABLED: bool = True
+    OPENAI_CACHE_MAX_SIZE: int = 512
+    OPENAI_CACHE_TTL_SECONDS: float = 600.0
+
+    # Упаковка мелких запросов (хештеги, промпты изображений) разных продуктов в один
+    LLM_PACKING_ENABLED: bool = True
+    LLM_PACKING_MAX_WAIT_SECONDS: float = 0.025
+    LLM_PACKING_MAX_SIZE: int = 10
+
+    # Хеджирование коротких запросов к LLM: дубль, если ответ дольше перцентиля задержек
+    LLM_HEDGING_ENABLED: bool = True
+    LLM_HEDGING_PERCENTILE: float = 0.95
+    LLM_HEDGING_BUDGET_RATIO: float = 0.05
+    LLM_HEDGING_WINDOW: int = 200
+    LLM_HEDGING_MIN_SAMPLES: int = 20
+
+    # Структурированные ответы LLM: "json_schema" (strict-схема) или "json_object" (JSON-режим)
+    OPENAI_STRUCTURED_OUTPUT: str = "json_schema"
+    # Сколько раз догенерировать только те посты, что не прошли проверку
+    STRUCTURED_OUTPUT_MAX_REPAIR_ROUNDS: int = 2
+
+    # Batch API OpenAI: "openai" или "local" (файловая замена для работы без сети)
+    OPENAI_BATCH_CLIENT: str = os.getenv("OPENAI_BATCH_CLIENT", "openai")
+    OPENAI_BATCH_COMPLETION_WINDOW: str = "24h"
+    OPENAI_BATCH_POLL_INTERVAL_SECONDS: float = 60.0
+    OPENAI_BATCH_TIMEOUT_SECONDS: float = 86400.0
+    OPENAI_BATCH_LOCAL_DIR: str = "./batches"
+    OPENAI_BATCH_LOCAL_CONCURRENCY: int = 8
+
+    # Бэкенд LLM: "openai" или "simulated" (локальная имитация для нагрузочных тестов)
+    LLM_BACKEND: str = os.getenv("LLM_BACKEND", "openai")
+    SIMULATOR_LATENCY_DISTRIBUTION: str = "lognormal"
+    SIMULATOR_LATENCY_MEAN_SECONDS: float = 0.8
+    SIMULATOR_LATENCY_SIGMA: float = 0.5
+    SIMULATOR_TOKENS_PER_SECOND: float = 80.0
+    SIMULATOR_TOKENS_PER_SECOND_JITTER: float = 0.1
+    SIMULATOR_ERROR_RATE: float = 0.0
+    SIMULATOR_RATE_LIMIT_RATE: float = 0.0
+    # Доля постов в структурированном ответе, которые не пройдут проверку (слишком короткие)
+    SIMULATOR_MALFORMED_POST_RATE: float = 0.0
+    # С какой длины промпта (токенов) имитируется кэш префиксов провайдера
+    SIMULATOR_PREFIX_CACHE_MIN_TOKENS: int = 1024
+    SIMULATOR_SEED: Optional[int] = None
+
+    # Автоматы защиты внешних зависимостей (OpenAI, соцсети)
+    CIRCUIT_BREAKER_ENABLED: bool = True
+    CIRCUIT_BREAKER_FAILURE_RATE: float = 0.5
+    CIRCUIT_BREAKER_SLOW_CALL_RATE: float = 0.8
+    CIRCUIT_BREAKER_SLOW_CALL_SECONDS: float = 15.0
+    # Генерация изображений; для chat-модели — ожидание первого токена, к которому
+    # добавляется время генерации max_tokens при OPENAI_MIN_OUTPUT_TOKENS_PER_SECOND
+    CIRCUIT_BREAKER_LLM_SLOW_CALL_SECONDS: float = 60.0
+    CIRCUIT_BREAKER_LLM_FIRST_TOKEN_SECONDS: float = 15.0
+    CIRCUIT_BREAKER_WINDOW: int = 20
+    CIRCUIT_BREAKER_MIN_CALLS: int = 10
+    CIRCUIT_BREAKER_OPEN_SECONDS: float = 30.0
+    CIRCUIT_BREAKER_HALF_OPEN_MAX_CALLS: int = 1
+
     # DALL-E
     DALL_E_MODEL: str = "dall-e-3"
     DALL_E_SIZE: str = "1024x1024"
@@ -41,15 +115,66 @@ class Settings(BaseSettings):
     TWITTER_ACCESS_TOKEN: Optional[str] = os.getenv("TWITTER_ACCESS_TOKEN")
     TWITTER_ACCESS_TOKEN_SECRET: Optional[str] = os.getenv("TWITTER_ACCESS_TOKEN_SECRET")
     
+    TELEGRAM_API_URL: str = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
     TELEGRAM_BOT_TOKEN: Optional[str] = os.getenv("TELEGRAM_BOT_TOKEN")
     TELEGRAM_CHANNEL_ID: Optional[str] = os.getenv("TELEGRAM_CHANNEL_ID")
     TELEGRAM_CTA_SUFFIX: Optional[str] = os.getenv("TELEGRAM_CTA_SUFFIX")
+
+    # Лимиты Telegram Bot API: на бота в целом и на чат (каналы и группы)
+    TELEGRAM_MESSAGES_PER_SECOND: float = 30.0
+    TELEGRAM_BURST: int = 1
+    TELEGRAM_CHAT_MESSAGES_PER_MINUTE: float = 20.0
+    TELEGRAM_CHAT_BURST: int = 1
+    TELEGRAM_MAX_RETRIES: int = 3
+    TELEGRAM_RATE_LIMIT_MAX_RETRIES: int = 5
+
+    # file_id уже загруженных в Telegram изображений (повторная отправка без скачивания по URL)
+    TELEGRAM_FILE_CACHE_ENABLED: bool = True
+    TELEGRAM_FILE_CACHE_PATH: str = "./telegram_file_ids.json"
+    TELEGRAM_FILE_CACHE_MAX_SIZE: int = 10000
+
+    # Публикация в несколько платформ: таймаут каждой платформы и общий срок
+    PUBLISH_PLATFORM_TIMEOUT_SECONDS: float = 60.0
+    PUBLISH_PLATFORM_TIMEOUTS: Dict[str, float] = {}
+    PUBLISH_DEADLINE_SECONDS: float = 120.0
+
+    # Пул HTTP-соединений к API соцсетей (одна сессия на платформу)
+    SOCIAL_HTTP_MAX_CONNECTIONS: int = 100
+    SOCIAL_HTTP_MAX_CONNECTIONS_PER_HOST: int = 20
+    SOCIAL_HTTP_KEEPALIVE_SECONDS: float = 60.0
+    SOCIAL_HTTP_DNS_CACHE_SECONDS: int = 300
+    SOCIAL_HTTP_TIMEOUT_SECONDS: float = 60.0
     
     # Настройки контента
     DEFAULT_POST_LENGTH: int = 200
-    MAX_POST_LENGTH: int = 500
+    MAX_POST_LENGTH: int = 500  # в словах: верхняя граница объёма поста в промпте и бюджете токенов
     DEFAULT_HASHTAGS_COUNT: int = 5
     MAX_HASHTAGS_COUNT: int = 10
+
+    # Проверка постов после генерации: допуски по объёму из промпта, порог повторов
+    POST_MIN_WORDS_RATIO: float = 0.5
+    POST_MAX_WORDS_RATIO: float = 1.5
+    POST_DUPLICATE_SIMILARITY: float = 0.8
+    POST_REPAIR_ENABLED: bool = True
+
+    # Память хештегов и промптов изображений по отпечатку продукта (TTL None — без срока)
+    PRODUCT_MEMO_ENABLED: bool = True
+    PRODUCT_MEMO_MAX_SIZE: int = 1024
+    PRODUCT_MEMO_TTL_SECONDS: Optional[float] = None
+
+    # Таймауты этапов генерации контента
+    CONTENT_STAGE_TIMEOUT_SECONDS: float = 120.0
+    IMAGE_STAGE_TIMEOUT_SECONDS: float = 180.0
+
+    # Массовая генерация изображений и видео-скриптов
+    BULK_ASSET_CONCURRENCY: int = 4
+    BULK_MAX_TEXT_CHOICES: int = 4
+
+    # Календарь контента
+    CALENDAR_CONCURRENCY: int = 8
+    # Постов в одном вызове LLM: часть должна дописываться за OPENAI_TIMEOUT_SECONDS
+    CALENDAR_CHUNK_POSTS: int = 3
+    CALENDAR_MAX_TOPUP_ROUNDS: int = 3
     
     # Планировщик
     DEFAULT_POSTING_TIME: str = "10:00"
@@ -0,0 +1,45 @@
+import time
+
+
+class TokenBucket:
+    """Токен-бакет с резервированием
+
+    Вызывающий резервирует нужное количество токенов и получает задержку,
+    после которой резерв покрыт. Баланс может уходить в минус (долг), так
+    что очередность ожидающих сохраняется без блокировок.
+    """
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = float(capacity)
+        self.refill_per_second = float(refill_per_second)
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self.updated_at
+        self.updated_at = now
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_per_second)
+
+    def reserve(self, amount: float = 1.0) -> float:
+        """Резервирование токенов; возвращает задержку в секундах"""
+        self._refill()
+        self.tokens -= amount
+        if self.tokens >= 0 or self.refill_per_second <= 0:
+            return 0.0
+        return -self.tokens / self.refill_per_second
+
+    def refund(self, amount: float):
+        """Возврат неиспользованных токенов (или списание при отрицательном amount)"""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    def limit_to(self, available: float):
+        """Синхронизация с реальным остатком, сообщённым сервером"""
+        self._refill()
+        self.tokens = min(self.tokens, float(available))
+
+    @property
+    def available(self) -> float:
+        self._refill()
+        return self.tokens
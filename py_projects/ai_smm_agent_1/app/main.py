@@ -7,14 +7,30 @@ from contextlib import asynccontextmanager
 from app.core.config import settings
 from app.api.v1.api import api_router
 from app.core.database import init_db
+from app.core.circuit_breaker import circuit_breakers_stats
+from app.services.content.memo import product_memo
+from app.services.social.platforms import (
+    close_platform_sessions,
+    telegram_file_cache,
+    telegram_rate_limiter
+)
+from app.services.ai.openai_service import (
+    init_openai_client,
+    close_openai_client,
+    openai_service_stats
+)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     await init_db()
+    await init_openai_client()
     yield
     # Shutdown
+    await close_openai_client()
+    await close_platform_sessions()
+    await telegram_file_cache.flush()
 
 
 app = FastAPI(
@@ -48,7 +64,16 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    breakers = circuit_breakers_stats()
+    degraded = any(breaker["state"] != "closed" for breaker in breakers.values())
+    return {
+        "status": "degraded" if degraded else "healthy",
+        "circuit_breakers": breakers,
+        "llm": openai_service_stats(),
+        "product_memo": product_memo.stats(),
+        "telegram": telegram_rate_limiter.stats(),
+        "telegram_file_cache": telegram_file_cache.stats()
+    }
 
 
 @app.exception_handler(HTTPException)
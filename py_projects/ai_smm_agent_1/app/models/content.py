@@ -23,6 +23,7 @@ class PostBase(BaseModel):
     image_prompt: Optional[str] = Field(None, description="Промпт для генерации изображения")
     video_script: Optional[str] = Field(None, description="Скрипт для видео")
     image_url: Optional[str] = Field(None, description="URL изображения для публикации")
+    image_urls: List[str] = Field(default=[], description="URL изображений карусели (публикуются альбомом)")
 
 
 class PostCreate(PostBase):
@@ -53,11 +54,39 @@ class Post(PostBase):
         from_attributes = True
 
 
+class PostValidationReport(BaseModel):
+    checked: int = Field(default=0, description="Сколько постов проверено")
+    failed: int = Field(default=0, description="Сколько слотов не прошли проверку (включая недостающие)")
+    repaired: int = Field(default=0, description="Сколько слотов заменено догенерацией")
+    unrepaired: int = Field(default=0, description="Сколько слотов осталось без замены")
+    regeneration_requests: int = Field(default=0, description="Вызовов догенерации")
+    reasons: Dict[str, int] = Field(default={}, description="Отказы по причинам")
+
+
+class ContentVariant(BaseModel):
+    text: str = Field(..., description="Текст варианта (пост или промпт изображения)")
+    score: Optional[float] = Field(None, description="Локальная оценка 1-10 (None — не оценивался)")
+    scores: Dict[str, float] = Field(default={}, description="Оценки по метрикам")
+    recommendations: List[str] = Field(default=[], description="Рекомендации по улучшению")
+
+
 class GeneratedContent(BaseModel):
     posts: List[PostCreate]
     images: List[str] = Field(default=[], description="URLs сгенерированных изображений")
     video_scripts: List[str] = Field(default=[], description="Скрипты для видео")
     hashtags: List[str] = Field(default=[], description="Популярные хештеги")
+    validation: Optional[PostValidationReport] = Field(None, description="Отчёт проверки и починки постов")
+    variants: List[ContentVariant] = Field(default=[], description="Варианты поста для A/B, лучшие первыми")
+
+
+class AssetResult(BaseModel):
+    index: int = Field(..., description="Порядковый номер ассета")
+    value: Optional[str] = Field(None, description="URL изображения или текст скрипта")
+    error: Optional[str] = Field(None, description="Ошибка генерации этого элемента")
+
+    @property
+    def success(self) -> bool:
+        return self.error is None
 
 
 class ContentGenerationRequest(BaseModel):
@@ -68,3 +97,5 @@ class ContentGenerationRequest(BaseModel):
     tone: Optional[str] = Field("professional", description="Тон контента")
     include_images: bool = Field(default=True, description="Генерировать ли изображения")
     include_videos: bool = Field(default=False, description="Генерировать ли видео-скрипты")
+    variants: int = Field(default=1, ge=1, le=5, description="Сколько вариантов поста для A/B (1 — без вариантов)")
+    carousel_size: int = Field(default=4, ge=2, le=20, description="Сколько изображений в карусели (content_type=carousel)")
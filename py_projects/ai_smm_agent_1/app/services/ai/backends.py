@@ -0,0 +1,181 @@
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Dict, List, Mapping, Optional
+
+import openai
+
+
+class CompletionResult:
+    """Результат chat-запроса, независимый от конкретного провайдера"""
+
+    def __init__(
+        self,
+        texts: List[str],
+        usage: Optional[Dict[str, int]] = None,
+        headers: Optional[Mapping[str, str]] = None,
+        finish_reasons: Optional[List[Optional[str]]] = None
+    ):
+        self.texts = texts
+        self.usage = usage or {}
+        self.headers = headers or {}
+        self.finish_reasons = finish_reasons or [None] * len(texts)
+
+    @property
+    def total_tokens(self) -> Optional[int]:
+        return self.usage.get("total_tokens")
+
+
+class RateLimitedError(Exception):
+    """Провайдер ответил 429; заголовки нужны ограничителю для паузы"""
+
+    def __init__(self, message: str, headers: Optional[Mapping[str, str]] = None):
+        super().__init__(message)
+        self.headers = headers or {}
+
+
+class LLMBackend(ABC):
+    """Базовый класс бэкенда LLM, на котором работает OpenAIService"""
+
+    @abstractmethod
+    async def complete(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        temperature: float,
+        n: int = 1,
+        response_format: Optional[Dict[str, Any]] = None
+    ) -> CompletionResult:
+        """Обычный chat-запрос (n вариантов ответа)
+
+        response_format — параметр structured outputs (JSON-режим или схема).
+        """
+        pass
+
+    @abstractmethod
+    def stream(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        temperature: float,
+        response_format: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
+        """Потоковый chat-запрос: асинхронный генератор фрагментов текста"""
+        pass
+
+    @abstractmethod
+    async def generate_images(
+        self,
+        model: str,
+        prompt: str,
+        size: str,
+        quality: str,
+        n: int = 1
+    ) -> List[str]:
+        """Генерация изображений, возвращает URL"""
+        pass
+
+    async def close(self):
+        """Освобождение ресурсов бэкенда"""
+        pass
+
+
+def _response_format_kwargs(response_format: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Аргументы create() для response_format
+
+    openai 1.3 знает только {"type": "json_object"}; схему (json_schema)
+    передаём через extra_body, чтобы клиент отправил её как есть.
+    """
+    if response_format is None:
+        return {}
+    if response_format.get("type") == "json_object":
+        return {"response_format": response_format}
+    return {"extra_body": {"response_format": response_format}}
+
+
+class OpenAIBackend(LLMBackend):
+    """Бэкенд поверх openai.AsyncOpenAI"""
+
+    def __init__(self, client: openai.AsyncOpenAI):
+        self.client = client
+
+    async def complete(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        temperature: float,
+        n: int = 1,
+        response_format: Optional[Dict[str, Any]] = None
+    ) -> CompletionResult:
+        try:
+            raw_response = await self.client.chat.completions.with_raw_response.create(
+                model=model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                n=n,
+                **_response_format_kwargs(response_format)
+            )
+        except openai.RateLimitError as e:
+            raise RateLimitedError(str(e), e.response.headers)
+
+        response = raw_response.parse()
+        usage = response.usage.model_dump() if response.usage else None
+        return CompletionResult(
+            texts=[choice.message.content or "" for choice in response.choices],
+            usage=usage,
+            headers=raw_response.headers,
+            finish_reasons=[choice.finish_reason for choice in response.choices]
+        )
+
+    async def stream(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        temperature: float,
+        response_format: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
+        try:
+            stream = await self.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                stream=True,
+                **_response_format_kwargs(response_format)
+            )
+        except openai.RateLimitError as e:
+            raise RateLimitedError(str(e), e.response.headers)
+
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            # Закрываем соединение, если потребитель остановился раньше конца
+            await stream.response.aclose()
+
+    async def generate_images(
+        self,
+        model: str,
+        prompt: str,
+        size: str,
+        quality: str,
+        n: int = 1
+    ) -> List[str]:
+        try:
+            response = await self.client.images.generate(
+                model=model,
+                prompt=prompt,
+                size=size,
+                quality=quality,
+                n=n
+            )
+        except openai.RateLimitError as e:
+            raise RateLimitedError(str(e), e.response.headers)
+        return [image.url for image in response.data]
+
+    async def close(self):
+        await self.client.close()
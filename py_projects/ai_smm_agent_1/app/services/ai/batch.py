@@ -0,0 +1,347 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+import asyncio
+import json
+import os
+import time
+import uuid
+
+import openai
+import httpx
+
+from app.services.ai.backends import LLMBackend
+
+
+# Статусы пакета, после которых результат уже не изменится
+BATCH_FINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+
+
+class BatchRequest:
+    """Один chat-запрос внутри пакета; custom_id связывает его с ответом"""
+
+    def __init__(
+        self,
+        custom_id: str,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        n: int = 1,
+        response_format: Optional[Dict[str, Any]] = None
+    ):
+        self.custom_id = custom_id
+        self.messages = messages
+        self.max_tokens = max_tokens
+        self.n = n
+        self.response_format = response_format
+
+
+class BatchResult:
+    """Ответ на запрос пакета: тексты вариантов или ошибка"""
+
+    def __init__(
+        self,
+        custom_id: str,
+        texts: Optional[List[str]] = None,
+        usage: Optional[Dict[str, int]] = None,
+        error: Optional[str] = None
+    ):
+        self.custom_id = custom_id
+        self.texts = texts or []
+        self.usage = usage or {}
+        self.error = error
+
+    @property
+    def success(self) -> bool:
+        return self.error is None and bool(self.texts)
+
+
+class BatchJob:
+    """Состояние пакета на стороне провайдера"""
+
+    def __init__(
+        self,
+        id: str,
+        status: str,
+        output_file_id: Optional[str] = None,
+        error_file_id: Optional[str] = None,
+        request_counts: Optional[Dict[str, int]] = None
+    ):
+        self.id = id
+        self.status = status
+        self.output_file_id = output_file_id
+        self.error_file_id = error_file_id
+        self.request_counts = request_counts or {}
+
+    @property
+    def finished(self) -> bool:
+        return self.status in BATCH_FINAL_STATUSES
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "BatchJob":
+        return cls(
+            id=data["id"],
+            status=data["status"],
+            output_file_id=data.get("output_file_id"),
+            error_file_id=data.get("error_file_id"),
+            request_counts=data.get("request_counts")
+        )
+
+
+def build_batch_jsonl(requests: List[BatchRequest], model: str, temperature: float) -> str:
+    """Сериализация запросов во входной JSONL-файл Batch API"""
+    lines = []
+    for request in requests:
+        body = {
+            "model": model,
+            "messages": request.messages,
+            "max_tokens": request.max_tokens,
+            "temperature": temperature
+        }
+        if request.n > 1:
+            body["n"] = request.n
+        if request.response_format is not None:
+            body["response_format"] = request.response_format
+        lines.append(json.dumps({
+            "custom_id": request.custom_id,
+            "method": "POST",
+            "url": BATCH_ENDPOINT,
+            "body": body
+        }, ensure_ascii=False))
+    return "\n".join(lines) + "\n"
+
+
+def parse_batch_output(content: str) -> Dict[str, BatchResult]:
+    """Разбор выходного (или error) JSONL-файла пакета по custom_id"""
+    results = {}
+    for line in content.splitlines():
+        if not line.strip():
+            continue
+        item = json.loads(line)
+        custom_id = item.get("custom_id")
+        response = item.get("response") or {}
+        body = response.get("body") or {}
+
+        if item.get("error"):
+            error = item["error"].get("message") or str(item["error"])
+            results[custom_id] = BatchResult(custom_id, error=error)
+        elif response.get("status_code") != 200:
+            error = (body.get("error") or {}).get("message") or f"HTTP {response.get('status_code')}"
+            results[custom_id] = BatchResult(custom_id, error=error)
+        else:
+            texts = [
+                (choice.get("message") or {}).get("content") or ""
+                for choice in body.get("choices", [])
+            ]
+            results[custom_id] = BatchResult(custom_id, texts=texts, usage=body.get("usage"))
+    return results
+
+
+class BatchClient(ABC):
+    """Транспорт Batch API: загрузка входного файла, опрос статуса, выгрузка результата"""
+
+    @abstractmethod
+    async def submit(self, content: str, completion_window: str) -> BatchJob:
+        pass
+
+    @abstractmethod
+    async def retrieve(self, batch_id: str) -> BatchJob:
+        pass
+
+    @abstractmethod
+    async def download(self, file_id: str) -> str:
+        pass
+
+    @abstractmethod
+    async def cancel(self, batch_id: str):
+        pass
+
+
+class OpenAIBatchClient(BatchClient):
+    """Batch API OpenAI через /v1/files и /v1/batches
+
+    В используемой версии SDK нет ресурса batches, поэтому запросы к нему
+    идут через общие методы клиента post/get.
+    """
+
+    def __init__(self, client: openai.AsyncOpenAI):
+        self.client = client
+
+    async def submit(self, content: str, completion_window: str) -> BatchJob:
+        input_file = await self.client.files.create(
+            file=("batch.jsonl", content.encode("utf-8")),
+            purpose="batch"
+        )
+        response = await self.client.post(
+            "/batches",
+            cast_to=httpx.Response,
+            body={
+                "input_file_id": input_file.id,
+                "endpoint": BATCH_ENDPOINT,
+                "completion_window": completion_window
+            }
+        )
+        return BatchJob.from_dict(response.json())
+
+    async def retrieve(self, batch_id: str) -> BatchJob:
+        response = await self.client.get(f"/batches/{batch_id}", cast_to=httpx.Response)
+        return BatchJob.from_dict(response.json())
+
+    async def download(self, file_id: str) -> str:
+        content = await self.client.files.content(file_id)
+        return content.text
+
+    async def cancel(self, batch_id: str):
+        await self.client.post(f"/batches/{batch_id}/cancel", cast_to=httpx.Response)
+
+
+class LocalBatchClient(BatchClient):
+    """Локальная замена Batch API на файлах
+
+    Входной, выходной и error-файлы, а также статус пакета лежат в directory
+    в том же формате, что у OpenAI. Запросы пакета выполняются в фоне через
+    бэкенд LLM (например, SimulatedBackend), поэтому пакетный режим можно
+    проверить без сети.
+    """
+
+    def __init__(self, directory: str, backend: LLMBackend, concurrency: int = 8):
+        self.directory = directory
+        self.backend = backend
+        self.concurrency = max(1, concurrency)
+        self._tasks: Dict[str, asyncio.Task] = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _write_status(self, job: Dict[str, Any]):
+        path = self._path(f"{job['id']}.json")
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(job, f, ensure_ascii=False)
+        os.replace(path + ".tmp", path)
+
+    def _read_status(self, batch_id: str) -> Dict[str, Any]:
+        with open(self._path(f"{batch_id}.json"), encoding="utf-8") as f:
+            return json.load(f)
+
+    async def submit(self, content: str, completion_window: str) -> BatchJob:
+        batch_id = f"batch_{uuid.uuid4().hex}"
+        input_file_id = f"file-{batch_id}-input"
+        with open(self._path(f"{input_file_id}.jsonl"), "w", encoding="utf-8") as f:
+            f.write(content)
+
+        job = {
+            "id": batch_id,
+            "status": "validating",
+            "input_file_id": input_file_id,
+            "completion_window": completion_window,
+            "created_at": int(time.time())
+        }
+        self._write_status(job)
+        self._tasks[batch_id] = asyncio.create_task(self._process(job))
+        return BatchJob.from_dict(job)
+
+    async def retrieve(self, batch_id: str) -> BatchJob:
+        return BatchJob.from_dict(self._read_status(batch_id))
+
+    async def download(self, file_id: str) -> str:
+        with open(self._path(f"{file_id}.jsonl"), encoding="utf-8") as f:
+            return f.read()
+
+    async def cancel(self, batch_id: str):
+        task = self._tasks.pop(batch_id, None)
+        if task is not None:
+            task.cancel()
+        job = self._read_status(batch_id)
+        if job["status"] not in BATCH_FINAL_STATUSES:
+            job["status"] = "cancelled"
+            self._write_status(job)
+
+    async def _process(self, job: Dict[str, Any]):
+        """Фоновое выполнение пакета; сбой обработки завершает пакет статусом failed"""
+        try:
+            await self._run(job)
+        except Exception as e:
+            print(f"Ошибка обработки пакета {job['id']}: {e}")
+            job["status"] = "failed"
+            job["errors"] = {"data": [{"message": str(e)}]}
+            try:
+                self._write_status(job)
+            except OSError as write_error:
+                print(f"Ошибка записи статуса пакета {job['id']}: {write_error}")
+        finally:
+            self._tasks.pop(job["id"], None)
+
+    async def _run(self, job: Dict[str, Any]):
+        with open(self._path(f"{job['input_file_id']}.jsonl"), encoding="utf-8") as f:
+            lines = [json.loads(line) for line in f if line.strip()]
+
+        job["status"] = "in_progress"
+        job["request_counts"] = {"total": len(lines), "completed": 0, "failed": 0}
+        self._write_status(job)
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run_one(line: Dict[str, Any]) -> Dict[str, Any]:
+            body = line["body"]
+            async with semaphore:
+                try:
+                    result = await self.backend.complete(
+                        model=body["model"],
+                        messages=body["messages"],
+                        max_tokens=body["max_tokens"],
+                        temperature=body.get("temperature", 1.0),
+                        n=body.get("n", 1),
+                        response_format=body.get("response_format")
+                    )
+                except Exception as e:
+                    return {
+                        "id": f"batch_req_{uuid.uuid4().hex}",
+                        "custom_id": line["custom_id"],
+                        "response": {
+                            "status_code": 500,
+                            "body": {"error": {"message": str(e)}}
+                        },
+                        "error": None
+                    }
+            return {
+                "id": f"batch_req_{uuid.uuid4().hex}",
+                "custom_id": line["custom_id"],
+                "response": {
+                    "status_code": 200,
+                    "body": {
+                        "object": "chat.completion",
+                        "model": body["model"],
+                        "choices": [
+                            {
+                                "index": index,
+                                "message": {"role": "assistant", "content": text},
+                                "finish_reason": finish_reason
+                            }
+                            for index, (text, finish_reason)
+                            in enumerate(zip(result.texts, result.finish_reasons))
+                        ],
+                        "usage": result.usage
+                    }
+                },
+                "error": None
+            }
+
+        outputs = await asyncio.gather(*(run_one(line) for line in lines))
+        succeeded = [item for item in outputs if item["response"]["status_code"] == 200]
+        failed = [item for item in outputs if item["response"]["status_code"] != 200]
+
+        for suffix, items in (("output", succeeded), ("errors", failed)):
+            if items:
+                file_id = f"file-{job['id']}-{suffix}"
+                with open(self._path(f"{file_id}.jsonl"), "w", encoding="utf-8") as f:
+                    f.writelines(json.dumps(item, ensure_ascii=False) + "\n" for item in items)
+                job["output_file_id" if suffix == "output" else "error_file_id"] = file_id
+
+        job["status"] = "completed"
+        job["request_counts"] = {
+            "total": len(lines),
+            "completed": len(succeeded),
+            "failed": len(failed)
+        }
+        self._write_status(job)
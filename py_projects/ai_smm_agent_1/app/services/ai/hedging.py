@@ -0,0 +1,111 @@
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+import asyncio
+import time
+
+
+T = TypeVar("T")
+
+
+class LatencyHistogram:
+    """Скользящее окно последних задержек для оценки перцентилей"""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Перцентиль p (0..1) по окну; None, если замеров нет"""
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(p * len(ordered)))
+        return ordered[index]
+
+
+class RequestHedger:
+    """Хеджирование запросов: дубль, если ответ задерживается
+
+    Если вызов не завершился за перцентиль percentile от недавних задержек,
+    отправляется копия; побеждает первый успешный ответ, второй отменяется.
+    Доля дублей ограничена budget_ratio от числа вызовов.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 0.95,
+        budget_ratio: float = 0.05,
+        window: int = 200,
+        min_samples: int = 20
+    ):
+        self.percentile = percentile
+        self.budget_ratio = budget_ratio
+        self.min_samples = min_samples
+        self.latencies = LatencyHistogram(window)
+
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.skipped_by_budget = 0
+
+    def hedge_delay(self) -> Optional[float]:
+        """Через сколько секунд отправлять дубль (None — пока мало замеров)"""
+        if len(self.latencies) < self.min_samples:
+            return None
+        return self.latencies.percentile(self.percentile)
+
+    def _budget_allows(self) -> bool:
+        return self.hedges < self.budget_ratio * self.calls
+
+    async def run(self, factory: Callable[[], Awaitable[T]]) -> T:
+        """Выполнение factory() с возможным дублем"""
+        self.calls += 1
+        delay = self.hedge_delay()
+        started = time.monotonic()
+        primary = asyncio.ensure_future(factory())
+        attempts = {primary: started}
+
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait({primary}, timeout=delay)
+                if not done:
+                    if self._budget_allows():
+                        self.hedges += 1
+                        attempts[asyncio.ensure_future(factory())] = time.monotonic()
+                    else:
+                        self.skipped_by_budget += 1
+
+            pending = set(attempts)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for attempt in done:
+                    if attempt.exception() is not None:
+                        error = attempt.exception()
+                        continue
+                    self.latencies.record(time.monotonic() - attempts[attempt])
+                    if attempt is not primary:
+                        self.hedge_wins += 1
+                    return attempt.result()
+            raise error
+        finally:
+            # Проигравшая попытка (или обе при отмене вызывающего) отменяется
+            for attempt in attempts:
+                if not attempt.done():
+                    attempt.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        """Метрики хеджирования"""
+        delay = self.hedge_delay()
+        return {
+            "calls": self.calls,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "skipped_by_budget": self.skipped_by_budget,
+            "hedge_delay_seconds": round(delay, 3) if delay is not None else None
+        }
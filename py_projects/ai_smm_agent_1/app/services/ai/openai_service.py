@@ -1,194 +1,1183 @@
 import openai
-from typing import List, Dict, Any, Optional
+import httpx
+from typing import List, Dict, Any, Optional, AsyncIterator, Tuple, Type
 import asyncio
 import aiohttp
-import json
 
 from app.core.config import settings
+from app.core.circuit_breaker import circuit_guard
+from app.services.ai.backends import CompletionResult, LLMBackend, OpenAIBackend, RateLimitedError
+from app.services.ai.batch import (
+    BatchClient, BatchRequest, BatchResult, LocalBatchClient, OpenAIBatchClient,
+    build_batch_jsonl, parse_batch_output
+)
+from app.services.ai.cache import ResponseCache
+from app.services.ai.hedging import RequestHedger
+from app.services.ai.packer import PackedTask, RequestPacker
+from app.services.ai.prompts import (
+    PREFIX_CACHE_MIN_TOKENS, PromptCacheStats, prompt_registry, product_fields
+)
+from app.services.ai.rate_limiter import LLMRateLimiter
+from app.services.ai.singleflight import SingleFlight
+from app.services.ai.structured import (
+    M, AnalysisOutput, HashtagsOutput, ImagePromptOutput, JSONArrayStream, PostsOutput,
+    StructuredOutputError, VideoScriptOutput, parse_structured, response_format
+)
+from app.services.ai import tokens
+from app.services.content.scoring import ContentScorer
+from app.services.content.validation import PostConstraints, PostValidator
+from app.models.content import PostValidationReport
+
+
+# Схема ответа упакованных задач каждого вида (одиночный вызов и элемент пакета)
+PACKED_OUTPUT_MODELS = {
+    "hashtags": HashtagsOutput,
+    "image_prompt": ImagePromptOutput
+}
+
+# Максимальный n за один запрос к images.generate (dall-e-3 поддерживает только 1)
+IMAGE_MODEL_MAX_N = {
+    "dall-e-2": 10,
+    "dall-e-3": 1
+}
+
+SYSTEM_PROMPT = "Ты опытный SMM-специалист и копирайтер. Создавай качественный контент для социальных сетей."
+
+# Кэш общий для всех экземпляров сервиса
+response_cache = ResponseCache(
+    max_size=settings.OPENAI_CACHE_MAX_SIZE,
+    default_ttl=settings.OPENAI_CACHE_TTL_SECONDS
+)
+
+# Лимиты RPM/TPM относятся к ключу API, поэтому ограничитель тоже общий
+rate_limiter = LLMRateLimiter(
+    requests_per_minute=settings.OPENAI_RPM_LIMIT,
+    tokens_per_minute=settings.OPENAI_TPM_LIMIT
+)
+
+singleflight = SingleFlight()
+
+# Доля промптов, попавших в кэш префиксов провайдера, по видам запросов
+prompt_cache_stats = PromptCacheStats()
+
+# Общий клиент, бэкенд и сервис на весь процесс
+_client: Optional[openai.AsyncOpenAI] = None
+_backend: Optional[LLMBackend] = None
+_batch_client: Optional[BatchClient] = None
+_service: Optional["OpenAIService"] = None
+
+
+def create_openai_client(base_url: Optional[str] = None) -> openai.AsyncOpenAI:
+    """Создание клиента OpenAI с пулом keep-alive соединений"""
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=settings.OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.OPENAI_KEEPALIVE_EXPIRY_SECONDS
+        ),
+        timeout=httpx.Timeout(settings.OPENAI_TIMEOUT_SECONDS, connect=10.0)
+    )
+    return openai.AsyncOpenAI(
+        api_key=settings.OPENAI_API_KEY,
+        base_url=base_url or settings.OPENAI_BASE_URL,
+        http_client=http_client
+    )
+
+
+def get_openai_client() -> openai.AsyncOpenAI:
+    """Получение общего клиента OpenAI (создаётся при первом обращении)"""
+    global _client
+    if _client is None or _client.is_closed():
+        _client = create_openai_client()
+    return _client
+
+
+def create_llm_backend() -> LLMBackend:
+    """Создание бэкенда LLM по настройке LLM_BACKEND"""
+    if settings.LLM_BACKEND == "simulated":
+        from app.services.ai.simulator import SimulatedBackend
+        return SimulatedBackend.from_settings()
+    if settings.LLM_BACKEND == "openai":
+        return OpenAIBackend(get_openai_client())
+    raise ValueError(f"Неизвестный LLM_BACKEND: {settings.LLM_BACKEND}")
+
+
+def get_llm_backend() -> LLMBackend:
+    """Получение общего бэкенда LLM (создаётся при первом обращении)"""
+    global _backend
+    if _backend is None or (_client is not None and _client.is_closed()):
+        _backend = create_llm_backend()
+    return _backend
+
+
+def get_batch_client() -> BatchClient:
+    """Получение клиента Batch API по настройке OPENAI_BATCH_CLIENT"""
+    global _batch_client
+    if settings.OPENAI_BATCH_CLIENT == "local":
+        if _batch_client is None or _batch_client.backend is not get_llm_backend():
+            _batch_client = LocalBatchClient(
+                settings.OPENAI_BATCH_LOCAL_DIR,
+                get_llm_backend(),
+                settings.OPENAI_BATCH_LOCAL_CONCURRENCY
+            )
+        return _batch_client
+    if settings.OPENAI_BATCH_CLIENT == "openai":
+        client = get_openai_client()
+        if _batch_client is None or _batch_client.client is not client:
+            _batch_client = OpenAIBatchClient(client)
+        return _batch_client
+    raise ValueError(f"Неизвестный OPENAI_BATCH_CLIENT: {settings.OPENAI_BATCH_CLIENT}")
+
+
+async def init_openai_client():
+    """Инициализация общего клиента при старте приложения"""
+    get_llm_backend()
+    # Токенизатор загружается один раз при старте, а не на первом запросе
+    tokens.count_tokens("", settings.OPENAI_MODEL)
+
+
+async def close_openai_client():
+    """Закрытие общего клиента при остановке приложения"""
+    global _client, _backend, _batch_client, _service
+    if _backend is not None:
+        await _backend.close()
+    if _client is not None:
+        await _client.close()
+    _client = None
+    _backend = None
+    _batch_client = None
+    _service = None
+
+
+def get_openai_service() -> "OpenAIService":
+    """Зависимость FastAPI: общий экземпляр OpenAIService"""
+    global _service
+    backend = get_llm_backend()
+    if _service is None or _service.backend is not backend:
+        _service = OpenAIService(backend=backend)
+    return _service
+
+
+def openai_service_stats() -> Optional[Dict[str, Any]]:
+    """Статистика общего OpenAIService для /health
+
+    Сервис не создаётся: None, если к LLM ещё не обращались.
+    """
+    return _service.get_stats() if _service is not None else None
 
 
 class OpenAIService:
-    def __init__(self):
-        self.client = openai.AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+    def __init__(
+        self,
+        client: Optional[openai.AsyncOpenAI] = None,
+        backend: Optional[LLMBackend] = None
+    ):
+        if backend is None:
+            backend = OpenAIBackend(client) if client is not None else get_llm_backend()
+        self.backend = backend
         self.model = settings.OPENAI_MODEL
         self.max_tokens = settings.OPENAI_MAX_TOKENS
         self.temperature = settings.OPENAI_TEMPERATURE
+        self.cache = response_cache
+        self.rate_limiter = rate_limiter
+        self.singleflight = singleflight
+        self.prompts = prompt_registry
+        self.prompt_cache_stats = prompt_cache_stats
+        self.hedgers = {
+            "hashtags": self._create_hedger(),
+            "image_prompt": self._create_hedger()
+        }
+        self.packers = {
+            "hashtags": self._create_packer("hashtags", self._build_hashtags_pack_prompt),
+            "image_prompt": self._create_packer("image_prompt", self._build_image_prompt_pack_prompt)
+        }
+        self.structured_stats = {
+            "responses": 0,
+            "invalid_responses": 0,
+            "truncated_responses": 0,
+            "posts_accepted": 0,
+            "posts_rejected": 0,
+            "post_repair_requests": 0
+        }
+
+    async def generate_text(
+        self,
+        prompt: str,
+        max_tokens: Optional[int] = None,
+        system_prompt: str = SYSTEM_PROMPT,
+        use_cache: bool = True,
+        cache_ttl: Optional[float] = None
+    ) -> str:
+        """Генерация текста с помощью GPT
+
+        use_cache=False отключает кэш и объединение одинаковых запросов для
+        вызовов, которым нужен новый вариант ответа на тот же промпт;
+        cache_ttl переопределяет TTL записи.
+        """
+        max_tokens = max_tokens or self.max_tokens
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt}
+        ]
+
+        if not use_cache:
+            return await self._complete_text(messages, max_tokens)
+
+        cache_key = ResponseCache.make_key(
+            self.model, self.temperature, max_tokens, system_prompt, prompt
+        )
+        if settings.OPENAI_CACHE_ENABLED:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        async def fetch() -> str:
+            text = await self._complete_text(messages, max_tokens)
+            if settings.OPENAI_CACHE_ENABLED:
+                self.cache.set(cache_key, text, ttl=cache_ttl)
+            return text
+
+        # Одинаковые запросы, выполняющиеся одновременно, ждут один ответ
+        return await self.singleflight.do(cache_key, fetch)
 
-    async def generate_text(self, prompt: str, max_tokens: Optional[int] = None) -> str:
-        """Генерация текста с помощью GPT"""
+    async def _complete_text(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        output_format: Optional[Dict[str, Any]] = None,
+        prompt_kind: str = "text"
+    ) -> str:
+        """Один ответ модели; структурированный ответ, оборванный по max_tokens, —
+        StructuredOutputError (его повторяет _fetch_structured)"""
         try:
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "Ты опытный SMM-специалист и копирайтер. Создавай качественный контент для социальных сетей."},
-                    {"role": "user", "content": prompt}
-                ],
+            result = await self._create_completion(
+                messages=messages,
+                max_tokens=max_tokens,
+                output_format=output_format,
+                prompt_kind=prompt_kind
+            )
+        except Exception as e:
+            raise Exception(f"Ошибка генерации текста: {str(e)}")
+        if output_format is not None and result.finish_reasons[0] == "length":
+            self.structured_stats["truncated_responses"] += 1
+            raise StructuredOutputError(f"ответ обрезан по max_tokens={max_tokens}")
+        return result.texts[0].strip()
+
+    async def generate_text_choices(
+        self,
+        prompt: str,
+        n: int,
+        max_tokens: Optional[int] = None,
+        system_prompt: str = SYSTEM_PROMPT,
+        output_format: Optional[Dict[str, Any]] = None,
+        prompt_kind: str = "text"
+    ) -> List[str]:
+        """Генерация n вариантов ответа за один запрос (параметр n)
+
+        Структурированные варианты, оборванные по max_tokens (finish_reason
+        "length"), отбрасываются.
+        """
+        try:
+            result = await self._create_completion(
+                messages=self._messages(prompt, system_prompt),
                 max_tokens=max_tokens or self.max_tokens,
-                temperature=self.temperature
+                n=n,
+                output_format=output_format,
+                prompt_kind=prompt_kind
             )
-            return response.choices[0].message.content.strip()
         except Exception as e:
             raise Exception(f"Ошибка генерации текста: {str(e)}")
+        texts = []
+        for text, finish_reason in zip(result.texts, result.finish_reasons):
+            if output_format is not None and finish_reason == "length":
+                self.structured_stats["truncated_responses"] += 1
+            elif text.strip():
+                texts.append(text.strip())
+        return texts
+
+    async def generate_structured(
+        self,
+        prompt: str,
+        output_model: Type[M],
+        max_tokens: Optional[int] = None,
+        use_cache: bool = True,
+        system_prompt: str = SYSTEM_PROMPT,
+        prompt_kind: str = "text"
+    ) -> M:
+        """Генерация ответа по JSON-схеме output_model
+
+        Ответ разбирается и проверяется схемой до записи в кэш: невалидный
+        ответ не кэшируется и запрашивается заново, но не больше
+        STRUCTURED_OUTPUT_MAX_REPAIR_ROUNDS раз. prompt_kind — вид промпта
+        в статистике кэша префиксов.
+        """
+        max_tokens = max_tokens or self.max_tokens
+        messages = self._messages(prompt, system_prompt)
+        output_format = response_format(output_model)
+        cache_key = (
+            self._structured_cache_key(prompt, output_model, max_tokens, system_prompt)
+            if use_cache else None
+        )
+
+        async def fetch() -> M:
+            return await self._fetch_structured(
+                lambda: self._complete_text(messages, max_tokens, output_format, prompt_kind),
+                output_model,
+                cache_key
+            )
+
+        if cache_key is None:
+            return await fetch()
+
+        if settings.OPENAI_CACHE_ENABLED:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return parse_structured(cached, output_model)
+
+        return await self.singleflight.do(cache_key, fetch)
+
+    def _structured_cache_key(
+        self,
+        prompt: str,
+        output_model: Type[M],
+        max_tokens: int,
+        system_prompt: str = SYSTEM_PROMPT
+    ) -> str:
+        return ResponseCache.make_key(
+            self.model, self.temperature, max_tokens, system_prompt, prompt,
+            output_model.__name__, settings.OPENAI_STRUCTURED_OUTPUT
+        )
+
+    async def _fetch_structured(
+        self,
+        complete,
+        output_model: Type[M],
+        cache_key: Optional[str],
+        retry=None
+    ) -> M:
+        """Запрос, разбор по схеме и повтор при невалидном ответе
+
+        retry — вызов для повторных попыток, если он отличается от первой
+        (например, первая попытка идёт в пакете, а повтор — одиночным запросом).
+        """
+        for attempt in range(settings.STRUCTURED_OUTPUT_MAX_REPAIR_ROUNDS + 1):
+            try:
+                text = await (complete() if attempt == 0 or retry is None else retry())
+            except StructuredOutputError:
+                # Ответ оборван по max_tokens: невалиден, как и неразобранный
+                text = ""
+            self.structured_stats["responses"] += 1
+            try:
+                result = parse_structured(text, output_model)
+            except StructuredOutputError:
+                self.structured_stats["invalid_responses"] += 1
+                if attempt == settings.STRUCTURED_OUTPUT_MAX_REPAIR_ROUNDS:
+                    raise
+                continue
+            if cache_key is not None and settings.OPENAI_CACHE_ENABLED:
+                self.cache.set(cache_key, text)
+            return result
+
+    async def _create_completion(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        n: int = 1,
+        output_format: Optional[Dict[str, Any]] = None,
+        prompt_kind: str = "text"
+    ) -> CompletionResult:
+        """Вызов chat-модели через бэкенд с учётом RPM/TPM лимитов
+
+        При 429 запрос откладывается до сброса квоты и повторяется.
+        Закэшированная провайдером часть промпта учитывается по prompt_kind.
+        """
+        estimated_tokens = self._check_token_budget(messages, max_tokens, n)
+
+        for attempt in range(settings.OPENAI_RATE_LIMIT_MAX_RETRIES + 1):
+            await self.rate_limiter.acquire(estimated_tokens)
+            result = None
+            try:
+                async with self._llm_guard(max_tokens):
+                    result = await self.backend.complete(
+                        model=self.model,
+                        messages=messages,
+                        max_tokens=max_tokens,
+                        temperature=self.temperature,
+                        n=n,
+                        response_format=output_format
+                    )
+            except RateLimitedError as e:
+                self.rate_limiter.on_rate_limited(e.headers)
+                if attempt == settings.OPENAI_RATE_LIMIT_MAX_RETRIES:
+                    raise
+                continue
+            finally:
+                # Резерв попытки, которая не дала ответа, возвращается целиком,
+                # иначе каждая ошибка и каждый повтор съедали бы оценку из TPM
+                self.rate_limiter.reconcile(
+                    estimated_tokens, result.total_tokens if result is not None else 0
+                )
+
+            self.rate_limiter.update_from_headers(result.headers)
+            self.prompt_cache_stats.record(prompt_kind, result.usage)
+            return result
+
+    def _llm_guard(self, max_tokens: int = 0):
+        """Автомат защиты вызовов chat-модели
+
+        Стоит вокруг самого обращения к бэкенду: ожидание в ограничителе и
+        попадания в кэш не влияют на статистику, 429 обрабатывается повтором
+        и ошибкой зависимости не считается. Медленный вызов — дольше
+        CIRCUIT_BREAKER_LLM_FIRST_TOKEN_SECONDS плюс генерации max_tokens
+        при OPENAI_MIN_OUTPUT_TOKENS_PER_SECOND: длинный ответ здорового
+        провайдера автомат не размыкает.
+        """
+        return circuit_guard(
+            "openai",
+            settings.CIRCUIT_BREAKER_LLM_FIRST_TOKEN_SECONDS,
+            excluded_exceptions=(RateLimitedError,),
+            expected_seconds=max_tokens / settings.OPENAI_MIN_OUTPUT_TOKENS_PER_SECOND
+        )
+
+    def _check_token_budget(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        n: int = 1
+    ) -> int:
+        """Проверка лимитов модели до отправки; возвращает оценку расхода токенов"""
+        prompt_tokens = tokens.count_message_tokens(messages, self.model)
+        tokens.check_budget(prompt_tokens, max_tokens, self.model)
+        return prompt_tokens + max_tokens * n
+
+    def posts_batch_request(
+        self,
+        custom_id: str,
+        product_info: Dict[str, Any],
+        count: int,
+        tone: str = "professional",
+        series_part: Optional[Tuple[int, int]] = None,
+        constraints: Optional[PostConstraints] = None
+    ) -> BatchRequest:
+        """Запрос постов для пакета; ответ разбирается через parse_posts с теми же constraints"""
+        return BatchRequest(
+            custom_id,
+            messages=self._messages(
+                self._build_posts_prompt(product_info, count, tone, series_part, constraints)
+            ),
+            max_tokens=self._posts_max_tokens(count, constraints),
+            response_format=response_format(PostsOutput)
+        )
+
+    def hashtags_batch_request(
+        self,
+        custom_id: str,
+        product_info: Dict[str, Any],
+        count: int = 5
+    ) -> BatchRequest:
+        """Запрос хештегов для пакета; ответ разбирается через parse_hashtags"""
+        return BatchRequest(
+            custom_id,
+            messages=self._messages(self._build_hashtags_prompt(product_info, count)),
+            max_tokens=self._hashtags_max_tokens(count),
+            response_format=response_format(HashtagsOutput)
+        )
+
+    async def run_batch(
+        self,
+        requests: List[BatchRequest],
+        poll_interval: Optional[float] = None,
+        timeout: Optional[float] = None
+    ) -> Dict[str, BatchResult]:
+        """Выполнение запросов через Batch API
+
+        Запросы сериализуются в JSONL, пакет отправляется и опрашивается до
+        завершения; результат возвращается по custom_id. Пакет не проходит
+        через интерактивный ограничитель RPM/TPM — у Batch API свои квоты.
+        Запросы без ответа получают BatchResult с ошибкой.
+        """
+        if not requests:
+            return {}
+        poll_interval = poll_interval or settings.OPENAI_BATCH_POLL_INTERVAL_SECONDS
+        timeout = timeout or settings.OPENAI_BATCH_TIMEOUT_SECONDS
+
+        for request in requests:
+            self._check_token_budget(request.messages, request.max_tokens, request.n)
+
+        batch_client = get_batch_client()
+        try:
+            job = await batch_client.submit(
+                build_batch_jsonl(requests, self.model, self.temperature),
+                settings.OPENAI_BATCH_COMPLETION_WINDOW
+            )
+            deadline = asyncio.get_running_loop().time() + timeout
+            while not job.finished:
+                if asyncio.get_running_loop().time() >= deadline:
+                    await batch_client.cancel(job.id)
+                    raise Exception(f"пакет {job.id} не завершился за {timeout:.0f} с")
+                await asyncio.sleep(poll_interval)
+                job = await batch_client.retrieve(job.id)
+
+            results: Dict[str, BatchResult] = {}
+            for file_id in (job.output_file_id, job.error_file_id):
+                if file_id:
+                    results.update(parse_batch_output(await batch_client.download(file_id)))
+        except Exception as e:
+            raise Exception(f"Ошибка пакетной генерации: {str(e)}")
+
+        for result in results.values():
+            if result.error is None:
+                self.prompt_cache_stats.record("batch", result.usage)
+
+        for request in requests:
+            if request.custom_id not in results:
+                results[request.custom_id] = BatchResult(
+                    request.custom_id, error=f"Нет ответа, статус пакета: {job.status}"
+                )
+        return results
+
+    def _messages(self, prompt: str, system_prompt: str = SYSTEM_PROMPT) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt}
+        ]
+
+    def _create_hedger(self) -> RequestHedger:
+        return RequestHedger(
+            percentile=settings.LLM_HEDGING_PERCENTILE,
+            budget_ratio=settings.LLM_HEDGING_BUDGET_RATIO,
+            window=settings.LLM_HEDGING_WINDOW,
+            min_samples=settings.LLM_HEDGING_MIN_SAMPLES
+        )
+
+    def _create_packer(self, kind: str, build_prompt) -> RequestPacker:
+        # Ключи пакета — номера задач, поэтому схему не навязываем: JSON-режим,
+        # а ответ на каждую задачу проверяется схемой вида при разборе.
+        # Пакеты не хеджируются: дубль дорогого ответа на несколько задач не
+        # окупается, а их задержки исказили бы перцентиль одиночных запросов
+        return RequestPacker(
+            build_prompt=build_prompt,
+            run_pack=lambda prompt, max_tokens: self._complete_text(
+                self._messages(prompt), max_tokens, response_format(), f"{kind}_pack"
+            ),
+            run_single=lambda task: self._hedged_complete(
+                kind, self._messages(task.prompt), task.max_tokens,
+                response_format(PACKED_OUTPUT_MODELS[kind])
+            ),
+            max_wait=settings.LLM_PACKING_MAX_WAIT_SECONDS,
+            max_size=settings.LLM_PACKING_MAX_SIZE,
+            max_tokens=self.max_tokens
+        )
+
+    async def _hedged_complete(
+        self,
+        kind: str,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        output_format: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """Короткий запрос с хеджированием по задержкам задач вида kind"""
+        if not settings.LLM_HEDGING_ENABLED:
+            return await self._complete_text(messages, max_tokens, output_format, kind)
+        return await self.hedgers[kind].run(
+            lambda: self._complete_text(messages, max_tokens, output_format, kind)
+        )
+
+    async def generate_packed(
+        self,
+        kind: str,
+        prompt: str,
+        details: str,
+        max_tokens: int
+    ) -> Any:
+        """Генерация ответа на мелкую задачу вида kind по схеме PACKED_OUTPUT_MODELS
+
+        Одновременные задачи того же вида от разных продуктов уходят одним
+        запросом, медленные одиночные запросы хеджируются. Кэш и объединение одинаковых
+        запросов работают так же, как в generate_structured, с тем же ключом,
+        что и у одиночного вызова. Невалидный ответ повторяется одиночным
+        запросом.
+        """
+        output_model = PACKED_OUTPUT_MODELS[kind]
+        cache_key = self._structured_cache_key(prompt, output_model, max_tokens)
+        if settings.OPENAI_CACHE_ENABLED:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return parse_structured(cached, output_model)
+
+        def single() -> Any:
+            return self._hedged_complete(
+                kind, self._messages(prompt), max_tokens, response_format(output_model)
+            )
+
+        def first() -> Any:
+            if settings.LLM_PACKING_ENABLED:
+                return self.packers[kind].submit(PackedTask(prompt, details, max_tokens))
+            return single()
+
+        return await self.singleflight.do(
+            cache_key, lambda: self._fetch_structured(first, output_model, cache_key, retry=single)
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика работы сервиса"""
+        return {
+            "cache": self.cache.stats(),
+            "rate_limiter": self.rate_limiter.stats(),
+            "singleflight": self.singleflight.stats(),
+            "packers": {kind: packer.stats() for kind, packer in self.packers.items()},
+            "hedgers": {kind: hedger.stats() for kind, hedger in self.hedgers.items()},
+            "structured": dict(self.structured_stats),
+            "prompt_cache": self.prompt_cache_stats.stats(),
+            # Промпты короче порога провайдер не кэширует, их cached_tokens всегда 0
+            "prompt_cache_min_tokens": PREFIX_CACHE_MIN_TOKENS
+        }
+
+    def posts_per_request(self) -> int:
+        """Сколько развёрнутых постов помещается в один ответ модели
+
+        Потолок — не OPENAI_MAX_TOKENS (иначе обычный запрос на 5 постов делился
+        бы на 5 вызовов с полным промптом), а объём, который модель успевает
+        дописать до таймаута запроса: OPENAI_TIMEOUT_SECONDS ×
+        OPENAI_MIN_OUTPUT_TOKENS_PER_SECOND, но не больше лимита ответа модели.
+        """
+        return tokens.posts_per_request(self._posts_output_budget(), settings.MAX_POST_LENGTH)
+
+    def _posts_output_budget(self) -> int:
+        return min(
+            tokens.max_output_tokens(self.model),
+            int(settings.OPENAI_TIMEOUT_SECONDS * settings.OPENAI_MIN_OUTPUT_TOKENS_PER_SECOND)
+        )
+
+    def _split_posts_request(self, count: int) -> List[int]:
+        """Разбиение count постов на запросы, ответ каждого помещается в лимит модели"""
+        per_request = self.posts_per_request()
+        return [
+            min(per_request, count - start)
+            for start in range(0, count, per_request)
+        ]
+
+    def _capped(self, max_tokens: int) -> int:
+        """Ограничение max_tokens общим потолком OPENAI_MAX_TOKENS"""
+        return min(self.max_tokens, max_tokens)
+
+    def _posts_max_tokens(self, count: int, constraints: Optional[PostConstraints] = None) -> int:
+        max_words = constraints.max_words if constraints else settings.MAX_POST_LENGTH
+        return min(tokens.max_output_tokens(self.model), tokens.posts_max_tokens(count, max_words))
+
+    def _build_posts_prompt(
+        self,
+        product_info: Dict[str, Any],
+        count: int,
+        tone: str,
+        series_part: Optional[Tuple[int, int]] = None,
+        constraints: Optional[PostConstraints] = None
+    ) -> str:
+        """Промпт для генерации нескольких постов JSON-списком"""
+        constraints = constraints or PostConstraints.from_max_chars()
+        return self.prompts.render(
+            "posts",
+            count=count,
+            min_words=constraints.min_words,
+            max_words=constraints.max_words,
+            max_chars=constraints.max_chars,
+            series_part=series_part,
+            tone=tone,
+            product=product_fields(product_info)
+        )
 
     async def generate_social_media_posts(
         self, 
         product_info: Dict[str, Any], 
         count: int = 5,
-        tone: str = "professional"
+        tone: str = "professional",
+        use_cache: bool = True,
+        series_part: Optional[Tuple[int, int]] = None,
+        max_chars: Optional[int] = None,
+        report: Optional[PostValidationReport] = None
     ) -> List[str]:
-        """Генерация постов для социальных сетей"""
+        """Генерация постов для социальных сетей
+
+        series_part=(часть, всего частей) — для больших серий, которые
+        генерируются несколькими запросами. Если все посты не помещаются
+        в max_tokens одного ответа, запрос заранее делится на части.
+        max_chars — лимит длины поста (самая строгая из платформ публикации).
+        Посты, не прошедшие проверку, догенерируются отдельным запросом
+        только в недостающем количестве; если и после
+        STRUCTURED_OUTPUT_MAX_REPAIR_ROUNDS запросов их не хватает,
+        возвращается сколько есть. report, если передан, накапливает
+        результаты проверки и число запросов догенерации.
+        """
+        
+        sizes = self._split_posts_request(count)
+        if series_part is None and len(sizes) > 1:
+            parts = await asyncio.gather(*(
+                self.generate_social_media_posts(
+                    product_info, size, tone, use_cache,
+                    series_part=(index + 1, len(sizes)), max_chars=max_chars, report=report
+                )
+                for index, size in enumerate(sizes)
+            ))
+            return [post for part in parts for post in part][:count]
         
-        prompt = f"""
-        Создай {count} развёрнутых постов для социальных сетей на русском языке на основе данных:
+        constraints = PostConstraints.from_max_chars(max_chars)
+        prompt = self._build_posts_prompt(product_info, count, tone, series_part, constraints)
+        max_tokens = self._posts_max_tokens(count, constraints)
         
-        Продукт: {product_info.get('name', '')}
-        Описание: {product_info.get('description', '')}
-        Целевая аудитория: {product_info.get('target_audience', '')}
-        Категория: {product_info.get('category', '')}
-        Ключевые слова: {', '.join(product_info.get('keywords', []))}
-        Тон: {tone}
+        try:
+            output = await self.generate_structured(
+                prompt, PostsOutput, max_tokens, use_cache, prompt_kind="posts"
+            )
+            posts = self._accept_posts(
+                [item.text for item in output.posts], count, constraints, report=report
+            )
+            if report is not None:
+                report.failed += count - len(posts)
+            if len(posts) < count:
+                repaired = await self._repair_posts(
+                    product_info, count - len(posts), tone, series_part, constraints, posts, report
+                )
+                posts += repaired
+                if report is not None:
+                    report.repaired += len(repaired)
+                if use_cache and len(posts) == count and settings.OPENAI_CACHE_ENABLED:
+                    # В кэш попадает уже исправленный набор, чтобы не чинить его повторно
+                    self.cache.set(
+                        self._structured_cache_key(prompt, PostsOutput, max_tokens),
+                        PostsOutput(posts=[{"text": post} for post in posts]).model_dump_json()
+                    )
+            if report is not None:
+                report.unrepaired += count - len(posts)
+            return posts
+        except Exception as e:
+            raise Exception(f"Ошибка генерации постов: {str(e)}")
+
+    async def _repair_posts(
+        self,
+        product_info: Dict[str, Any],
+        missing: int,
+        tone: str,
+        series_part: Optional[Tuple[int, int]],
+        constraints: PostConstraints,
+        accepted: List[str],
+        report: Optional[PostValidationReport] = None
+    ) -> List[str]:
+        """Догенерация missing постов взамен отбракованных (POST_REPAIR_ENABLED)"""
+        posts: List[str] = []
+        if not settings.POST_REPAIR_ENABLED:
+            return posts
+        for _ in range(settings.STRUCTURED_OUTPUT_MAX_REPAIR_ROUNDS):
+            if len(posts) >= missing:
+                break
+            self.structured_stats["post_repair_requests"] += 1
+            if report is not None:
+                report.regeneration_requests += 1
+            count = missing - len(posts)
+            output = await self.generate_structured(
+                self._build_posts_prompt(product_info, count, tone, series_part, constraints),
+                PostsOutput,
+                self._posts_max_tokens(count, constraints),
+                use_cache=False,
+                prompt_kind="posts"
+            )
+            posts += self._accept_posts(
+                [item.text for item in output.posts], count, constraints, accepted + posts
+            )
+        return posts
+
+    def _accept_posts(
+        self,
+        texts: List[str],
+        count: int,
+        constraints: Optional[PostConstraints] = None,
+        accepted: Optional[List[str]] = None,
+        report: Optional[PostValidationReport] = None
+    ) -> List[str]:
+        """Отбор до count постов, прошедших проверку PostValidator
+
+        report, если передан, получает число проверенных постов и причины отказов.
+        """
+        texts = [text.strip() for text in texts]
+        validator = PostValidator(constraints or PostConstraints.from_max_chars())
+        reasons = validator.check(texts, accepted)
+        if report is not None:
+            report.checked += len(texts)
+            missing = ["нет поста"] * max(0, count - len(texts))
+            for reason, number in PostValidator.summarize(reasons + missing).items():
+                report.reasons[reason] = report.reasons.get(reason, 0) + number
+        posts = [text for text, reason in zip(texts, reasons) if reason is None][:count]
+        self.structured_stats["posts_accepted"] += len(posts)
+        self.structured_stats["posts_rejected"] += sum(1 for reason in reasons if reason is not None)
+        return posts
+
+    async def generate_post_variants(
+        self,
+        product_info: Dict[str, Any],
+        n: int,
+        tone: str = "professional",
+        max_chars: Optional[int] = None
+    ) -> List[str]:
+        """Генерация n вариантов одного поста за один запрос (параметр n)
+
+        Промпт отправляется и оплачивается один раз. Варианты, не прошедшие
+        проверку схемой или PostValidator (в том числе повторы друг друга),
+        отбрасываются.
+        """
+        constraints = PostConstraints.from_max_chars(max_chars)
         
-        Стиль и требования к КАЖДОМУ посту:
-        - Научно-деловой стиль, академическая манера изложения, ясные определения ключевых терминов
-        - Минимум 300 слов; структурируй: краткое введение; 2–3 абзаца аналитики/обоснований; практические рекомендации; вывод
-        - Используй эмодзи очень умеренно (0–2 на весь пост)
-        - Не добавляй CTA и не зови подписаться — это добавим отдельно
-        - Не придумывай ссылки на исследования и источники; при необходимости формулируй без ложных цитат
+        try:
+            choices = await self.generate_text_choices(
+                self._build_posts_prompt(product_info, 1, tone, constraints=constraints),
+                n=n,
+                max_tokens=self._posts_max_tokens(1, constraints),
+                output_format=response_format(PostsOutput),
+                prompt_kind="posts"
+            )
+        except Exception as e:
+            raise Exception(f"Ошибка генерации вариантов поста: {str(e)}")
         
-        Формат ответа:
-        - Верни ТОЛЬКО тексты постов
-        - Разделяй посты строкой: \n---\n
+        texts = [
+            output.posts[0].text
+            for output in self._parse_choices(choices, PostsOutput)
+            if output.posts
+        ]
+        return self._accept_posts(texts, n, constraints)
+
+    def _parse_choices(self, choices: List[str], output_model: Type[M]) -> List[M]:
+        """Разбор вариантов ответа по схеме; невалидные отбрасываются"""
+        outputs = []
+        for choice in choices:
+            self.structured_stats["responses"] += 1
+            try:
+                outputs.append(parse_structured(choice, output_model))
+            except StructuredOutputError:
+                self.structured_stats["invalid_responses"] += 1
+        return outputs
+
+    def parse_posts(
+        self,
+        response: str,
+        count: int,
+        constraints: Optional[PostConstraints] = None
+    ) -> List[str]:
+        """Разбор JSON-ответа с постами; посты, не прошедшие проверку, отбрасываются"""
+        try:
+            output = parse_structured(response, PostsOutput)
+        except StructuredOutputError as e:
+            print(f"Ошибка разбора постов: {e}")
+            return []
+        return self._accept_posts([item.text for item in output.posts], count, constraints)
+
+    async def stream_social_media_posts(
+        self,
+        product_info: Dict[str, Any],
+        count: int = 5,
+        tone: str = "professional",
+        max_chars: Optional[int] = None
+    ) -> AsyncIterator[str]:
+        """Потоковая генерация постов: каждый пост отдаётся, как только дописан
+
+        Если посты не помещаются в один ответ, части стримятся по очереди.
         """
         
+        sizes = self._split_posts_request(count)
+        constraints = PostConstraints.from_max_chars(max_chars)
+        for index, size in enumerate(sizes):
+            series_part = (index + 1, len(sizes)) if len(sizes) > 1 else None
+            async for post in self._stream_posts_part(product_info, size, tone, series_part, constraints):
+                yield post
+
+    async def _stream_posts_part(
+        self,
+        product_info: Dict[str, Any],
+        count: int,
+        tone: str,
+        series_part: Optional[Tuple[int, int]],
+        constraints: PostConstraints
+    ) -> AsyncIterator[str]:
+        prompt = self._build_posts_prompt(product_info, count, tone, series_part, constraints)
+        parser = JSONArrayStream("posts")
+        emitted: List[str] = []
+        chunks = self.stream_text(
+            prompt,
+            max_tokens=self._posts_max_tokens(count, constraints),
+            output_format=response_format(PostsOutput)
+        )
+        
         try:
-            response = await self.generate_text(prompt)
-            if '\n---\n' in response:
-                raw_posts = response.split('\n---\n')
-            else:
-                # fallback: если модель не добавила разделитель, делим по пустым строкам
-                raw_posts = [p for p in response.split('\n\n') if p.strip()]
-            posts = [post.strip() for post in raw_posts if post.strip()]
-            return posts[:count]
+            async for delta in chunks:
+                for item in parser.feed(delta):
+                    text = item.get("text") if isinstance(item, dict) else None
+                    if not isinstance(text, str):
+                        self.structured_stats["posts_rejected"] += 1
+                        continue
+                    for post in self._accept_posts([text], count - len(emitted), constraints, emitted):
+                        emitted.append(post)
+                        yield post
+                if len(emitted) >= count or parser.done:
+                    break
         except Exception as e:
             raise Exception(f"Ошибка генерации постов: {str(e)}")
+        finally:
+            await chunks.aclose()
+        
+        self.structured_stats["responses"] += 1
+        if not parser.done:
+            self.structured_stats["invalid_responses"] += 1
+        if len(emitted) < count:
+            try:
+                repaired = await self._repair_posts(
+                    product_info, count - len(emitted), tone, series_part, constraints, emitted
+                )
+            except Exception as e:
+                raise Exception(f"Ошибка генерации постов: {str(e)}")
+            for post in repaired:
+                yield post
+
+    async def stream_text(
+        self,
+        prompt: str,
+        max_tokens: Optional[int] = None,
+        system_prompt: str = SYSTEM_PROMPT,
+        output_format: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
+        """Потоковая генерация текста: отдаёт фрагменты по мере поступления"""
+        max_tokens = max_tokens or self.max_tokens
+        messages = self._messages(prompt, system_prompt)
+        estimated_tokens = self._check_token_budget(messages, max_tokens)
+
+        for attempt in range(settings.OPENAI_RATE_LIMIT_MAX_RETRIES + 1):
+            await self.rate_limiter.acquire(estimated_tokens)
+            chunks = self.backend.stream(
+                model=self.model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=self.temperature,
+                response_format=output_format
+            )
+            streamed: List[str] = []
+            try:
+                # Автомат меряет только ожидание первого фрагмента: время, пока
+                # потребитель читает поток, к задержке провайдера не относится
+                async with self._llm_guard():
+                    delta = await anext(chunks, None)
+                if delta is None:
+                    return
+                streamed.append(delta)
+                yield delta
+                async for delta in chunks:
+                    streamed.append(delta)
+                    yield delta
+                return
+            except RateLimitedError as e:
+                # Повторяем, только если клиенту ещё ничего не отдали
+                self.rate_limiter.on_rate_limited(e.headers)
+                if streamed or attempt == settings.OPENAI_RATE_LIMIT_MAX_RETRIES:
+                    raise
+            finally:
+                # Закрываем соединение, если потребитель остановился раньше конца
+                await chunks.aclose()
+                # Usage в потоке не приходит: расход считаем по отданному тексту
+                self.rate_limiter.reconcile(
+                    estimated_tokens,
+                    estimated_tokens - max_tokens + tokens.count_tokens("".join(streamed), self.model)
+                    if streamed else 0
+                )
+
+    def _build_hashtags_prompt(self, product_info: Dict[str, Any], count: int) -> str:
+        """Промпт для JSON-списка хештегов"""
+        return self.prompts.render("hashtags", count=count, product=product_fields(product_info))
+
+    def _hashtags_details(self, product_info: Dict[str, Any], count: int) -> str:
+        return self.prompts.render("hashtags_details", count=count, product=product_fields(product_info))
+
+    def _build_hashtags_pack_prompt(self, tasks: List[PackedTask]) -> str:
+        """Промпт пакета: хештеги для нескольких продуктов одним ответом"""
+        return self.prompts.render("hashtags_pack", tasks=tasks)
+
+    def _hashtags_max_tokens(self, count: int) -> int:
+        return self._capped(tokens.hashtags_max_tokens(count))
+
+    def parse_hashtags(self, response: str, count: int) -> List[str]:
+        """Разбор JSON-ответа с хештегами (пустой список, если ответ невалиден)"""
+        try:
+            output = parse_structured(response, HashtagsOutput)
+        except StructuredOutputError as e:
+            print(f"Ошибка разбора хештегов: {e}")
+            return []
+        return self._clean_hashtags(output, count)
+
+    def _clean_hashtags(self, output: HashtagsOutput, count: int) -> List[str]:
+        hashtags = [tag.strip().lstrip("#") for tag in output.hashtags if tag.strip().lstrip("#")]
+        return list(dict.fromkeys(hashtags))[:count]
 
     async def generate_hashtags(self, product_info: Dict[str, Any], count: int = 5) -> List[str]:
         """Генерация релевантных хештегов"""
         
-        prompt = f"""
-        Создай {count} популярных и релевантных хештегов для продукта:
-        
-        Продукт: {product_info.get('name', '')}
-        Описание: {product_info.get('description', '')}
-        Категория: {product_info.get('category', '')}
-        
-        Требования:
-        - Хештеги должны быть популярными в социальных сетях
-        - Включи общие хештеги для категории
-        - Добавь специфичные хештеги для продукта
-        - Без символа # в начале
-        
-        Верни только хештеги, разделенные запятыми.
-        """
+        prompt = self._build_hashtags_prompt(product_info, count)
+        details = self._hashtags_details(product_info, count)
         
         try:
-            response = await self.generate_text(prompt)
-            hashtags = [tag.strip() for tag in response.split(',') if tag.strip()]
-            return hashtags[:count]
+            output = await self.generate_packed(
+                "hashtags", prompt, details, self._hashtags_max_tokens(count)
+            )
+            return self._clean_hashtags(output, count)
         except Exception as e:
             raise Exception(f"Ошибка генерации хештегов: {str(e)}")
 
     async def generate_image_prompt(self, product_info: Dict[str, Any]) -> str:
         """Генерация промпта для создания изображения"""
         
-        prompt = f"""
-        Создай детальный промпт для генерации изображения на основе продукта:
-        
-        Продукт: {product_info.get('name', '')}
-        Описание: {product_info.get('description', '')}
-        Категория: {product_info.get('category', '')}
+        product = product_fields(product_info)
+        prompt = self.prompts.render(
+            "image_prompt", max_words=tokens.IMAGE_PROMPT_MAX_WORDS, product=product
+        )
+        details = self.prompts.render("image_prompt_details", product=product)
         
-        Требования к промпту:
-        - Детальное описание визуального стиля
-        - Укажи цвета, композицию, настроение
-        - Сделай изображение привлекательным для соцсетей
-        - Учти целевую аудиторию: {product_info.get('target_audience', '')}
+        try:
+            output = await self.generate_packed(
+                "image_prompt",
+                prompt,
+                details,
+                self._capped(tokens.text_max_tokens(tokens.IMAGE_PROMPT_MAX_WORDS))
+            )
+            return output.prompt.strip()
+        except Exception as e:
+            raise Exception(f"Ошибка генерации промпта для изображения: {str(e)}")
+
+    async def generate_image_prompt_variants(self, product_info: Dict[str, Any], n: int) -> List[str]:
+        """Генерация n разных промптов изображения за один запрос (параметр n)"""
         
-        Верни только промпт для генерации изображения.
-        """
+        prompt = self.prompts.render(
+            "image_prompt", max_words=tokens.IMAGE_PROMPT_MAX_WORDS, product=product_fields(product_info)
+        )
         
         try:
-            return await self.generate_text(prompt)
+            choices = await self.generate_text_choices(
+                prompt,
+                n=n,
+                max_tokens=self._capped(tokens.text_max_tokens(tokens.IMAGE_PROMPT_MAX_WORDS)),
+                output_format=response_format(ImagePromptOutput),
+                prompt_kind="image_prompt"
+            )
         except Exception as e:
             raise Exception(f"Ошибка генерации промпта для изображения: {str(e)}")
+        
+        prompts = [output.prompt.strip() for output in self._parse_choices(choices, ImagePromptOutput)]
+        return list(dict.fromkeys(prompt for prompt in prompts if prompt))
+
+    def _build_image_prompt_pack_prompt(self, tasks: List[PackedTask]) -> str:
+        """Промпт пакета: промпты изображений для нескольких продуктов одним ответом"""
+        return self.prompts.render(
+            "image_prompt_pack", max_words=tokens.IMAGE_PROMPT_MAX_WORDS, tasks=tasks
+        )
+
+    def _build_video_script_prompt(self, product_info: Dict[str, Any]) -> str:
+        """Промпт для скрипта видео"""
+        return self.prompts.render("video_script", product=product_fields(product_info))
 
-    async def generate_video_script(self, product_info: Dict[str, Any]) -> str:
+    def _video_script_max_tokens(self) -> int:
+        return self._capped(tokens.text_max_tokens(tokens.VIDEO_SCRIPT_MAX_WORDS))
+
+    async def generate_video_script(
+        self,
+        product_info: Dict[str, Any],
+        use_cache: bool = True
+    ) -> str:
         """Генерация скрипта для видео"""
         
-        prompt = f"""
-        Создай короткий скрипт для видео (15-30 секунд) на основе продукта:
-        
-        Продукт: {product_info.get('name', '')}
-        Описание: {product_info.get('description', '')}
-        Целевая аудитория: {product_info.get('target_audience', '')}
-        
-        Требования:
-        - Скрипт должен быть динамичным и захватывающим
-        - Включи призыв к действию
-        - Укажи визуальные элементы и переходы
-        - Сделай акцент на пользе продукта
+        prompt = self._build_video_script_prompt(product_info)
         
-        Верни только скрипт видео.
+        try:
+            output = await self.generate_structured(
+                prompt, VideoScriptOutput, self._video_script_max_tokens(), use_cache,
+                prompt_kind="video_script"
+            )
+            return output.script.strip()
+        except Exception as e:
+            raise Exception(f"Ошибка генерации скрипта видео: {str(e)}")
+
+    async def generate_video_scripts(self, product_info: Dict[str, Any], n: int) -> List[str]:
+        """Генерация n разных скриптов видео за один запрос
+
+        Варианты, не прошедшие проверку схемой, отбрасываются — вызывающий
+        догенерирует недостающие.
         """
         
+        prompt = self._build_video_script_prompt(product_info)
+        
         try:
-            return await self.generate_text(prompt)
+            choices = await self.generate_text_choices(
+                prompt,
+                n=n,
+                max_tokens=self._video_script_max_tokens(),
+                output_format=response_format(VideoScriptOutput),
+                prompt_kind="video_script"
+            )
         except Exception as e:
             raise Exception(f"Ошибка генерации скрипта видео: {str(e)}")
+        
+        scripts = [output.script.strip() for output in self._parse_choices(choices, VideoScriptOutput)]
+        return [script for script in scripts if script]
+
+    async def generate_image(self, prompt: str, coalesce: bool = True) -> str:
+        """Генерация изображения с помощью DALL-E
+
+        coalesce=False отключает объединение с одновременным запросом
+        того же промпта (нужно, когда требуется несколько разных картинок).
+        """
+        if not coalesce:
+            return (await self._create_images(prompt, n=1))[0]
 
-    async def generate_image(self, prompt: str) -> str:
-        """Генерация изображения с помощью DALL-E"""
+        key = ResponseCache.make_key(
+            settings.DALL_E_MODEL, settings.DALL_E_SIZE, settings.DALL_E_QUALITY, "image", prompt
+        )
+        urls = await self.singleflight.do(key, lambda: self._create_images(prompt, n=1))
+        return urls[0]
+
+    def max_images_per_request(self) -> int:
+        """Сколько изображений модель отдаёт за один запрос (параметр n)"""
+        return IMAGE_MODEL_MAX_N.get(settings.DALL_E_MODEL, 1)
+
+    async def generate_images(self, prompt: str, n: int) -> List[str]:
+        """Генерация n разных изображений за один запрос
+
+        n не должен превышать max_images_per_request().
+        """
+        return await self._create_images(prompt, n=n)
+
+    async def _create_images(self, prompt: str, n: int) -> List[str]:
         try:
-            response = await self.client.images.generate(
-                model=settings.DALL_E_MODEL,
-                prompt=prompt,
-                size=settings.DALL_E_SIZE,
-                quality=settings.DALL_E_QUALITY,
-                n=1
-            )
-            return response.data[0].url
+            async with circuit_guard(
+                "openai_images",
+                settings.CIRCUIT_BREAKER_LLM_SLOW_CALL_SECONDS,
+                excluded_exceptions=(RateLimitedError,)
+            ):
+                return await self.backend.generate_images(
+                    model=settings.DALL_E_MODEL,
+                    prompt=prompt,
+                    size=settings.DALL_E_SIZE,
+                    quality=settings.DALL_E_QUALITY,
+                    n=n
+                )
         except Exception as e:
             raise Exception(f"Ошибка генерации изображения: {str(e)}")
 
     async def analyze_content_performance(self, post_text: str) -> Dict[str, Any]:
         """Анализ потенциальной эффективности контента"""
         
-        prompt = f"""
-        Проанализируй следующий пост для социальных сетей и оцени его потенциальную эффективность:
-        
-        Пост: {post_text}
-        
-        Оцени по шкале 1-10 следующие параметры:
-        - Привлекательность заголовка
-        - Читаемость текста
-        - Эмоциональное воздействие
-        - Призыв к действию
-        - Релевантность для аудитории
-        
-        Верни ответ в формате JSON с оценками и рекомендациями.
-        """
+        prompt = self.prompts.render("analysis", post_text=post_text)
         
         try:
-            response = await self.generate_text(prompt)
-            # Попытка парсинга JSON
-            try:
-                return json.loads(response)
-            except:
-                # Если не удалось распарсить JSON, возвращаем текстовый анализ
-                return {
-                    "analysis": response,
-                    "score": 7,  # Средняя оценка
-                    "recommendations": ["Проверьте грамматику", "Добавьте больше эмодзи"]
-                }
+            output = await self.generate_structured(
+                prompt, AnalysisOutput, self._capped(tokens.ANALYSIS_MAX_TOKENS),
+                prompt_kind="analysis"
+            )
+            return {**output.model_dump(), "source": "llm"}
+        except StructuredOutputError as e:
+            # Модель так и не вернула ответ по схеме — отдаём оценку
+            # локального эвристического анализатора
+            print(f"Ошибка разбора анализа контента, используем локальную оценку: {e}")
+            return ContentScorer().score_text(post_text)
         except Exception as e:
             raise Exception(f"Ошибка анализа контента: {str(e)}")
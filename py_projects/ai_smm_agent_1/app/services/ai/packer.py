@@ -0,0 +1,162 @@
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+import asyncio
+import json
+
+from app.services.ai.structured import parse_json_object
+
+
+# Ключ, кавычки и запятая на каждый ответ внутри JSON, плюс скобки объекта
+PACK_ITEM_OVERHEAD_TOKENS = 8
+PACK_OVERHEAD_TOKENS = 8
+
+
+class PackedTask:
+    """Мелкая задача для упаковки
+
+    prompt — полный промпт для одиночного вызова (fallback),
+    details — описание задачи внутри общего промпта пакета.
+    """
+
+    def __init__(self, prompt: str, details: str, max_tokens: int):
+        self.prompt = prompt
+        self.details = details
+        self.max_tokens = max_tokens
+
+
+def pack_max_tokens(tasks: List[PackedTask]) -> int:
+    """max_tokens для ответа на пакет из tasks"""
+    return sum(task.max_tokens + PACK_ITEM_OVERHEAD_TOKENS for task in tasks) + PACK_OVERHEAD_TOKENS
+
+
+def parse_pack_response(response: str, count: int) -> Dict[int, str]:
+    """Разбор JSON-ответа пакета {"1": ..., "2": ...} по номерам задач
+
+    Ответ на задачу-объект возвращается JSON-строкой — в том же виде, что
+    и ответ одиночного вызова. Задачи без ответа или с пустым ответом в
+    результат не попадают.
+    """
+    data = parse_json_object(response)
+
+    values = {}
+    for key, value in data.items():
+        if not str(key).strip().isdigit():
+            continue
+        number = int(str(key).strip())
+        if isinstance(value, dict):
+            value = json.dumps(value, ensure_ascii=False) if value else ""
+        elif isinstance(value, list):
+            value = ", ".join(str(item) for item in value)
+        if 1 <= number <= count and isinstance(value, str) and value.strip():
+            values[number] = value.strip()
+    return values
+
+
+class RequestPacker:
+    """Упаковка однотипных мелких задач разных вызывающих в один запрос к LLM
+
+    Задачи копятся не дольше max_wait секунд; пакет отправляется раньше,
+    если набралось max_size задач или ответ перестаёт помещаться в
+    max_tokens. Ответ на пакет — JSON с ответом на каждую задачу; задачи,
+    ответ на которые разобрать не удалось, выполняются отдельными вызовами.
+    """
+
+    def __init__(
+        self,
+        build_prompt: Callable[[List[PackedTask]], str],
+        run_pack: Callable[[str, int], Awaitable[str]],
+        run_single: Callable[[PackedTask], Awaitable[str]],
+        max_wait: float = 0.025,
+        max_size: int = 10,
+        max_tokens: int = 2000
+    ):
+        self.build_prompt = build_prompt
+        self.run_pack = run_pack
+        self.run_single = run_single
+        self.max_wait = max_wait
+        self.max_size = max(1, max_size)
+        self.max_tokens = max_tokens
+        self._pending: List[Tuple[PackedTask, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running: Set[asyncio.Task] = set()
+
+        self.packs = 0
+        self.packed_tasks = 0
+        self.single_calls = 0
+        self.fallback_tasks = 0
+
+    async def submit(self, task: PackedTask) -> str:
+        """Постановка задачи в ближайший пакет и ожидание её ответа"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        if self._pending and pack_max_tokens([t for t, _ in self._pending] + [task]) > self.max_tokens:
+            self._flush()
+        self._pending.append((task, future))
+
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: List[Tuple[PackedTask, asyncio.Future]]):
+        # Задачи, чьи вызывающие уже отменили ожидание, не отправляем
+        batch = [(task, future) for task, future in batch if not future.done()]
+        if not batch:
+            return
+        if len(batch) == 1:
+            await self._run_single(*batch[0])
+            return
+
+        tasks = [task for task, _ in batch]
+        self.packs += 1
+        self.packed_tasks += len(batch)
+        try:
+            response = await self.run_pack(self.build_prompt(tasks), pack_max_tokens(tasks))
+            values = parse_pack_response(response, len(batch))
+        except Exception as e:
+            print(f"Ошибка пакетного запроса, выполняем задачи по отдельности: {e}")
+            values = {}
+
+        fallback = []
+        for number, (task, future) in enumerate(batch, start=1):
+            if number in values:
+                if not future.done():
+                    future.set_result(values[number])
+            else:
+                fallback.append((task, future))
+
+        self.fallback_tasks += len(fallback)
+        await asyncio.gather(*(self._run_single(task, future) for task, future in fallback))
+
+    async def _run_single(self, task: PackedTask, future: asyncio.Future):
+        self.single_calls += 1
+        try:
+            result = await self.run_single(task)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        """Метрики упаковки"""
+        return {
+            "pending": len(self._pending),
+            "packs": self.packs,
+            "packed_tasks": self.packed_tasks,
+            "single_calls": self.single_calls,
+            "fallback_tasks": self.fallback_tasks
+        }
@@ -0,0 +1,245 @@
+from typing import Any, Dict, Mapping, Optional
+
+from jinja2 import DictLoader, Environment, StrictUndefined
+
+
+# Шаблоны промптов: сначала неизменные инструкции, в конце — данные запроса.
+# Промпты одного вида начинаются одинаково, и провайдер может кэшировать
+# этот префикс (у OpenAI — от 1024 токенов вместе с системным сообщением).
+# Неизменная часть текущих шаблонов намного короче, поэтому в кэш попадают
+# только промпты, которые дорастают до порога за счёт данных (пакеты, длинные
+# описания продуктов); короткие запросы всегда идут без скидки.
+PROMPT_TEMPLATES = {
+    "posts": """\
+Создай развёрнутые посты для социальных сетей на русском языке по данным в конце сообщения.
+
+Стиль и требования к КАЖДОМУ посту:
+- Научно-деловой стиль, академическая манера изложения, ясные определения ключевых терминов
+- Объём указан в данных; структурируй: краткое введение; 2–3 абзаца аналитики/обоснований; практические рекомендации; вывод
+- Используй эмодзи очень умеренно (0–2 на весь пост)
+- Не добавляй CTA и не зови подписаться — это добавим отдельно
+- Не придумывай ссылки на исследования и источники; при необходимости формулируй без ложных цитат
+- Если указана часть серии, раскрой в ней свои аспекты темы, не повторяя другие части серии
+
+Формат ответа — JSON-объект: {"posts": [{"text": "текст поста"}, ...]}
+В posts ровно столько элементов, сколько указано в данных; абзацы внутри текста разделяй \\n\\n.
+
+Данные:
+Количество постов: {{ count }}
+Объём поста: от {{ min_words }} до {{ max_words }} слов
+{% if max_chars %}
+Не длиннее {{ max_chars }} символов вместе с пробелами
+{% endif %}
+{% if series_part %}
+Серия: часть {{ series_part[0] }} из {{ series_part[1] }}
+{% endif %}
+Тон: {{ tone }}
+Продукт: {{ product.name }}
+Описание: {{ product.description }}
+Целевая аудитория: {{ product.target_audience }}
+Категория: {{ product.category }}
+Ключевые слова: {{ product.keywords }}
+""",
+
+    "hashtags_details": """\
+Количество хештегов: {{ count }}
+Продукт: {{ product.name }}
+Описание: {{ product.description }}
+Категория: {{ product.category }}
+""",
+
+    "hashtags": """\
+Создай популярные и релевантные хештеги для продукта из данных в конце сообщения.
+
+Требования:
+- Хештеги должны быть популярными в социальных сетях
+- Включи общие хештеги для категории
+- Добавь специфичные хештеги для продукта
+- Без символа # в начале
+
+Формат ответа — JSON-объект: {"hashtags": ["тег1", "тег2"]}
+
+Данные:
+{% include "hashtags_details" %}
+""",
+
+    "hashtags_pack": """\
+Для каждого продукта из данных в конце сообщения создай популярные и релевантные хештеги в указанном количестве.
+
+Требования:
+- Хештеги должны быть популярными в социальных сетях
+- Включи общие хештеги для категории
+- Добавь специфичные хештеги для продукта
+- Без символа # в начале
+
+Верни ТОЛЬКО JSON-объект: ключ — номер продукта, значение — объект со списком хештегов.
+Пример: {"1": {"hashtags": ["тег1", "тег2"]}, "2": {"hashtags": ["тег3", "тег4"]}}
+
+Данные:
+{% for task in tasks %}
+
+Продукт {{ loop.index }}:
+{{ task.details }}
+{% endfor %}
+""",
+
+    "image_prompt_details": """\
+Продукт: {{ product.name }}
+Описание: {{ product.description }}
+Категория: {{ product.category }}
+Целевая аудитория: {{ product.target_audience }}
+""",
+
+    "image_prompt": """\
+Создай детальный промпт для генерации изображения на основе продукта из данных в конце сообщения.
+
+Требования к промпту:
+- Детальное описание визуального стиля
+- Укажи цвета, композицию, настроение
+- Сделай изображение привлекательным для соцсетей
+- Учти целевую аудиторию продукта
+- Объём: до {{ max_words }} слов
+
+Формат ответа — JSON-объект: {"prompt": "промпт для генерации изображения"}
+
+Данные:
+{% include "image_prompt_details" %}
+""",
+
+    "image_prompt_pack": """\
+Для каждого продукта из данных в конце сообщения создай детальный промпт для генерации изображения.
+
+Требования к каждому промпту:
+- Детальное описание визуального стиля
+- Укажи цвета, композицию, настроение
+- Сделай изображение привлекательным для соцсетей
+- Учти целевую аудиторию продукта
+- Объём: до {{ max_words }} слов
+
+Верни ТОЛЬКО JSON-объект: ключ — номер продукта, значение — объект с промптом.
+Пример: {"1": {"prompt": "промпт для продукта 1"}, "2": {"prompt": "промпт для продукта 2"}}
+
+Данные:
+{% for task in tasks %}
+
+Продукт {{ loop.index }}:
+{{ task.details }}
+{% endfor %}
+""",
+
+    "video_script": """\
+Создай короткий скрипт для видео (15-30 секунд) на основе продукта из данных в конце сообщения.
+
+Требования:
+- Скрипт должен быть динамичным и захватывающим
+- Включи призыв к действию
+- Укажи визуальные элементы и переходы
+- Сделай акцент на пользе продукта
+
+Формат ответа — JSON-объект: {"script": "текст скрипта"}
+
+Данные:
+Продукт: {{ product.name }}
+Описание: {{ product.description }}
+Целевая аудитория: {{ product.target_audience }}
+""",
+
+    "analysis": """\
+Проанализируй пост для социальных сетей в конце сообщения и оцени его потенциальную эффективность.
+
+Оцени по шкале 1-10 следующие параметры:
+- headline: привлекательность заголовка
+- readability: читаемость текста
+- emotional_impact: эмоциональное воздействие
+- call_to_action: призыв к действию
+- relevance: релевантность для аудитории
+
+Формат ответа — JSON-объект: {"scores": {"headline": 7, ...}, "score": 7.5, "recommendations": ["..."]}
+score — общая оценка 1-10, recommendations — конкретные рекомендации.
+
+Пост:
+{{ post_text }}
+"""
+}
+
+
+class PromptRegistry:
+    """Реестр шаблонов промптов, скомпилированных один раз при создании"""
+
+    def __init__(self, templates: Mapping[str, str] = PROMPT_TEMPLATES):
+        self.env = Environment(
+            loader=DictLoader(dict(templates)),
+            undefined=StrictUndefined,
+            autoescape=False,
+            trim_blocks=True,
+            lstrip_blocks=True
+        )
+        self._templates = {name: self.env.get_template(name) for name in templates}
+
+    def render(self, name: str, **context: Any) -> str:
+        """Промпт name с подставленными данными"""
+        return self._templates[name].render(**context).strip()
+
+
+def product_fields(product_info: Dict[str, Any]) -> Dict[str, str]:
+    """Поля продукта для шаблонов (отсутствующие — пустые строки)"""
+    return {
+        "name": product_info.get("name") or "",
+        "description": product_info.get("description") or "",
+        "target_audience": product_info.get("target_audience") or "",
+        "category": product_info.get("category") or "",
+        "keywords": ", ".join(product_info.get("keywords") or [])
+    }
+
+
+# С какой длины промпта провайдер (OpenAI) вообще кэширует префикс
+PREFIX_CACHE_MIN_TOKENS = 1024
+
+
+class PromptCacheStats:
+    """Доля промпта, взятая из кэша префиксов провайдера, по видам запросов
+
+    Считается по usage.prompt_tokens_details.cached_tokens из ответов API.
+    Промпты короче PREFIX_CACHE_MIN_TOKENS провайдер не кэширует вовсе:
+    cacheable_requests показывает, сколько запросов вида могли попасть в кэш,
+    и нулевая доля при нулевом cacheable_requests — не ошибка раскладки.
+    """
+
+    def __init__(self):
+        self._kinds: Dict[str, Dict[str, int]] = {}
+
+    def record(self, kind: str, usage: Optional[Mapping[str, Any]]):
+        if not usage:
+            return
+        details = usage.get("prompt_tokens_details") or {}
+        counters = self._kinds.setdefault(
+            kind, {"requests": 0, "cacheable_requests": 0, "prompt_tokens": 0, "cached_tokens": 0}
+        )
+        counters["requests"] += 1
+        if (usage.get("prompt_tokens") or 0) >= PREFIX_CACHE_MIN_TOKENS:
+            counters["cacheable_requests"] += 1
+        counters["prompt_tokens"] += usage.get("prompt_tokens") or 0
+        counters["cached_tokens"] += details.get("cached_tokens") or 0
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Метрики по видам запросов и итог"""
+        total = {"requests": 0, "cacheable_requests": 0, "prompt_tokens": 0, "cached_tokens": 0}
+        report = {}
+        for kind, counters in self._kinds.items():
+            report[kind] = _with_ratio(counters)
+            for key in total:
+                total[key] += counters[key]
+        report["total"] = _with_ratio(total)
+        return report
+
+
+def _with_ratio(counters: Dict[str, int]) -> Dict[str, Any]:
+    prompt_tokens = counters["prompt_tokens"]
+    return {
+        **counters,
+        "cached_ratio": round(counters["cached_tokens"] / prompt_tokens, 3) if prompt_tokens else 0.0
+    }
+
+
+# Шаблоны компилируются один раз на процесс
+prompt_registry = PromptRegistry()
@@ -0,0 +1,139 @@
+from typing import Any, Dict, Mapping, Optional
+import asyncio
+import re
+import time
+
+from app.core.rate_limit import TokenBucket
+
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_reset_duration(value: Optional[str]) -> Optional[float]:
+    """Разбор заголовков вида "1s", "6m0s", "20ms" в секунды"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+
+class LLMRateLimiter:
+    """Ограничитель запросов к LLM по RPM и TPM
+
+    Учитывает заголовки x-ratelimit-* от провайдера: при исчерпании квоты
+    вызывающие ждут её пополнения, а после 429 — срока из retry-after,
+    а не получают ошибку.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60.0)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0)
+        self._blocked_until = 0.0
+
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.total_requests = 0
+        self.delayed_requests = 0
+        self.total_wait_seconds = 0.0
+        self.rate_limited_responses = 0
+
+    async def acquire(self, estimated_tokens: int):
+        """Ожидание свободной квоты под запрос (промпт плюс максимум ответа)"""
+        self.total_requests += 1
+        delay = max(
+            self.requests.reserve(1),
+            self.tokens.reserve(estimated_tokens),
+            self._blocked_until - time.monotonic()
+        )
+        if delay <= 0:
+            return
+
+        self.delayed_requests += 1
+        self.queue_depth += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        started = time.monotonic()
+        try:
+            await asyncio.sleep(delay)
+            # Сервер мог сообщить о сбросе квоты позже, пока мы ждали
+            remaining = self._blocked_until - time.monotonic()
+            if remaining > 0:
+                await asyncio.sleep(remaining)
+        except asyncio.CancelledError:
+            # Запрос так и не ушёл: резерв возвращается, чтобы не задерживать живых
+            self.requests.refund(1)
+            self.tokens.refund(estimated_tokens)
+            raise
+        finally:
+            self.queue_depth -= 1
+            self.total_wait_seconds += time.monotonic() - started
+
+    def reconcile(self, estimated_tokens: int, actual_tokens: Optional[int]):
+        """Корректировка бакета по фактическому расходу из usage"""
+        if actual_tokens is not None:
+            self.tokens.refund(estimated_tokens - actual_tokens)
+
+    def update_from_headers(self, headers: Mapping[str, str]):
+        """Синхронизация с остатком квоты из заголовков ответа
+
+        Общей паузы здесь нет: x-ratelimit-reset-* — время до полного
+        восстановления квоты, а не до следующего разрешённого запроса.
+        Бакеты прижимаются к остатку и дальше пополняются сами.
+        """
+        remaining_requests = headers.get("x-ratelimit-remaining-requests")
+        remaining_tokens = headers.get("x-ratelimit-remaining-tokens")
+
+        if remaining_requests is not None and remaining_requests.isdigit():
+            self.requests.limit_to(int(remaining_requests))
+
+        if remaining_tokens is not None and remaining_tokens.isdigit():
+            self.tokens.limit_to(int(remaining_tokens))
+
+    def on_rate_limited(self, headers: Mapping[str, str]):
+        """Обработка ответа 429: пауза на срок из retry-after
+
+        Заголовки сброса квоты используются, только если retry-after нет,
+        и берётся ближайший из них.
+        """
+        self.rate_limited_responses += 1
+        self.update_from_headers(headers)
+        retry_after_ms = parse_reset_duration(headers.get("retry-after-ms"))
+        if retry_after_ms is not None:
+            self._block_for(retry_after_ms / 1000.0)
+            return
+        retry_after = parse_reset_duration(headers.get("retry-after"))
+        if retry_after is not None:
+            self._block_for(retry_after)
+            return
+        resets = [
+            parse_reset_duration(headers.get("x-ratelimit-reset-requests")),
+            parse_reset_duration(headers.get("x-ratelimit-reset-tokens"))
+        ]
+        known = [value for value in resets if value is not None]
+        self._block_for(min(known) if known else 1.0)
+
+    def _block_for(self, seconds: Optional[float]):
+        if seconds is None:
+            return
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        """Метрики очереди и ожидания"""
+        return {
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "total_requests": self.total_requests,
+            "delayed_requests": self.delayed_requests,
+            "total_wait_seconds": round(self.total_wait_seconds, 3),
+            "rate_limited_responses": self.rate_limited_responses,
+            "available_requests": int(self.requests.available),
+            "available_tokens": int(self.tokens.available),
+            "blocked_for_seconds": round(max(0.0, self._blocked_until - time.monotonic()), 3)
+        }
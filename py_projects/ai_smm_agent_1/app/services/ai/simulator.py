@@ -0,0 +1,386 @@
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+
+from app.core.config import settings
+from app.services.ai.backends import CompletionResult, LLMBackend, RateLimitedError
+from app.services.ai import tokens
+
+
+_FILLER_WORDS = [
+    "практика", "результат", "подход", "аудитория", "решение", "качество",
+    "опыт", "рост", "анализ", "стратегия", "эффективность", "детали",
+    "возможность", "задача", "инструмент", "ценность", "процесс", "метод"
+]
+_PACK_ITEM_RE = re.compile(r"^\s*Продукт (\d+):\s*$", re.M)
+_GENERIC_HASHTAGS = ["smm", "маркетинг", "новинка", "полезное", "тренды", "лайфхаки", "бизнес"]
+
+# Кэш префиксов как у OpenAI: префикс от 1024 токенов, дальше шагами по 128
+PREFIX_CACHE_MIN_TOKENS = 1024
+PREFIX_CACHE_STEP_TOKENS = 128
+PREFIX_CACHE_MAX_ENTRIES = 4096
+
+
+class SimulatedBackend(LLMBackend):
+    """Локальная имитация LLM для нагрузочных тестов без сети
+
+    Ответы детерминированы (зависят только от промпта и номера варианта) и
+    повторяют форматы, которые ожидает OpenAIService: JSON по схеме из
+    response_format (или по виду промпта в JSON-режиме), для промптов без
+    JSON — посты через ---, хештеги через запятую. Задержка, скорость
+    генерации токенов и доля ошибок/429/бракованных постов берутся из
+    настроек SIMULATOR_*. Кэш префиксов провайдера имитируется: в
+    usage.prompt_tokens_details.cached_tokens попадает длина самого
+    длинного уже виденного префикса сообщений.
+    """
+
+    def __init__(
+        self,
+        latency_distribution: str = "lognormal",
+        latency_mean: float = 0.8,
+        latency_sigma: float = 0.5,
+        tokens_per_second: float = 80.0,
+        tokens_per_second_jitter: float = 0.1,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        malformed_post_rate: float = 0.0,
+        prefix_cache_min_tokens: int = PREFIX_CACHE_MIN_TOKENS,
+        seed: Optional[int] = None
+    ):
+        self.latency_distribution = latency_distribution
+        self.latency_mean = latency_mean
+        self.latency_sigma = latency_sigma
+        self.tokens_per_second = tokens_per_second
+        self.tokens_per_second_jitter = tokens_per_second_jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.malformed_post_rate = malformed_post_rate
+        self.prefix_cache_min_tokens = prefix_cache_min_tokens
+        self._prefixes: "OrderedDict[str, None]" = OrderedDict()
+        self.random = random.Random(seed)
+        self.requests = 0
+
+    @classmethod
+    def from_settings(cls) -> "SimulatedBackend":
+        return cls(
+            latency_distribution=settings.SIMULATOR_LATENCY_DISTRIBUTION,
+            latency_mean=settings.SIMULATOR_LATENCY_MEAN_SECONDS,
+            latency_sigma=settings.SIMULATOR_LATENCY_SIGMA,
+            tokens_per_second=settings.SIMULATOR_TOKENS_PER_SECOND,
+            tokens_per_second_jitter=settings.SIMULATOR_TOKENS_PER_SECOND_JITTER,
+            error_rate=settings.SIMULATOR_ERROR_RATE,
+            rate_limit_rate=settings.SIMULATOR_RATE_LIMIT_RATE,
+            malformed_post_rate=settings.SIMULATOR_MALFORMED_POST_RATE,
+            prefix_cache_min_tokens=settings.SIMULATOR_PREFIX_CACHE_MIN_TOKENS,
+            seed=settings.SIMULATOR_SEED
+        )
+
+    # --- Модель задержек и ошибок ---
+
+    def _sample_latency(self) -> float:
+        """Время до первого токена"""
+        mean = self.latency_mean
+        if self.latency_distribution == "constant":
+            return mean
+        if self.latency_distribution == "exponential":
+            return self.random.expovariate(1.0 / mean) if mean > 0 else 0.0
+        if self.latency_distribution == "normal":
+            return max(0.0, self.random.gauss(mean, self.latency_sigma))
+        # lognormal с заданным средним: mu подбирается так, чтобы E[X] = mean
+        if mean <= 0:
+            return 0.0
+        mu = math.log(mean) - self.latency_sigma ** 2 / 2
+        return self.random.lognormvariate(mu, self.latency_sigma)
+
+    def _sample_token_rate(self) -> float:
+        jitter = self.random.gauss(1.0, self.tokens_per_second_jitter)
+        return max(1.0, self.tokens_per_second * jitter)
+
+    def _maybe_fail(self):
+        roll = self.random.random()
+        if roll < self.rate_limit_rate:
+            raise RateLimitedError(
+                "Simulated rate limit",
+                {"retry-after-ms": "200", "x-ratelimit-remaining-requests": "0"}
+            )
+        if roll < self.rate_limit_rate + self.error_rate:
+            raise Exception("Simulated upstream error")
+
+    # --- Бэкенд ---
+
+    async def complete(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        temperature: float,
+        n: int = 1,
+        response_format: Optional[Dict[str, Any]] = None
+    ) -> CompletionResult:
+        self.requests += 1
+        prompt = messages[-1]["content"]
+        await asyncio.sleep(self._sample_latency())
+        self._maybe_fail()
+
+        texts, finish_reasons = [], []
+        completion_tokens = 0
+        for index in range(n):
+            text, finish_reason = self._render(model, prompt, index, max_tokens, response_format)
+            texts.append(text)
+            finish_reasons.append(finish_reason)
+            completion_tokens += _output_tokens(text)
+
+        # Все варианты генерируются параллельно, время — по самому длинному
+        longest = max(_output_tokens(text) for text in texts)
+        await asyncio.sleep(longest / self._sample_token_rate())
+
+        prompt_tokens = tokens.count_message_tokens(messages, model)
+        return CompletionResult(
+            texts=texts,
+            usage={
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "prompt_tokens_details": {
+                    "cached_tokens": self._cached_prefix_tokens(messages, prompt_tokens)
+                }
+            },
+            finish_reasons=finish_reasons
+        )
+
+    async def stream(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        temperature: float,
+        response_format: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
+        self.requests += 1
+        prompt = messages[-1]["content"]
+        await asyncio.sleep(self._sample_latency())
+        self._maybe_fail()
+
+        text, _ = self._render(model, prompt, 0, max_tokens, response_format)
+        rate = self._sample_token_rate()
+        # Отдаём текст кусками по несколько слов с задержкой по скорости генерации
+        pieces = re.findall(r"\S+\s*|\s+", text)
+        for start in range(0, len(pieces), 8):
+            piece = "".join(pieces[start:start + 8])
+            await asyncio.sleep(_output_tokens(piece) / rate)
+            yield piece
+
+    async def generate_images(
+        self,
+        model: str,
+        prompt: str,
+        size: str,
+        quality: str,
+        n: int = 1
+    ) -> List[str]:
+        self.requests += 1
+        # Генерация изображений заметно медленнее текста
+        await asyncio.sleep(self._sample_latency() * 3)
+        self._maybe_fail()
+        digest = _digest(model, size, quality, prompt)
+        return [f"https://simulator.local/images/{digest}-{index}.png" for index in range(n)]
+
+    def _cached_prefix_tokens(self, messages: List[Dict[str, str]], prompt_tokens: int) -> int:
+        """Сколько токенов промпта совпало с префиксом одного из прошлых запросов
+
+        Токены сопоставляются с символами пропорционально длине текста.
+        """
+        text = "\n".join(f"{message['role']}:{message['content']}" for message in messages)
+        chars_per_token = len(text) / max(1, prompt_tokens)
+        cached = 0
+        for length in range(self.prefix_cache_min_tokens, prompt_tokens + 1, PREFIX_CACHE_STEP_TOKENS):
+            key = _digest(text[:int(length * chars_per_token)])
+            if key in self._prefixes:
+                cached = length
+                self._prefixes.move_to_end(key)
+            else:
+                self._prefixes[key] = None
+        while len(self._prefixes) > PREFIX_CACHE_MAX_ENTRIES:
+            self._prefixes.popitem(last=False)
+        return cached
+
+    # --- Детерминированные ответы ---
+
+    def _render(
+        self,
+        model: str,
+        prompt: str,
+        index: int,
+        max_tokens: int,
+        response_format: Optional[Dict[str, Any]] = None
+    ) -> Tuple[str, str]:
+        rng = random.Random(_digest(prompt, index))
+        product = _field(prompt, "Продукт") or "продукт"
+        keywords = [k.strip() for k in (_field(prompt, "Ключевые слова") or "").split(",") if k.strip()]
+        structured = response_format is not None or "JSON" in prompt
+        kind = _schema_name(response_format) or _detect_kind(prompt)
+
+        if kind == "pack":
+            text = self._render_pack(rng, prompt)
+        elif kind == "AnalysisOutput":
+            text = self._render_analysis(rng)
+        elif kind == "HashtagsOutput":
+            count = int(_number(prompt, r"Количество хештегов: (\d+)") or 5)
+            hashtags = self._render_hashtags(rng, count, product, keywords)
+            text = _json({"hashtags": hashtags}) if structured else ", ".join(hashtags)
+        elif kind == "PostsOutput":
+            posts = self._render_posts(rng, prompt, product, keywords, structured)
+            text = _json({"posts": [{"text": post} for post in posts]}) if structured else "\n---\n".join(posts)
+        elif kind == "VideoScriptOutput":
+            script = self._render_words(rng, product, keywords, 60, 120, prefix="Сцена 1: ")
+            text = _json({"script": script}) if structured else script
+        elif kind == "ImagePromptOutput" and structured:
+            text = _json({"prompt": self._render_words(rng, product, keywords, 40, 90)})
+        else:
+            text = self._render_words(rng, product, keywords, 40, 90)
+
+        # Ответ обрезается по max_tokens, как у настоящей модели
+        # (обрезанный JSON не разберётся — так же, как у настоящей модели)
+        max_words = int(max_tokens / tokens.TOKENS_PER_WORD)
+        words = re.findall(r"\S+\s*", text)
+        if len(words) > max_words:
+            return "".join(words[:max_words]).rstrip(), "length"
+        return text, "stop"
+
+    def _render_words(
+        self,
+        rng: random.Random,
+        product: str,
+        keywords: List[str],
+        min_words: int,
+        max_words: int,
+        prefix: str = ""
+    ) -> str:
+        vocabulary = _FILLER_WORDS + keywords
+        words = [rng.choice(vocabulary) for _ in range(rng.randint(min_words, max_words))]
+        sentences = []
+        for start in range(0, len(words), 12):
+            sentence = " ".join(words[start:start + 12])
+            sentences.append(sentence[:1].upper() + sentence[1:] + ".")
+        return f"{prefix}{product}. " + " ".join(sentences)
+
+    def _render_posts(
+        self,
+        rng: random.Random,
+        prompt: str,
+        product: str,
+        keywords: List[str],
+        structured: bool
+    ) -> List[str]:
+        count = int(_number(prompt, r"Количество постов: (\d+)") or 1)
+        max_words = int(_number(prompt, r"от \d+ до (\d+) слов") or settings.MAX_POST_LENGTH)
+        min_words = int(_number(prompt, r"от (\d+) до \d+ слов") or min(tokens.POST_MIN_WORDS, max_words))
+        # Каждый абзац начинается с названия продукта — оно входит в объём поста
+        prefix_words = len(product.split())
+        posts = []
+        for _ in range(count):
+            paragraphs = [
+                self._render_words(
+                    rng, product, keywords,
+                    max(1, min_words // 4 - prefix_words), max(1, max_words // 4 - prefix_words)
+                )
+                for _ in range(4)
+            ]
+            # Брак решается общим генератором: повтор того же промпта может пройти
+            if structured and self.random.random() < self.malformed_post_rate:
+                paragraphs = paragraphs[:1]
+            posts.append("\n\n".join(paragraphs))
+        return posts
+
+    def _render_hashtags(
+        self,
+        rng: random.Random,
+        count: int,
+        product: str,
+        keywords: List[str]
+    ) -> List[str]:
+        candidates = [re.sub(r"\W", "", word.lower()) for word in product.split() + keywords]
+        candidates = [word for word in candidates if word] + _GENERIC_HASHTAGS
+        unique = list(dict.fromkeys(candidates))
+        rng.shuffle(unique)
+        return unique[:count]
+
+    def _render_pack(self, rng: random.Random, prompt: str) -> str:
+        """Ответ на упакованный запрос: JSON с ответом для каждого продукта"""
+        values = {}
+        for match in _PACK_ITEM_RE.finditer(prompt):
+            block = prompt[match.end():].split("Продукт ", 1)[0]
+            product = _field(block, "Продукт") or "продукт"
+            if "хештег" in prompt:
+                count = int(_number(block, r"Количество хештегов: (\d+)") or 5)
+                values[match.group(1)] = {"hashtags": self._render_hashtags(rng, count, product, [])}
+            else:
+                values[match.group(1)] = {"prompt": self._render_words(rng, product, [], 40, 90)}
+        return _json(values)
+
+    def _render_analysis(self, rng: random.Random) -> str:
+        scores = {
+            "headline": rng.randint(5, 9),
+            "readability": rng.randint(5, 9),
+            "emotional_impact": rng.randint(4, 9),
+            "call_to_action": rng.randint(3, 8),
+            "relevance": rng.randint(6, 10)
+        }
+        return _json({
+            "scores": scores,
+            "score": round(sum(scores.values()) / len(scores), 1),
+            "recommendations": ["Добавьте конкретный пример", "Сократите вступление"]
+        })
+
+
+def _digest(*parts) -> str:
+    raw = json.dumps(parts, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def _json(data: Any) -> str:
+    return json.dumps(data, ensure_ascii=False)
+
+
+def _schema_name(response_format: Optional[Dict[str, Any]]) -> Optional[str]:
+    if response_format and response_format.get("type") == "json_schema":
+        return response_format.get("json_schema", {}).get("name")
+    return None
+
+
+def _detect_kind(prompt: str) -> Optional[str]:
+    """Вид ответа по тексту промпта (без схемы в response_format)"""
+    if _PACK_ITEM_RE.search(prompt):
+        return "pack"
+    if "Проанализируй" in prompt:
+        return "AnalysisOutput"
+    if "хештег" in prompt:
+        return "HashtagsOutput"
+    if "постов" in prompt:
+        return "PostsOutput"
+    if "скрипт для видео" in prompt:
+        return "VideoScriptOutput"
+    if "изображения" in prompt:
+        return "ImagePromptOutput"
+    return None
+
+
+def _output_tokens(text: str) -> int:
+    """Расход токенов ответа по той же модели, что и бюджет в tokens.py"""
+    return tokens.words_to_tokens(len(text.split()))
+
+
+def _field(prompt: str, name: str) -> Optional[str]:
+    match = re.search(rf"{name}:\s*(.*)", prompt)
+    return match.group(1).strip() if match else None
+
+
+def _number(prompt: str, pattern: str) -> Optional[str]:
+    match = re.search(pattern, prompt)
+    return match.group(1) if match else None
+
@@ -0,0 +1,68 @@
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+import asyncio
+
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Объединение одинаковых запросов, выполняющихся одновременно
+
+    Первый вызов с ключом запускает задачу, остальные ждут её результат.
+    Отмена одного ожидающего не отменяет задачу для остальных; задача
+    отменяется, только если её перестали ждать все.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._waiters: Dict[str, int] = {}
+        self.calls = 0
+        self.executed = 0
+        self.shared = 0
+        self.cancelled_waiters = 0
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[T]]) -> T:
+        """Выполнение factory() или ожидание уже запущенного запроса с тем же ключом"""
+        self.calls += 1
+        task = self._inflight.get(key)
+        if task is None:
+            self.executed += 1
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done, key=key: self._forget(key, done))
+        else:
+            self.shared += 1
+
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            self.cancelled_waiters += 1
+            if self._waiters.get(key) == 1 and not task.done():
+                task.cancel()
+                # Новый вызов с этим ключом должен запустить свою задачу,
+                # а не ждать отменяемую
+                if self._inflight.get(key) is task:
+                    del self._inflight[key]
+            raise
+        finally:
+            self._waiters[key] -= 1
+            if self._waiters[key] <= 0:
+                del self._waiters[key]
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Забираем исключение, чтобы не было предупреждения о неполученной ошибке
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        """Счётчики сэкономленных вызовов"""
+        return {
+            "in_flight": len(self._inflight),
+            "calls": self.calls,
+            "executed": self.executed,
+            "saved_calls": self.shared,
+            "cancelled_waiters": self.cancelled_waiters
+        }
@@ -0,0 +1,192 @@
+from typing import Any, Dict, List, Optional, Type, TypeVar
+import json
+import re
+
+from pydantic import BaseModel, Field, ValidationError
+
+from app.core.config import settings
+
+
+M = TypeVar("M", bound=BaseModel)
+
+_JSON_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+# Ключевые слова JSON Schema, которые strict-режим structured outputs не принимает;
+# ограничения из них всё равно проверяются при валидации pydantic-моделью
+_UNSUPPORTED_SCHEMA_KEYS = {"title", "default", "minimum", "maximum", "minLength", "maxLength"}
+
+
+class StructuredOutputError(Exception):
+    """Ответ модели не разобран как JSON или не соответствует схеме"""
+
+
+# --- Схемы ответов ---
+
+class PostItem(BaseModel):
+    text: str
+
+
+class PostsOutput(BaseModel):
+    posts: List[PostItem]
+
+
+class HashtagsOutput(BaseModel):
+    hashtags: List[str]
+
+
+class ImagePromptOutput(BaseModel):
+    prompt: str
+
+
+class VideoScriptOutput(BaseModel):
+    script: str
+
+
+class AnalysisScores(BaseModel):
+    headline: int = Field(ge=1, le=10)
+    readability: int = Field(ge=1, le=10)
+    emotional_impact: int = Field(ge=1, le=10)
+    call_to_action: int = Field(ge=1, le=10)
+    relevance: int = Field(ge=1, le=10)
+
+
+class AnalysisOutput(BaseModel):
+    scores: AnalysisScores
+    score: float = Field(ge=1, le=10)
+    recommendations: List[str]
+
+
+# --- Формат ответа ---
+
+def _strict(schema: Any) -> Any:
+    if isinstance(schema, list):
+        return [_strict(item) for item in schema]
+    if not isinstance(schema, dict):
+        return schema
+    result = {
+        key: _strict(value)
+        for key, value in schema.items()
+        if key not in _UNSUPPORTED_SCHEMA_KEYS
+    }
+    if result.get("type") == "object" and "properties" in result:
+        # strict-режим: все поля обязательны, лишние запрещены
+        result["required"] = list(result["properties"])
+        result["additionalProperties"] = False
+    return result
+
+
+def json_schema(model: Type[BaseModel]) -> Dict[str, Any]:
+    """JSON Schema модели в виде, который принимает strict-режим OpenAI"""
+    return _strict(model.model_json_schema())
+
+
+def response_format(model: Optional[Type[BaseModel]] = None) -> Dict[str, Any]:
+    """Параметр response_format для chat.completions
+
+    Без модели (или при OPENAI_STRUCTURED_OUTPUT="json_object") включается
+    JSON-режим: модель обязана вернуть JSON-объект, но схема не навязывается
+    и проверяется только при разборе.
+    """
+    if model is None or settings.OPENAI_STRUCTURED_OUTPUT == "json_object":
+        return {"type": "json_object"}
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": model.__name__,
+            "schema": json_schema(model),
+            "strict": True
+        }
+    }
+
+
+# --- Разбор ответа ---
+
+def extract_json(text: str) -> str:
+    """JSON-объект из ответа: без markdown-ограждения и текста вокруг"""
+    text = _JSON_FENCE_RE.sub("", text.strip())
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end < start:
+        raise StructuredOutputError("в ответе нет JSON-объекта")
+    return text[start:end + 1]
+
+
+def parse_json_object(text: str) -> Dict[str, Any]:
+    """Разбор ответа в JSON-объект без проверки схемы"""
+    try:
+        data = json.loads(extract_json(text))
+    except ValueError as e:
+        raise StructuredOutputError(f"некорректный JSON: {str(e)}")
+    if not isinstance(data, dict):
+        raise StructuredOutputError("ответ не является JSON-объектом")
+    return data
+
+
+def parse_structured(text: str, model: Type[M]) -> M:
+    """Разбор и проверка ответа по схеме model"""
+    try:
+        return model.model_validate(parse_json_object(text))
+    except ValidationError as e:
+        raise StructuredOutputError(
+            f"ответ не соответствует схеме {model.__name__}: {e.error_count()} ошибок, "
+            f"{e.errors()[0]['msg']}"
+        )
+
+
+class JSONArrayStream:
+    """Инкрементальный разбор потокового JSON-ответа вида {"key": [{...}, {...}]}
+
+    Каждый объект массива key отдаётся, как только закрыта его скобка,
+    не дожидаясь конца ответа.
+    """
+
+    def __init__(self, key: str):
+        self._key_re = re.compile(rf'"{re.escape(key)}"\s*:\s*$')
+        self.buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._array_depth: Optional[int] = None
+        self._item_start: Optional[int] = None
+        self.done = False
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Добавление фрагмента; возвращает объекты, закрытые в этом фрагменте"""
+        self.buffer += chunk
+        items = []
+        while self._pos < len(self.buffer):
+            char = self.buffer[self._pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+                if (
+                    char == "[" and self._array_depth is None and not self.done
+                    and self._key_re.search(self.buffer, 0, self._pos)
+                ):
+                    self._array_depth = self._depth
+                elif char == "{" and self._array_depth is not None and self._depth == self._array_depth + 1:
+                    self._item_start = self._pos
+            elif char in "}]":
+                if (
+                    char == "}" and self._item_start is not None
+                    and self._depth == self._array_depth + 1
+                ):
+                    try:
+                        items.append(json.loads(self.buffer[self._item_start:self._pos + 1]))
+                    except ValueError:
+                        pass
+                    self._item_start = None
+                elif char == "]" and self._depth == self._array_depth:
+                    self._array_depth = None
+                    self.done = True
+                self._depth -= 1
+            self._pos += 1
+        return items
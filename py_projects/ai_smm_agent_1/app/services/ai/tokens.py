@@ -0,0 +1,133 @@
+from functools import lru_cache
+from typing import Any, List, Optional
+import math
+
+try:
+    import tiktoken
+except ImportError:  # токенизатор необязателен, без него работает оценка по символам
+    tiktoken = None
+
+
+# Оценка без токенизатора: ~3 символа на токен для смеси русского и английского
+CHARS_PER_TOKEN = 3.0
+
+# Русский текст в токенизаторах GPT-4o: в среднем ~2 токена на слово
+TOKENS_PER_WORD = 2.0
+
+# Служебные токены на каждое сообщение чата
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Размер контекстного окна и максимум ответа по моделям
+MODEL_CONTEXT_WINDOW = {
+    "gpt-4o-mini": 128000,
+    "gpt-4o": 128000,
+    "gpt-4-turbo": 128000,
+    "gpt-4": 8192,
+    "gpt-3.5-turbo": 16385
+}
+MODEL_MAX_OUTPUT_TOKENS = {
+    "gpt-4o-mini": 16384,
+    "gpt-4o": 16384,
+    "gpt-4-turbo": 4096,
+    "gpt-4": 8192,
+    "gpt-3.5-turbo": 4096
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+DEFAULT_MAX_OUTPUT_TOKENS = 4096
+
+# Минимальный объём поста, который требует промпт
+POST_MIN_WORDS = 300
+
+# Обёртка {"text": ...} и запятая вокруг каждого поста в JSON-ответе
+POST_SEPARATOR_TOKENS = 8
+
+# Скобки, ключи и кавычки JSON-объекта ответа
+JSON_OVERHEAD_TOKENS = 16
+
+# Ожидаемый объём коротких ответов
+IMAGE_PROMPT_MAX_WORDS = 150
+VIDEO_SCRIPT_MAX_WORDS = 250
+ANALYSIS_MAX_TOKENS = 600
+
+
+class TokenBudgetError(Exception):
+    """Запрос не помещается в лимиты модели и был отклонён до отправки"""
+
+
+@lru_cache(maxsize=8)
+def _get_encoding(model: str) -> Optional[Any]:
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        pass
+    except Exception:
+        # Словарь токенизатора скачивается при первом использовании;
+        # без сети переходим на оценку по символам
+        return None
+    try:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        return None
+
+
+def count_tokens(text: str, model: str) -> int:
+    """Подсчёт токенов в тексте (токенизатором, если он доступен)"""
+    encoding = _get_encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return int(math.ceil(len(text) / CHARS_PER_TOKEN))
+
+
+def count_message_tokens(messages: List[dict], model: str) -> int:
+    """Подсчёт токенов промпта для chat.completions"""
+    return sum(
+        count_tokens(message["content"], model) + MESSAGE_OVERHEAD_TOKENS
+        for message in messages
+    ) + 2
+
+
+def words_to_tokens(words: int) -> int:
+    """Оценка токенов ответа по числу слов"""
+    return int(math.ceil(words * TOKENS_PER_WORD))
+
+
+def posts_max_tokens(count: int, max_words: int) -> int:
+    """max_tokens для JSON-ответа с count постами длиной до max_words слов"""
+    return count * (words_to_tokens(max_words) + POST_SEPARATOR_TOKENS) + JSON_OVERHEAD_TOKENS
+
+
+def posts_per_request(max_tokens_cap: int, max_words: int) -> int:
+    """Сколько постов помещается в один ответ при потолке max_tokens_cap"""
+    per_post = words_to_tokens(max_words) + POST_SEPARATOR_TOKENS
+    return max(1, (max_tokens_cap - JSON_OVERHEAD_TOKENS) // per_post)
+
+
+def hashtags_max_tokens(count: int) -> int:
+    """max_tokens для JSON-списка из count хештегов"""
+    return count * 10 + JSON_OVERHEAD_TOKENS
+
+
+def text_max_tokens(max_words: int) -> int:
+    """max_tokens для JSON-ответа с одним текстом до max_words слов"""
+    return words_to_tokens(max_words) + JSON_OVERHEAD_TOKENS
+
+
+def max_output_tokens(model: str) -> int:
+    return MODEL_MAX_OUTPUT_TOKENS.get(model, DEFAULT_MAX_OUTPUT_TOKENS)
+
+
+def check_budget(prompt_tokens: int, max_tokens: int, model: str):
+    """Проверка, что запрос помещается в окно модели, иначе TokenBudgetError"""
+    if max_tokens > max_output_tokens(model):
+        raise TokenBudgetError(
+            f"max_tokens={max_tokens} больше лимита ответа модели {model} "
+            f"({max_output_tokens(model)})"
+        )
+    context_window = MODEL_CONTEXT_WINDOW.get(model, DEFAULT_CONTEXT_WINDOW)
+    if prompt_tokens + max_tokens > context_window:
+        raise TokenBudgetError(
+            f"Промпт ({prompt_tokens}) и ответ ({max_tokens}) не помещаются "
+            f"в контекст модели {model} ({context_window} токенов)"
+        )
@@ -0,0 +1,53 @@
+from typing import Awaitable, Callable, List, Optional
+import asyncio
+
+from app.models.content import AssetResult
+
+
+class BulkAssetEngine:
+    """Массовая генерация ассетов с ограничением параллельности
+
+    Запрошенное количество делится на пачки по batch_size (параметр n у
+    провайдера), пачки выполняются параллельно, но не больше concurrency
+    одновременно. Результаты возвращаются по порядку, ошибка — у каждого
+    элемента своя.
+    """
+
+    def __init__(self, concurrency: int = 4):
+        self.concurrency = max(1, concurrency)
+
+    async def run(
+        self,
+        count: int,
+        batch_size: int,
+        produce: Callable[[int], Awaitable[List[str]]]
+    ) -> List[AssetResult]:
+        """Генерация count ассетов; produce(n) возвращает до n результатов за вызов"""
+        batch_size = max(1, batch_size)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results: List[Optional[AssetResult]] = [None] * count
+
+        async def run_batch(start: int, size: int):
+            async with semaphore:
+                try:
+                    values = await produce(size)
+                    error = None
+                except Exception as e:
+                    values = []
+                    error = str(e)
+
+            for offset in range(size):
+                index = start + offset
+                if offset < len(values):
+                    results[index] = AssetResult(index=index, value=values[offset])
+                else:
+                    results[index] = AssetResult(
+                        index=index,
+                        error=error or "Провайдер вернул меньше результатов, чем запрошено"
+                    )
+
+        await asyncio.gather(*(
+            run_batch(start, min(batch_size, count - start))
+            for start in range(0, count, batch_size)
+        ))
+        return results
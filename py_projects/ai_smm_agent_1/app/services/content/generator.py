@@ -1,16 +1,27 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator, Awaitable, Tuple
 from datetime import datetime, timedelta
 import asyncio
 
-from app.services.ai.openai_service import OpenAIService
+from app.services.ai.openai_service import OpenAIService, get_openai_service
+from app.services.content.bulk import BulkAssetEngine
+from app.services.content.memo import product_memo
+from app.services.content.scoring import ContentScorer
+from app.services.content.validation import (
+    DEFAULT_PLATFORM_LIMITS, PLATFORM_LIMITS, PostConstraints, PostValidator
+)
 from app.core.config import settings
-from app.models.content import PostCreate, GeneratedContent, ContentGenerationRequest
+from app.models.content import (
+    PostCreate, GeneratedContent, ContentGenerationRequest, AssetResult, PostValidationReport,
+    ContentVariant
+)
 from app.models.product import Product, PlatformType, ContentType
 
 
 class ContentGenerator:
-    def __init__(self):
-        self.ai_service = OpenAIService()
+    def __init__(self, ai_service: Optional[OpenAIService] = None):
+        self.ai_service = ai_service or get_openai_service()
+        self.scorer = ContentScorer()
+        self.memo = product_memo
 
     async def create_content_plan(
         self,
@@ -49,18 +60,62 @@ class ContentGenerator:
             "price": product.price
         }
         
-        # Генерируем посты
-        post_texts = await self.ai_service.generate_social_media_posts(
-            product_info=product_info,
-            count=request.post_count,
-            tone=request.tone
-        )
+        # Этапы без взаимных зависимостей запускаем параллельно:
+        # посты и хештеги обязательны, изображение и видео-скрипт — нет.
+        # Изображение стартует сразу после готовности своего промпта.
+        text_timeout = settings.CONTENT_STAGE_TIMEOUT_SECONDS
+        posts_task = asyncio.create_task(self._run_stage(
+            "посты",
+            self._generate_checked_posts(
+                product_info, request.post_count, request.tone, request.platforms
+            ),
+            timeout=text_timeout
+        ))
+        hashtags_task = asyncio.create_task(self._run_stage(
+            "хештеги",
+            self._hashtags(product, product_info),
+            timeout=text_timeout
+        ))
+        image_task = None
+        carousel_task = None
+        if request.include_images and request.content_type == ContentType.CAROUSEL:
+            carousel_task = asyncio.create_task(
+                self._generate_carousel_branch(product, request.carousel_size)
+            )
+        elif request.include_images:
+            image_task = asyncio.create_task(self._generate_image_branch(product, product_info))
+        video_task = None
+        if request.include_videos:
+            video_task = asyncio.create_task(self._run_optional_stage(
+                "Ошибка генерации видео-скрипта",
+                self.ai_service.generate_video_script(product_info),
+                timeout=text_timeout
+            ))
+        variants_task = None
+        if request.variants > 1:
+            variants_task = asyncio.create_task(self._run_optional_stage(
+                "Ошибка генерации вариантов поста",
+                self.generate_post_variants(product, request.variants, request.tone, request.platforms),
+                timeout=text_timeout
+            ))
+        tasks = [
+            task for task in (
+                posts_task, hashtags_task, image_task, carousel_task, video_task, variants_task
+            )
+            if task
+        ]
         
-        # Генерируем хештеги
-        hashtags = await self.ai_service.generate_hashtags(
-            product_info=product_info,
-            count=5
-        )
+        try:
+            (post_texts, validation), hashtags = await asyncio.gather(posts_task, hashtags_task)
+            image_url = await image_task if image_task else None
+            carousel = await carousel_task if carousel_task else []
+            video_script = await video_task if video_task else None
+            variants = await variants_task if variants_task else None
+        except BaseException:
+            # Обязательный этап упал — остальные ветки больше не нужны
+            for task in tasks:
+                task.cancel()
+            raise
         
         # Создаем объекты постов
         posts = []
@@ -74,40 +129,162 @@ class ContentGenerator:
             )
             posts.append(post)
         
-        # Генерируем изображения если требуется
-        images = []
-        if request.include_images:
-            try:
-                image_prompt = await self.ai_service.generate_image_prompt(product_info)
-            except Exception as e:
-                image_prompt = None
-                print(f"Ошибка генерации промпта изображения: {e}")
-            try:
-                if image_prompt:
-                    image_url = await self.ai_service.generate_image(image_prompt)
-                    images.append(image_url)
-                    if posts:
-                        posts[0].image_url = image_url
-            except Exception as e:
-                print(f"Ошибка генерации изображения: {e}")
-                # продолжаем без изображения
-        
-        # Генерируем видео-скрипты если требуется
-        video_scripts = []
-        if request.include_videos:
-            try:
-                video_script = await self.ai_service.generate_video_script(product_info)
-                video_scripts.append(video_script)
-            except Exception as e:
-                print(f"Ошибка генерации видео-скрипта: {e}")
+        images = list(carousel)
+        if image_url:
+            images.append(image_url)
+        if images and posts:
+            posts[0].image_url = images[0]
+            # Карусель публикуется альбомом (Telegram — sendMediaGroup)
+            if carousel:
+                posts[0].image_urls = images
+        
+        video_scripts = [video_script] if video_script else []
         
         return GeneratedContent(
             posts=posts,
             images=images,
             video_scripts=video_scripts,
-            hashtags=hashtags
+            hashtags=hashtags,
+            validation=validation,
+            variants=variants or []
+        )
+
+    async def _generate_checked_posts(
+        self,
+        product_info: Dict[str, Any],
+        count: int,
+        tone: str,
+        platforms: Optional[List[PlatformType]]
+    ) -> Tuple[List[str], PostValidationReport]:
+        """Посты под лимиты платформ публикации и отчёт их проверки и починки
+
+        Проверку и догенерацию отбракованных постов выполняет
+        generate_social_media_posts; отчёт считает её реальные запросы.
+        """
+        constraints = PostConstraints.for_platforms(platforms)
+        report = PostValidationReport()
+        texts = await self.ai_service.generate_social_media_posts(
+            product_info=product_info,
+            count=count,
+            tone=tone,
+            max_chars=constraints.max_chars,
+            report=report
+        )
+        return texts, report
+
+    async def _run_stage(self, name: str, coro: Awaitable[Any], timeout: float) -> Any:
+        """Обязательный этап генерации: ошибка или таймаут прерывают генерацию"""
+        try:
+            return await asyncio.wait_for(coro, timeout)
+        except asyncio.TimeoutError:
+            raise Exception(f"Этап генерации «{name}» превысил таймаут {timeout:g} с")
+
+    async def _run_optional_stage(
+        self,
+        error_message: str,
+        coro: Awaitable[Any],
+        timeout: float
+    ) -> Optional[Any]:
+        """Необязательный этап: при ошибке или таймауте продолжаем без результата"""
+        try:
+            return await asyncio.wait_for(coro, timeout)
+        except asyncio.TimeoutError:
+            print(f"{error_message}: превышен таймаут {timeout:g} с")
+        except Exception as e:
+            print(f"{error_message}: {e}")
+        return None
+
+    def _hashtags(
+        self,
+        product: Product,
+        product_info: Dict[str, Any],
+        count: int = 5
+    ) -> Awaitable[List[str]]:
+        """Хештеги продукта: генерируются заново, только если продукт изменился"""
+        return self.memo.get_or_create(
+            product,
+            "hashtags",
+            lambda: self.ai_service.generate_hashtags(product_info=product_info, count=count),
+            count
+        )
+
+    def _image_prompt(self, product: Product, product_info: Dict[str, Any]) -> Awaitable[str]:
+        """Промпт изображения продукта: генерируется заново, только если продукт изменился"""
+        return self.memo.get_or_create(
+            product,
+            "image_prompt",
+            lambda: self.ai_service.generate_image_prompt(product_info)
+        )
+
+    async def _generate_image_branch(
+        self,
+        product: Product,
+        product_info: Dict[str, Any]
+    ) -> Optional[str]:
+        """Ветка изображения: промпт, затем сама картинка"""
+        image_prompt = await self._run_optional_stage(
+            "Ошибка генерации промпта изображения",
+            self._image_prompt(product, product_info),
+            timeout=settings.CONTENT_STAGE_TIMEOUT_SECONDS
+        )
+        if not image_prompt:
+            return None
+        # продолжаем без изображения, если генерация не удалась
+        return await self._run_optional_stage(
+            "Ошибка генерации изображения",
+            self.ai_service.generate_image(image_prompt),
+            timeout=settings.IMAGE_STAGE_TIMEOUT_SECONDS
         )
 
+    async def _generate_carousel_branch(self, product: Product, count: int) -> List[str]:
+        """Ветка карусели: count изображений по одному промпту продукта"""
+        results = await self._run_optional_stage(
+            "Ошибка генерации изображений карусели",
+            self.generate_images(product, count),
+            timeout=settings.IMAGE_STAGE_TIMEOUT_SECONDS
+        ) or []
+        failed = [result for result in results if not result.success]
+        if failed:
+            print(f"Ошибка генерации изображений карусели: {len(failed)} из {count} не получены")
+        return [result.value for result in results if result.success and result.value]
+
+    async def stream_posts(
+        self,
+        product: Product,
+        request: ContentGenerationRequest
+    ) -> AsyncIterator[PostCreate]:
+        """Потоковая генерация постов: PostCreate отдаётся сразу по готовности"""
+        
+        product_info = {
+            "name": product.name,
+            "description": product.description,
+            "target_audience": product.target_audience,
+            "category": product.category,
+            "keywords": product.keywords or []
+        }
+        
+        # Хештеги генерируются параллельно с первым постом
+        hashtags_task = asyncio.create_task(self._hashtags(product, product_info))
+        
+        try:
+            async for text in self.ai_service.stream_social_media_posts(
+                product_info=product_info,
+                count=request.post_count,
+                tone=request.tone,
+                max_chars=PostConstraints.for_platforms(request.platforms).max_chars
+            ):
+                hashtags = await hashtags_task
+                yield PostCreate(
+                    product_id=product.id,
+                    text=text,
+                    hashtags=hashtags,
+                    platforms=request.platforms,
+                    content_type=request.content_type
+                )
+        finally:
+            if not hashtags_task.done():
+                hashtags_task.cancel()
+
     async def generate_posts(
         self, 
         product: Product, 
@@ -124,16 +301,11 @@ class ContentGenerator:
             "keywords": product.keywords or []
         }
         
-        post_texts = await self.ai_service.generate_social_media_posts(
-            product_info=product_info,
-            count=count,
-            tone=tone
+        post_texts, _ = await self._generate_checked_posts(
+            product_info, count, tone, product.platforms
         )
         
-        hashtags = await self.ai_service.generate_hashtags(
-            product_info=product_info,
-            count=5
-        )
+        hashtags = await self._hashtags(product, product_info)
         
         posts = []
         for text in post_texts:
@@ -148,8 +320,64 @@ class ContentGenerator:
         
         return posts
 
-    async def generate_images(self, product: Product, count: int = 3) -> List[str]:
-        """Генерация изображений для продукта"""
+    async def generate_post_variants(
+        self,
+        product: Product,
+        count: int = 3,
+        tone: str = "professional",
+        platforms: Optional[List[PlatformType]] = None
+    ) -> List[ContentVariant]:
+        """Варианты одного поста для A/B-теста, лучшие по локальной оценке первыми
+
+        Все варианты приходят одним запросом через параметр n; оценка
+        учитывает платформы публикации, хештеги и ключевые слова продукта.
+        """
+        
+        platforms = platforms or product.platforms
+        product_info = {
+            "name": product.name,
+            "description": product.description,
+            "target_audience": product.target_audience,
+            "category": product.category,
+            "keywords": product.keywords or []
+        }
+        
+        texts, hashtags = await asyncio.gather(
+            self.ai_service.generate_post_variants(
+                product_info,
+                n=count,
+                tone=tone,
+                max_chars=PostConstraints.for_platforms(platforms).max_chars
+            ),
+            self._hashtags(product, product_info)
+        )
+        
+        posts = [
+            PostCreate(product_id=product.id, text=text, hashtags=hashtags, platforms=platforms)
+            for text in texts
+        ]
+        results = self.scorer.score_batch(posts, product.keywords or [])
+        variants = [
+            ContentVariant(
+                text=text,
+                score=result["score"],
+                scores=result["scores"],
+                recommendations=result["recommendations"]
+            )
+            for text, result in zip(texts, results)
+        ]
+        return sorted(variants, key=lambda variant: variant.score, reverse=True)
+
+    async def generate_image_prompt_variants(
+        self,
+        product: Product,
+        count: int = 3
+    ) -> List[ContentVariant]:
+        """Варианты промпта изображения одним запросом через параметр n
+
+        Локальный оценщик рассчитан на текст поста, поэтому промпты не
+        оцениваются и идут в порядке ответа модели.
+        """
         
         product_info = {
             "name": product.name,
@@ -158,20 +386,47 @@ class ContentGenerator:
             "category": product.category
         }
         
-        image_prompt = await self.ai_service.generate_image_prompt(product_info)
-        images = []
+        prompts = await self.ai_service.generate_image_prompt_variants(product_info, n=count)
+        return [ContentVariant(text=prompt) for prompt in prompts]
+
+    async def generate_images(
+        self,
+        product: Product,
+        count: int = 3,
+        concurrency: Optional[int] = None
+    ) -> List[AssetResult]:
+        """Генерация изображений для продукта
+
+        Запросы идут параллельно (не больше concurrency одновременно) и по
+        возможности пачками через параметр n модели.
+        """
+        
+        product_info = {
+            "name": product.name,
+            "description": product.description,
+            "target_audience": product.target_audience,
+            "category": product.category
+        }
         
-        for _ in range(count):
-            try:
-                image_url = await self.ai_service.generate_image(image_prompt)
-                images.append(image_url)
-            except Exception as e:
-                print(f"Ошибка генерации изображения: {e}")
+        image_prompt = await self._image_prompt(product, product_info)
+        engine = BulkAssetEngine(concurrency or settings.BULK_ASSET_CONCURRENCY)
         
-        return images
+        return await engine.run(
+            count=count,
+            batch_size=self.ai_service.max_images_per_request(),
+            produce=lambda n: self.ai_service.generate_images(image_prompt, n=n)
+        )
 
-    async def generate_video_scripts(self, product: Product, count: int = 2) -> List[str]:
-        """Генерация видео-скриптов"""
+    async def generate_video_scripts(
+        self,
+        product: Product,
+        count: int = 2,
+        concurrency: Optional[int] = None
+    ) -> List[AssetResult]:
+        """Генерация видео-скриптов
+
+        Несколько скриптов запрашиваются одним вызовом через параметр n.
+        """
         
         product_info = {
             "name": product.name,
@@ -179,15 +434,13 @@ class ContentGenerator:
             "target_audience": product.target_audience
         }
         
-        scripts = []
-        for _ in range(count):
-            try:
-                script = await self.ai_service.generate_video_script(product_info)
-                scripts.append(script)
-            except Exception as e:
-                print(f"Ошибка генерации видео-скрипта: {e}")
+        engine = BulkAssetEngine(concurrency or settings.BULK_ASSET_CONCURRENCY)
         
-        return scripts
+        return await engine.run(
+            count=count,
+            batch_size=settings.BULK_MAX_TEXT_CHOICES,
+            produce=lambda n: self.ai_service.generate_video_scripts(product_info, n=n)
+        )
 
     async def optimize_content_for_platform(
         self, 
@@ -196,57 +449,72 @@ class ContentGenerator:
     ) -> PostCreate:
         """Оптимизация контента под конкретную платформу"""
         
-        platform_optimizations = {
-            PlatformType.INSTAGRAM: {
-                "max_length": 2200,
-                "hashtag_count": 30,
-                "emoji_usage": "high"
-            },
-            PlatformType.FACEBOOK: {
-                "max_length": 63206,
-                "hashtag_count": 5,
-                "emoji_usage": "medium"
-            },
-            PlatformType.TWITTER: {
-                "max_length": 280,
-                "hashtag_count": 3,
-                "emoji_usage": "medium"
-            },
-            PlatformType.TELEGRAM: {
-                "max_length": 4096,
-                "hashtag_count": 10,
-                "emoji_usage": "high"
-            }
-        }
-        
-        optimization = platform_optimizations.get(platform, {})
+        optimization = PLATFORM_LIMITS.get(platform, DEFAULT_PLATFORM_LIMITS)
         
         # Обрезаем текст если нужно
-        if len(post.text) > optimization.get("max_length", 1000):
+        if len(post.text) > optimization["max_length"]:
             post.text = post.text[:optimization["max_length"]-3] + "..."
         
         # Ограничиваем количество хештегов
-        max_hashtags = optimization.get("hashtag_count", 5)
+        max_hashtags = optimization["hashtag_count"]
         if len(post.hashtags) > max_hashtags:
             post.hashtags = post.hashtags[:max_hashtags]
         
         return post
 
-    async def analyze_content_effectiveness(self, post: PostCreate) -> Dict[str, Any]:
-        """Анализ эффективности контента"""
+    async def analyze_content_effectiveness(
+        self,
+        post: PostCreate,
+        use_llm: bool = False,
+        keywords: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """Анализ эффективности контента
+
+        По умолчанию пост оценивается локально, без обращения к LLM;
+        use_llm=True запрашивает развёрнутый разбор у модели.
+        """
+        
+        if use_llm:
+            return await self.ai_service.analyze_content_performance(post.text)
+        return self.scorer.score(post, keywords)
+
+    def analyze_posts(
+        self,
+        posts: List[PostCreate],
+        keywords: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """Локальная оценка пачки постов (например, всего календаря) за один проход"""
         
-        return await self.ai_service.analyze_content_performance(post.text)
+        return self.scorer.score_batch(posts, keywords)
 
     async def generate_content_calendar(
         self, 
         product: Product, 
         days: int = 30,
-        posts_per_day: int = 1
+        posts_per_day: int = 1,
+        concurrency: Optional[int] = None
     ) -> List[Dict[str, Any]]:
-        """Генерация календаря контента"""
+        """Генерация календаря контента
+
+        Посты запрашиваются частями до CALENDAR_CHUNK_POSTS постов. Части
+        генерируются параллельно, недостающие посты догенерируются,
+        порядок дат сохраняется.
+        """
         
         total_posts = days * posts_per_day
-        posts = await self.generate_posts(product, count=total_posts)
+        posts = await self._generate_calendar_posts(
+            product, total_posts, concurrency or settings.CALENDAR_CONCURRENCY
+        )
+        
+        return self._calendar_entries(product, posts, posts_per_day)
+
+    def _calendar_entries(
+        self,
+        product: Product,
+        posts: List[PostCreate],
+        posts_per_day: int
+    ) -> List[Dict[str, Any]]:
+        """Раскладка постов по датам календаря"""
         
         calendar = []
         current_date = datetime.now()
@@ -263,3 +531,238 @@ class ContentGenerator:
             })
         
         return calendar
+
+    def _calendar_chunk_sizes(self, total_posts: int) -> List[int]:
+        """Размеры частей календаря: не больше CALENDAR_CHUNK_POSTS постов на вызов
+
+        Небольшие части укладываются в таймаут запроса и генерируются
+        параллельно, а не несколькими огромными ответами подряд.
+        """
+        chunk_size = max(1, min(settings.CALENDAR_CHUNK_POSTS, self.ai_service.posts_per_request()))
+        return [
+            min(chunk_size, total_posts - start)
+            for start in range(0, total_posts, chunk_size)
+        ]
+
+    async def _generate_calendar_posts(
+        self,
+        product: Product,
+        total_posts: int,
+        concurrency: int
+    ) -> List[PostCreate]:
+        """Генерация total_posts постов частями с догенерацией недостающих"""
+        
+        product_info = {
+            "name": product.name,
+            "description": product.description,
+            "target_audience": product.target_audience,
+            "category": product.category,
+            "keywords": product.keywords or []
+        }
+        
+        constraints = PostConstraints.for_platforms(product.platforms)
+        sizes = self._calendar_chunk_sizes(total_posts)
+        chunks: List[List[str]] = [[] for _ in sizes]
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def fill_chunk(index: int):
+            missing = sizes[index] - len(chunks[index])
+            async with semaphore:
+                try:
+                    # Без кэша: одинаковые промпты частей должны давать разные посты
+                    texts = await self.ai_service.generate_social_media_posts(
+                        product_info=product_info,
+                        count=missing,
+                        use_cache=False,
+                        series_part=(index + 1, len(sizes)),
+                        max_chars=constraints.max_chars
+                    )
+                except Exception as e:
+                    print(f"Ошибка генерации части календаря {index + 1}: {e}")
+                    return
+            chunks[index].extend(texts[:missing])
+        
+        hashtags_task = asyncio.create_task(self._hashtags(product, product_info))
+        
+        validator = PostValidator(constraints)
+        duplicates = 0
+        pending = list(range(len(sizes)))
+        for _ in range(1 + settings.CALENDAR_MAX_TOPUP_ROUNDS):
+            await asyncio.gather(*(fill_chunk(index) for index in pending))
+            # Части генерируются независимо: повторы между ними убираем,
+            # и их слоты догенерируются вместе с недостающими
+            duplicates += self._drop_cross_chunk_duplicates(chunks, validator)
+            pending = [
+                index for index, size in enumerate(sizes)
+                if len(chunks[index]) < size
+            ]
+            if not pending:
+                break
+        
+        hashtags = await hashtags_task
+        generated = sum(len(chunk) for chunk in chunks)
+        if pending:
+            raise Exception(
+                f"Ошибка генерации календаря: получено {generated} постов из {total_posts}"
+            )
+        
+        if duplicates:
+            print(f"Проверка календаря: заменено повторов между частями: {duplicates}")
+        
+        texts = [text for chunk in chunks for text in chunk]
+        return [
+            PostCreate(
+                product_id=product.id,
+                text=text,
+                hashtags=hashtags,
+                platforms=product.platforms,
+                content_type=ContentType.POST
+            )
+            for text in texts
+        ]
+
+    @staticmethod
+    def _drop_cross_chunk_duplicates(chunks: List[List[str]], validator: PostValidator) -> int:
+        """Удаление постов, повторяющих посты предыдущих частей; возвращает число удалённых"""
+        accepted: List[str] = []
+        dropped = 0
+        for chunk in chunks:
+            reasons = validator.check(chunk, accepted)
+            kept = [text for text, reason in zip(chunk, reasons) if reason is None]
+            dropped += len(chunk) - len(kept)
+            chunk[:] = kept
+            accepted.extend(kept)
+        return dropped
+
+    async def generate_content_calendars_batch(
+        self,
+        products: List[Product],
+        days: int = 30,
+        posts_per_day: int = 1,
+        poll_interval: Optional[float] = None
+    ) -> Dict[int, List[Dict[str, Any]]]:
+        """Календари для многих продуктов через Batch API
+
+        Для ночных сборок, где не нужна интерактивная задержка: все части
+        постов и хештеги всех продуктов уходят одним пакетом, ответы
+        сопоставляются по custom_id. Неудавшиеся части отправляются
+        повторными пакетами. Продукты, для которых не набралось постов,
+        в результат не попадают.
+        """
+        
+        total_posts = days * posts_per_day
+        sizes = self._calendar_chunk_sizes(total_posts)
+        
+        infos = {}
+        constraints = {}
+        for product in products:
+            constraints[product.id] = PostConstraints.for_platforms(product.platforms)
+            infos[product.id] = {
+                "name": product.name,
+                "description": product.description,
+                "target_audience": product.target_audience,
+                "category": product.category,
+                "keywords": product.keywords or []
+            }
+        chunks = {
+            (product.id, index): []
+            for product in products
+            for index in range(len(sizes))
+        }
+        # Хештеги уже известных продуктов в пакет не отправляем
+        hashtags: Dict[int, List[str]] = {}
+        for product in products:
+            memoized = self.memo.get(product, "hashtags", 5)
+            if memoized is not None:
+                hashtags[product.id] = memoized
+        
+        def chunk_id(product_id: int, index: int) -> str:
+            return f"calendar-{product_id}-{index}"
+        
+        pending = list(chunks)
+        for _ in range(1 + settings.CALENDAR_MAX_TOPUP_ROUNDS):
+            requests = [
+                self.ai_service.hashtags_batch_request(f"hashtags-{product.id}", infos[product.id])
+                for product in products
+                if product.id not in hashtags
+            ]
+            requests += [
+                self.ai_service.posts_batch_request(
+                    chunk_id(product_id, index),
+                    infos[product_id],
+                    count=sizes[index] - len(chunks[(product_id, index)]),
+                    series_part=(index + 1, len(sizes)),
+                    constraints=constraints[product_id]
+                )
+                for product_id, index in pending
+            ]
+            results = await self.ai_service.run_batch(requests, poll_interval=poll_interval)
+            
+            for product in products:
+                result = results.get(f"hashtags-{product.id}")
+                if result is not None:
+                    parsed = self.ai_service.parse_hashtags(result.texts[0], 5) if result.success else []
+                    if parsed:
+                        hashtags[product.id] = parsed
+                        self.memo.set(product, "hashtags", parsed, 5)
+                    elif result.success:
+                        print(f"Ошибка генерации хештегов для продукта {product.id}: ответ не по схеме")
+                    else:
+                        print(f"Ошибка генерации хештегов для продукта {product.id}: {result.error}")
+            
+            for product_id, index in pending:
+                result = results[chunk_id(product_id, index)]
+                missing = sizes[index] - len(chunks[(product_id, index)])
+                if result.success:
+                    texts = self.ai_service.parse_posts(result.texts[0], missing, constraints[product_id])
+                    chunks[(product_id, index)].extend(texts[:missing])
+                else:
+                    print(f"Ошибка генерации части календаря {product_id}/{index + 1}: {result.error}")
+            
+            # Как и в интерактивном календаре: повторы между частями убираются,
+            # их слоты догенерируются следующим пакетом
+            for product in products:
+                duplicates = self._drop_cross_chunk_duplicates(
+                    [chunks[(product.id, index)] for index in range(len(sizes))],
+                    PostValidator(constraints[product.id])
+                )
+                if duplicates:
+                    print(
+                        f"Проверка календаря продукта {product.id}: "
+                        f"заменено повторов между частями: {duplicates}"
+                    )
+            
+            pending = [
+                key for key in chunks
+                if len(chunks[key]) < sizes[key[1]]
+            ]
+            if not pending and len(hashtags) == len(products):
+                break
+        
+        calendars = {}
+        for product in products:
+            texts = [text for index in range(len(sizes)) for text in chunks[(product.id, index)]]
+            if len(texts) < total_posts:
+                print(
+                    f"Ошибка генерации календаря для продукта {product.id}: "
+                    f"получено {len(texts)} постов из {total_posts}"
+                )
+                continue
+            posts = [
+                PostCreate(
+                    product_id=product.id,
+                    text=text,
+                    hashtags=hashtags.get(product.id, []),
+                    platforms=product.platforms,
+                    content_type=ContentType.POST
+                )
+                for text in texts
+            ]
+            calendars[product.id] = self._calendar_entries(product, posts, posts_per_day)
+        
+        return calendars
+
+
+def get_content_generator() -> ContentGenerator:
+    """Зависимость FastAPI: генератор поверх общего OpenAIService"""
+    return ContentGenerator(get_openai_service())
@@ -0,0 +1,136 @@
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+import hashlib
+import json
+import time
+
+from app.core.config import settings
+from app.models.product import Product
+from app.services.ai.singleflight import SingleFlight
+
+
+T = TypeVar("T")
+
+
+def product_fingerprint(product: Product) -> str:
+    """Отпечаток полей продукта, от которых зависят хештеги и промпт изображения"""
+    raw = json.dumps(
+        [
+            product.name,
+            product.description,
+            product.category,
+            sorted(product.keywords or []),
+            product.target_audience
+        ],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ProductMemo:
+    """Результаты генерации, привязанные к продукту (хештеги, промпт изображения)
+
+    Значение хранится под (id продукта, вид, параметры) вместе с отпечатком
+    продукта и отдаётся, пока отпечаток не изменится. ttl — необязательный
+    срок, после которого значение генерируется заново (None — без срока).
+    Одновременные запросы одного значения ждут одну генерацию.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[str, Optional[float], Any]]" = OrderedDict()
+        self.singleflight = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _key(product: Product, kind: str, params: Tuple[Any, ...]) -> str:
+        # Продукт без id (ещё не сохранён) узнаём только по отпечатку
+        owner = product.id if getattr(product, "id", None) is not None else product_fingerprint(product)
+        return json.dumps([owner, kind, *params], ensure_ascii=False, default=str)
+
+    def get(self, product: Product, kind: str, *params: Any) -> Optional[Any]:
+        """Сохранённое значение (None, если его нет, продукт изменился или истёк ttl)"""
+        if not settings.PRODUCT_MEMO_ENABLED:
+            return None
+        key = self._key(product, kind, params)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        fingerprint, expires_at, value = entry
+        if fingerprint != product_fingerprint(product) or (
+            expires_at is not None and expires_at <= time.monotonic()
+        ):
+            del self._entries[key]
+            self.invalidations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, product: Product, kind: str, value: Any, *params: Any):
+        """Сохранение значения для текущего состояния продукта"""
+        if not settings.PRODUCT_MEMO_ENABLED or self.max_size <= 0:
+            return
+        key = self._key(product, kind, params)
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        self._entries[key] = (product_fingerprint(product), expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def get_or_create(
+        self,
+        product: Product,
+        kind: str,
+        create: Callable[[], Awaitable[T]],
+        *params: Any
+    ) -> T:
+        """Сохранённое значение или результат create(); пустой результат не сохраняется"""
+        if not settings.PRODUCT_MEMO_ENABLED:
+            return await create()
+
+        value = self.get(product, kind, *params)
+        if value is not None:
+            return value
+
+        async def fetch() -> T:
+            result = await create()
+            if result:
+                self.set(product, kind, result, *params)
+            return result
+
+        flight_key = f"{self._key(product, kind, params)}:{product_fingerprint(product)}"
+        return await self.singleflight.do(flight_key, fetch)
+
+    def invalidate(self, product_id: int):
+        """Удаление всех значений продукта (например, после его удаления)"""
+        prefix = json.dumps([product_id])[:-1] + ","
+        for key in [key for key in self._entries if key.startswith(prefix)]:
+            del self._entries[key]
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Счётчики попаданий и промахов"""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }
+
+
+# Память общая для всех генераторов процесса
+product_memo = ProductMemo(
+    max_size=settings.PRODUCT_MEMO_MAX_SIZE,
+    ttl=settings.PRODUCT_MEMO_TTL_SECONDS
+)
@@ -0,0 +1,181 @@
+from typing import Any, Dict, List, Optional
+import re
+
+from app.models.content import PostCreate
+from app.models.product import PlatformType
+
+
+# Комфортная длина текста (символы) и уместная плотность эмодзи по платформам
+PLATFORM_SCORING_PROFILES = {
+    PlatformType.INSTAGRAM: {"ideal_length": (150, 1500), "max_length": 2200, "emoji_per_100_words": (0.5, 6.0)},
+    PlatformType.FACEBOOK: {"ideal_length": (80, 1200), "max_length": 63206, "emoji_per_100_words": (0.0, 3.0)},
+    PlatformType.TWITTER: {"ideal_length": (70, 260), "max_length": 280, "emoji_per_100_words": (0.0, 4.0)},
+    PlatformType.TELEGRAM: {"ideal_length": (300, 2500), "max_length": 4096, "emoji_per_100_words": (0.0, 3.0)},
+    PlatformType.LINKEDIN: {"ideal_length": (300, 2000), "max_length": 3000, "emoji_per_100_words": (0.0, 2.0)}
+}
+DEFAULT_PLATFORM = PlatformType.TELEGRAM
+
+# Вес каждой метрики в итоговой оценке
+SCORE_WEIGHTS = {
+    "readability": 0.25,
+    "length_fit": 0.2,
+    "emoji_density": 0.1,
+    "call_to_action": 0.2,
+    "hashtag_relevance": 0.25
+}
+
+_WORD_RE = re.compile(r"[A-Za-zА-Яа-яЁё0-9]+")
+_SENTENCE_RE = re.compile(r"[.!?…]+(?:\s|$)")
+_VOWELS = "аеёиоуыэюяaeiouy"
+_EMOJI_RE = re.compile(
+    "[\U0001F300-\U0001FAFF\U00002600-\U000027BF\U0001F000-\U0001F2FF\U00002B00-\U00002BFF]"
+)
+_CTA_RE = re.compile(
+    r"\b(подпиш|переход|узна|закаж|заказ|купи|покуп|жми|нажм|пиш|звон|остав|регистр|"
+    r"попробу|скача|присоедин|сохран|поделит|ссылк|в комментар|в директ|"
+    r"subscribe|follow|click|buy|order|sign up|learn more|link)"
+)
+
+
+def _stem(word: str) -> str:
+    """Грубая основа слова для сравнения хештегов с ключевыми словами"""
+    return word.lower()[:5]
+
+
+def _clamp(value: float) -> float:
+    return max(1.0, min(10.0, value))
+
+
+def _range_score(value: float, low: float, high: float, below: float, above: float) -> float:
+    """10 внутри [low, high], линейно до 1 при отклонении вниз на below или вверх на above"""
+    if value < low:
+        return _clamp(10.0 - 9.0 * (low - value) / below) if below > 0 else 1.0
+    if value > high:
+        return _clamp(10.0 - 9.0 * (value - high) / above) if above > 0 else 1.0
+    return 10.0
+
+
+class ContentScorer:
+    """Локальная эвристическая оценка постов без обращения к LLM
+
+    Считает читабельность (формула Флеша для русского текста), попадание в
+    комфортную длину платформы, плотность эмодзи, наличие призыва к
+    действию и релевантность хештегов ключевым словам продукта. Пачка
+    постов оценивается обычным циклом на Python (numpy в зависимостях нет);
+    общего на пачку только разбор ключевых слов продукта.
+    """
+
+    def score(self, post: PostCreate, keywords: Optional[List[str]] = None) -> Dict[str, Any]:
+        return self.score_batch([post], keywords)[0]
+
+    def score_text(self, text: str, keywords: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Оценка голого текста (платформа по умолчанию, без хештегов)"""
+        post = PostCreate(product_id=0, text=text, platforms=[])
+        return self.score(post, keywords)
+
+    def score_batch(
+        self,
+        posts: List[PostCreate],
+        keywords: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """Оценка пачки постов; keywords — ключевые слова продукта"""
+        keyword_stems = {_stem(word) for keyword in (keywords or []) for word in _WORD_RE.findall(keyword)}
+        features = [self._features(post, keyword_stems) for post in posts]
+
+        columns = {
+            "readability": [self._readability(f) for f in features],
+            "length_fit": [self._length_fit(f) for f in features],
+            "emoji_density": [self._emoji_density(f) for f in features],
+            "call_to_action": [10.0 if f["has_cta"] else 3.0 for f in features],
+            "hashtag_relevance": [self._hashtag_relevance(f) for f in features]
+        }
+
+        results = []
+        for index in range(len(posts)):
+            scores = {name: round(values[index], 1) for name, values in columns.items()}
+            overall = sum(SCORE_WEIGHTS[name] * value for name, value in scores.items())
+            results.append({
+                "scores": scores,
+                "score": round(overall, 1),
+                "recommendations": self._recommendations(scores, features[index]),
+                "source": "local"
+            })
+        return results
+
+    def _features(self, post: PostCreate, keyword_stems: set) -> Dict[str, Any]:
+        text = post.text or ""
+        lowered = text.lower()
+        words = _WORD_RE.findall(text)
+        sentences = max(1, len(_SENTENCE_RE.findall(text)))
+        # Слоги считаем по гласным сразу во всём тексте, а не по словам
+        syllables = max(len(words), sum(lowered.count(vowel) for vowel in _VOWELS))
+
+        hashtags = [tag.strip().lstrip("#") for tag in post.hashtags if tag.strip()]
+        # Без ключевых слов продукта сравниваем хештеги с самим текстом
+        reference = keyword_stems or {_stem(word) for word in words if len(word) > 3}
+        relevant = sum(
+            1 for tag in hashtags
+            if any(_stem(part) in reference for part in _WORD_RE.findall(tag))
+        )
+
+        platforms = post.platforms or [DEFAULT_PLATFORM]
+        return {
+            "length": len(text),
+            "words": len(words),
+            "words_per_sentence": len(words) / sentences,
+            "syllables_per_word": syllables / len(words) if words else 0.0,
+            "emoji": len(_EMOJI_RE.findall(text)),
+            "has_cta": bool(_CTA_RE.search(lowered)),
+            "hashtags": len(hashtags),
+            "relevant_hashtags": relevant,
+            "profiles": [
+                PLATFORM_SCORING_PROFILES.get(platform, PLATFORM_SCORING_PROFILES[DEFAULT_PLATFORM])
+                for platform in platforms
+            ]
+        }
+
+    def _readability(self, f: Dict[str, Any]) -> float:
+        if not f["words"]:
+            return 1.0
+        # Формула Флеша с коэффициентами Оборневой для русского языка
+        flesch = 206.835 - 1.3 * f["words_per_sentence"] - 60.1 * f["syllables_per_word"]
+        return _clamp(1.0 + 9.0 * max(0.0, min(100.0, flesch)) / 100.0)
+
+    def _length_fit(self, f: Dict[str, Any]) -> float:
+        scores = []
+        for profile in f["profiles"]:
+            if f["length"] > profile["max_length"]:
+                scores.append(1.0)
+                continue
+            low, high = profile["ideal_length"]
+            scores.append(_range_score(
+                f["length"], low, high, below=low, above=profile["max_length"] - high
+            ))
+        return min(scores)
+
+    def _emoji_density(self, f: Dict[str, Any]) -> float:
+        density = 100.0 * f["emoji"] / f["words"] if f["words"] else 0.0
+        return min(
+            _range_score(density, *profile["emoji_per_100_words"], below=1.0, above=5.0)
+            for profile in f["profiles"]
+        )
+
+    def _hashtag_relevance(self, f: Dict[str, Any]) -> float:
+        if not f["hashtags"]:
+            return 3.0
+        return _clamp(1.0 + 9.0 * f["relevant_hashtags"] / f["hashtags"])
+
+    def _recommendations(self, scores: Dict[str, float], f: Dict[str, Any]) -> List[str]:
+        recommendations = []
+        if scores["readability"] < 6:
+            recommendations.append("Сократите предложения и замените сложные слова более простыми")
+        if scores["length_fit"] < 6:
+            low, high = f["profiles"][0]["ideal_length"]
+            recommendations.append(f"Приведите длину текста к {low}–{high} символам")
+        if scores["emoji_density"] < 6:
+            recommendations.append("Скорректируйте количество эмодзи под платформу")
+        if scores["call_to_action"] < 6:
+            recommendations.append("Добавьте призыв к действию")
+        if scores["hashtag_relevance"] < 6:
+            recommendations.append("Используйте хештеги, связанные с продуктом и ключевыми словами")
+        return recommendations
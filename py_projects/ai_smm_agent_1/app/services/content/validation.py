@@ -0,0 +1,135 @@
+from collections import Counter
+from typing import Dict, List, Optional
+import re
+
+from app.core.config import settings
+from app.models.product import PlatformType
+from app.services.ai import tokens
+
+
+# Ограничения платформ: длина текста (символы), число хештегов, уместность эмодзи
+PLATFORM_LIMITS = {
+    PlatformType.INSTAGRAM: {
+        "max_length": 2200,
+        "hashtag_count": 30,
+        "emoji_usage": "high"
+    },
+    PlatformType.FACEBOOK: {
+        "max_length": 63206,
+        "hashtag_count": 5,
+        "emoji_usage": "medium"
+    },
+    PlatformType.TWITTER: {
+        "max_length": 280,
+        "hashtag_count": 3,
+        "emoji_usage": "medium"
+    },
+    PlatformType.TELEGRAM: {
+        "max_length": 4096,
+        "hashtag_count": 10,
+        "emoji_usage": "high"
+    }
+}
+DEFAULT_PLATFORM_LIMITS = {"max_length": 1000, "hashtag_count": 5}
+
+# Средняя длина русского слова вместе с пробелом, символов
+CHARS_PER_WORD = 7
+
+_WORD_RE = re.compile(r"[A-Za-zА-Яа-яЁё0-9]+")
+
+
+class PostConstraints:
+    """Ограничения на текст поста
+
+    Объём в словах берётся из промпта генерации; max_chars — самый строгий
+    лимит длины среди платформ публикации (пост уходит на все платформы
+    одним текстом). Допуски по объёму задаются POST_MIN_WORDS_RATIO и
+    POST_MAX_WORDS_RATIO.
+    """
+
+    def __init__(self, min_words: int, max_words: int, max_chars: Optional[int] = None):
+        self.min_words = min_words
+        self.max_words = max_words
+        self.max_chars = max_chars
+
+    @classmethod
+    def from_max_chars(cls, max_chars: Optional[int] = None) -> "PostConstraints":
+        max_words = settings.MAX_POST_LENGTH
+        min_words = min(tokens.POST_MIN_WORDS, max_words)
+        if max_chars and max_chars // CHARS_PER_WORD < max_words:
+            # Под короткий лимит платформы сужаем и объём в словах
+            max_words = max(1, max_chars // CHARS_PER_WORD)
+            min_words = min(min_words, max(1, max_words // 2))
+        return cls(min_words, max_words, max_chars)
+
+    @classmethod
+    def for_platforms(cls, platforms: Optional[List[PlatformType]] = None) -> "PostConstraints":
+        limits = [
+            PLATFORM_LIMITS[platform]["max_length"]
+            for platform in platforms or []
+            if platform in PLATFORM_LIMITS
+        ]
+        return cls.from_max_chars(min(limits) if limits else None)
+
+    def check(self, text: str) -> Optional[str]:
+        """Причина, по которой пост не годится, или None"""
+        text = text.strip()
+        words = len(text.split())
+        if words == 0:
+            return "пустой пост"
+        if words < self.min_words * settings.POST_MIN_WORDS_RATIO:
+            return "слишком короткий"
+        if words > self.max_words * settings.POST_MAX_WORDS_RATIO:
+            return "слишком длинный"
+        if self.max_chars and len(text) > self.max_chars:
+            return "длиннее лимита платформы"
+        return None
+
+
+def _shingles(text: str, size: int = 3) -> set:
+    words = [word.lower() for word in _WORD_RE.findall(text)]
+    if len(words) < size:
+        return {tuple(words)}
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _similarity(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class PostValidator:
+    """Проверка набора постов: ограничения на каждый пост и повторы между ними
+
+    Повтором считается пост, чьи словесные триграммы совпадают с одним из
+    предыдущих постов набора не меньше чем на POST_DUPLICATE_SIMILARITY
+    (коэффициент Жаккара); первый из похожих постов остаётся.
+    """
+
+    def __init__(self, constraints: PostConstraints):
+        self.constraints = constraints
+
+    def check(self, texts: List[str], accepted: Optional[List[str]] = None) -> List[Optional[str]]:
+        """Причина отказа для каждого поста (None — пост годится)
+
+        accepted — уже принятые посты, с которыми тоже сравниваются повторы.
+        """
+        seen = [_shingles(text) for text in accepted or []]
+        reasons: List[Optional[str]] = []
+        for text in texts:
+            reason = self.constraints.check(text)
+            shingles = _shingles(text)
+            if reason is None and any(
+                _similarity(shingles, other) >= settings.POST_DUPLICATE_SIMILARITY for other in seen
+            ):
+                reason = "повтор"
+            if reason is None:
+                seen.append(shingles)
+            reasons.append(reason)
+        return reasons
+
+    @staticmethod
+    def summarize(reasons: List[Optional[str]]) -> Dict[str, int]:
+        """Число отказов по причинам"""
+        return dict(Counter(reason for reason in reasons if reason is not None))
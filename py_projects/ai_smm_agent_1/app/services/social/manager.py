@@ -1,4 +1,4 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator, Tuple
 from datetime import datetime
 import asyncio
 import schedule
@@ -27,33 +27,111 @@ class SocialMediaManager:
         self.scheduler_thread = None
         self.is_running = False
 
-    async def publish_post(self, post: PostCreate, platforms: List[PlatformType]) -> Dict[str, Any]:
-        """Публикация поста в указанные платформы"""
+    async def publish_post(
+        self,
+        post: PostCreate,
+        platforms: List[PlatformType],
+        deadline: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Публикация поста в указанные платформы
+
+        Платформы публикуются параллельно, поэтому общее время — время самой
+        медленной из них. Результат каждой платформы сохраняется независимо
+        от остальных, ключи идут в порядке platforms.
+        """
         
         results = {}
+        async for platform, result in self.publish_post_stream(post, platforms, deadline):
+            results[platform] = result
         
-        for platform in platforms:
+        return {
+            platform.value: results[platform.value]
+            for platform in platforms
+            if platform.value in results
+        }
+
+    async def publish_post_stream(
+        self,
+        post: PostCreate,
+        platforms: List[PlatformType],
+        deadline: Optional[float] = None
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """Параллельная публикация: (платформа, результат) по мере завершения
+
+        У каждой платформы свой таймаут (PUBLISH_PLATFORM_TIMEOUTS или
+        PUBLISH_PLATFORM_TIMEOUT_SECONDS). Платформы, не успевшие за общий
+        срок deadline (по умолчанию PUBLISH_DEADLINE_SECONDS), отменяются и
+        получают результат с ошибкой. Если потребитель прекратил чтение,
+        незавершённые публикации отменяются.
+        """
+        
+        deadline = deadline or settings.PUBLISH_DEADLINE_SECONDS
+        loop = asyncio.get_running_loop()
+        expires_at = loop.time() + deadline
+        
+        tasks = {}
+        unsupported = []
+        for platform in dict.fromkeys(platforms):
             if platform in self.platforms:
-                try:
-                    service = self.platforms[platform]
-                    result = await service.publish_post(post)
-                    results[platform.value] = {
-                        "success": True,
-                        "post_id": result.get("post_id"),
-                        "url": result.get("url")
-                    }
-                except Exception as e:
-                    results[platform.value] = {
-                        "success": False,
-                        "error": str(e)
-                    }
+                task = asyncio.create_task(self._publish_to_platform(platform, post))
+                tasks[task] = platform
             else:
-                results[platform.value] = {
+                unsupported.append(platform)
+        
+        pending = set(tasks)
+        try:
+            # Потребитель может остановиться уже здесь — задачи отменит finally
+            for platform in unsupported:
+                yield platform.value, {
                     "success": False,
                     "error": f"Платформа {platform.value} не поддерживается"
                 }
+            while pending:
+                remaining = expires_at - loop.time()
+                if remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(
+                    pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    yield tasks[task].value, task.result()
+            
+            for task in pending:
+                task.cancel()
+            for task in pending:
+                yield tasks[task].value, {
+                    "success": False,
+                    "error": f"Публикация не завершилась за общий срок {deadline:g} с"
+                }
+            pending = set()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _publish_to_platform(self, platform: PlatformType, post: PostCreate) -> Dict[str, Any]:
+        """Публикация в одну платформу с её таймаутом; ошибка становится результатом"""
         
-        return results
+        timeout = settings.PUBLISH_PLATFORM_TIMEOUTS.get(
+            platform.value, settings.PUBLISH_PLATFORM_TIMEOUT_SECONDS
+        )
+        try:
+            service = self.platforms[platform]
+            result = await asyncio.wait_for(service.publish_post(post), timeout)
+            return {
+                "success": True,
+                "post_id": result.get("post_id"),
+                "url": result.get("url")
+            }
+        except asyncio.TimeoutError:
+            return {
+                "success": False,
+                "error": f"Превышен таймаут публикации {timeout:g} с"
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e)
+            }
 
     async def schedule_posts(
         self, 
@@ -0,0 +1,171 @@
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import os
+
+
+class TelegramFileCache:
+    """Постоянное соответствие URL медиа → file_id Telegram
+
+    После первой отправки картинки по URL Telegram возвращает file_id, и
+    следующие отправки того же изображения (в другие каналы, повторные
+    публикации) идут по нему: Telegram не скачивает файл заново, а
+    истёкшие ссылки DALL-E перестают мешать. file_id действует только для
+    выдавшего его бота, поэтому ключ — id бота и SHA-256 от URL (подписанные
+    URL не попадают на диск). Карта хранится в JSON-файле path; изменения
+    копятся save_delay секунд и записываются одним файлом в отдельном
+    потоке, чтобы массовая рассылка не блокировала цикл событий.
+    """
+
+    def __init__(self, path: str, max_size: int = 10000, save_delay: float = 1.0):
+        self.path = path
+        self.max_size = max_size
+        self.save_delay = save_delay
+        self._entries: Optional[Dict[str, str]] = None
+        self._uploads: Dict[str, asyncio.Future] = {}
+        self._dirty = False
+        self._save_task: Optional[asyncio.Task] = None
+        self._flush_requested: Optional[asyncio.Event] = None
+        self.hits = 0
+        self.misses = 0
+        self.shared_uploads = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _key(bot_token: str, url: str) -> str:
+        # Токен имеет вид "<id бота>:<секрет>" — на диск пишем только id
+        bot_id = str(bot_token).split(":", 1)[0]
+        return f"{bot_id}:{hashlib.sha256(url.encode('utf-8')).hexdigest()}"
+
+    def _load(self) -> Dict[str, str]:
+        if self._entries is None:
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except FileNotFoundError:
+                self._entries = {}
+            except (OSError, ValueError) as e:
+                print(f"Ошибка чтения кэша file_id Telegram: {e}")
+                self._entries = {}
+        return self._entries
+
+    def _write(self, entries: Dict[str, str]):
+        directory = os.path.dirname(self.path)
+        try:
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(entries, f)
+            os.replace(self.path + ".tmp", self.path)
+        except OSError as e:
+            print(f"Ошибка записи кэша file_id Telegram: {e}")
+
+    def _save(self):
+        """Отложенная запись: одна на все изменения за save_delay секунд"""
+        self._dirty = True
+        if self._save_task is None or self._save_task.done():
+            self._flush_requested = asyncio.Event()
+            self._save_task = asyncio.get_running_loop().create_task(
+                self._save_later(self._flush_requested)
+            )
+
+    async def _save_later(self, flush_requested: asyncio.Event):
+        try:
+            await asyncio.wait_for(flush_requested.wait(), self.save_delay)
+        except asyncio.TimeoutError:
+            pass
+        while self._dirty:
+            self._dirty = False
+            # Снимок карты — на цикле событий, сериализация и запись — в потоке
+            await asyncio.to_thread(self._write, dict(self._load()))
+
+    async def flush(self):
+        """Немедленная запись несохранённых изменений (при остановке приложения)"""
+        if self._save_task is not None and not self._save_task.done():
+            self._flush_requested.set()
+            await self._save_task
+        elif self._dirty:
+            self._dirty = False
+            await asyncio.to_thread(self._write, dict(self._load()))
+
+    def get(self, bot_token: str, url: str) -> Optional[str]:
+        """file_id ранее отправленного медиа или None"""
+        file_id = self._load().get(self._key(bot_token, url))
+        if file_id is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return file_id
+
+    async def claim(self, bot_token: str, url: str) -> Tuple[Optional[str], bool]:
+        """(file_id, загружает ли вызывающий сам)
+
+        Если то же медиа прямо сейчас отправляется по URL другим запросом,
+        ждём его file_id, а не качаем файл параллельно. Вызывающий,
+        получивший True, обязан вызвать finish_upload.
+        """
+        key = self._key(bot_token, url)
+        while True:
+            file_id = self._load().get(key)
+            if file_id is not None:
+                self.hits += 1
+                return file_id, False
+            upload = self._uploads.get(key)
+            if upload is None:
+                self.misses += 1
+                self._uploads[key] = asyncio.get_running_loop().create_future()
+                return None, True
+            self.shared_uploads += 1
+            await asyncio.shield(upload)
+
+    async def claim_many(self, bot_token: str, urls: List[str]) -> Tuple[Dict[str, str], List[str]]:
+        """claim для набора медиа (альбома): найденные file_id и URL, загружаемые вызывающим
+
+        Медиа захватываются в одном порядке (по ключу), поэтому два альбома
+        с общими изображениями не ждут друг друга по кругу.
+        """
+        cached: Dict[str, str] = {}
+        owned: List[str] = []
+        try:
+            for url in sorted(set(urls), key=lambda url: self._key(bot_token, url)):
+                file_id, owner = await self.claim(bot_token, url)
+                if owner:
+                    owned.append(url)
+                else:
+                    cached[url] = file_id
+        except BaseException:
+            for url in owned:
+                self.finish_upload(bot_token, url, None)
+            raise
+        return cached, owned
+
+    def finish_upload(self, bot_token: str, url: str, file_id: Optional[str]):
+        """Завершение отправки по URL: сохранение file_id и пробуждение ожидающих"""
+        key = self._key(bot_token, url)
+        if file_id:
+            entries = self._load()
+            entries.pop(key, None)
+            entries[key] = file_id
+            while len(entries) > self.max_size:
+                del entries[next(iter(entries))]
+            self._save()
+        upload = self._uploads.pop(key, None)
+        if upload is not None and not upload.done():
+            upload.set_result(None)
+
+    def discard(self, bot_token: str, url: str):
+        """Удаление file_id, который Telegram больше не принимает"""
+        if self._load().pop(self._key(bot_token, url), None) is not None:
+            self.invalidations += 1
+            self._save()
+
+    def stats(self) -> Dict[str, Any]:
+        """Счётчики попаданий и промахов"""
+        return {
+            "size": len(self._load()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "shared_uploads": self.shared_uploads,
+            "invalidations": self.invalidations
+        }
@@ -1,17 +1,123 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 import asyncio
 import aiohttp
 
 from app.models.content import PostCreate
 from app.core.config import settings
+from app.core.circuit_breaker import CircuitOpenError, circuit_breaker, circuit_guard
+from app.services.social.media_cache import TelegramFileCache
+from app.services.social.rate_limiter import TelegramRateLimiter
+
+
+# Общие HTTP-сессии на весь процесс: одна на платформу (и цикл событий)
+_sessions: Dict[str, Tuple[asyncio.AbstractEventLoop, aiohttp.ClientSession]] = {}
+
+# Лимиты Bot API относятся к токену бота, поэтому очередь тоже общая
+telegram_rate_limiter = TelegramRateLimiter(
+    messages_per_second=settings.TELEGRAM_MESSAGES_PER_SECOND,
+    chat_messages_per_minute=settings.TELEGRAM_CHAT_MESSAGES_PER_MINUTE,
+    burst=settings.TELEGRAM_BURST,
+    chat_burst=settings.TELEGRAM_CHAT_BURST
+)
+
+# Telegram принимает в альбоме от 2 до 10 элементов
+TELEGRAM_MEDIA_GROUP_MAX = 10
+
+# file_id загруженных изображений переживают перезапуск процесса
+telegram_file_cache = TelegramFileCache(
+    path=settings.TELEGRAM_FILE_CACHE_PATH,
+    max_size=settings.TELEGRAM_FILE_CACHE_MAX_SIZE
+)
+
+
+class TelegramResponseError(Exception):
+    """Ответ Bot API с ошибкой (401/403, 5xx и прочие неуспешные ответы)"""
+
+    def __init__(self, status: int, data: Dict[str, Any]):
+        super().__init__(f"Telegram API error {status}: {data}")
+        self.status = status
+        self.data = data or {}
+        self.description = str(self.data.get("description") or "")
+
+
+class TelegramAPIError(TelegramResponseError):
+    """Bot API отклонил сам запрос (4xx, кроме 401/403/429)
+
+    Это ошибка поста (разметка, длина подписи, неверный чат), а не сбой
+    Telegram, поэтому предохранитель платформы её не учитывает.
+    """
+
+
+class TelegramRateLimitError(TelegramResponseError):
+    """429: запрос повторяется после паузы retry_after, сбоем не считается"""
+
+    @property
+    def retry_after(self) -> Optional[float]:
+        return (self.data.get("parameters") or {}).get("retry_after")
+
+
+def _raise_for_response(status: int, data: Dict[str, Any]):
+    """Исключение по неуспешному ответу Bot API"""
+    if status == 200 and data.get("ok"):
+        return
+    if status == 429:
+        raise TelegramRateLimitError(status, data)
+    if 400 <= status < 500 and status not in (401, 403):
+        raise TelegramAPIError(status, data)
+    # 401/403 — неверный токен или бота убрали из канала; 5xx — сбой Telegram
+    raise TelegramResponseError(status, data)
+
+
+def create_platform_session() -> aiohttp.ClientSession:
+    """Создание HTTP-сессии с пулом keep-alive соединений и кэшем DNS"""
+    connector = aiohttp.TCPConnector(
+        limit=settings.SOCIAL_HTTP_MAX_CONNECTIONS,
+        limit_per_host=settings.SOCIAL_HTTP_MAX_CONNECTIONS_PER_HOST,
+        keepalive_timeout=settings.SOCIAL_HTTP_KEEPALIVE_SECONDS,
+        ttl_dns_cache=settings.SOCIAL_HTTP_DNS_CACHE_SECONDS,
+        use_dns_cache=True
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=settings.SOCIAL_HTTP_TIMEOUT_SECONDS, connect=10.0)
+    )
+
+
+async def close_platform_sessions():
+    """Закрытие общих сессий платформ при остановке приложения"""
+    sessions = list(_sessions.values())
+    _sessions.clear()
+    for _, session in sessions:
+        if not session.closed:
+            await session.close()
 
 
 class BaseSocialPlatform(ABC):
     """Базовый класс для работы с социальными платформами"""
     
-    def __init__(self):
+    # Имя платформы: ключ общей HTTP-сессии
+    name: str = ""
+    
+    def __init__(self, session: Optional[aiohttp.ClientSession] = None):
         self.is_connected = False
+        self._session = session
+    
+    def get_session(self) -> aiohttp.ClientSession:
+        """HTTP-сессия платформы
+
+        Переданная в конструктор сессия используется как есть; иначе берётся
+        общая сессия платформы, которая создаётся при первом обращении и
+        переживает экземпляры сервиса (менеджер создаётся на каждый запрос).
+        """
+        if self._session is not None:
+            return self._session
+        loop = asyncio.get_running_loop()
+        entry = _sessions.get(self.name)
+        if entry is None or entry[0] is not loop or entry[1].closed:
+            entry = (loop, create_platform_session())
+            _sessions[self.name] = entry
+        return entry[1]
     
     @abstractmethod
     async def connect(self) -> bool:
@@ -49,8 +155,10 @@ class BaseSocialPlatform(ABC):
 class InstagramService(BaseSocialPlatform):
     """Сервис для работы с Instagram"""
     
-    def __init__(self):
-        super().__init__()
+    name = "instagram"
+    
+    def __init__(self, session: Optional[aiohttp.ClientSession] = None):
+        super().__init__(session)
         self.username = settings.INSTAGRAM_USERNAME
         self.password = settings.INSTAGRAM_PASSWORD
     
@@ -63,6 +171,7 @@ class InstagramService(BaseSocialPlatform):
             return True
         return False
     
+    @circuit_breaker("instagram")
     async def publish_post(self, post: PostCreate) -> Dict[str, Any]:
         """Публикация поста в Instagram"""
         if not self.is_connected:
@@ -100,8 +209,10 @@ class InstagramService(BaseSocialPlatform):
 class FacebookService(BaseSocialPlatform):
     """Сервис для работы с Facebook"""
     
-    def __init__(self):
-        super().__init__()
+    name = "facebook"
+    
+    def __init__(self, session: Optional[aiohttp.ClientSession] = None):
+        super().__init__(session)
         self.access_token = settings.FACEBOOK_ACCESS_TOKEN
         self.page_id = settings.FACEBOOK_PAGE_ID
     
@@ -112,6 +223,7 @@ class FacebookService(BaseSocialPlatform):
             return True
         return False
     
+    @circuit_breaker("facebook")
     async def publish_post(self, post: PostCreate) -> Dict[str, Any]:
         """Публикация поста в Facebook"""
         if not self.is_connected:
@@ -149,8 +261,10 @@ class FacebookService(BaseSocialPlatform):
 class TwitterService(BaseSocialPlatform):
     """Сервис для работы с Twitter/X"""
     
-    def __init__(self):
-        super().__init__()
+    name = "twitter"
+    
+    def __init__(self, session: Optional[aiohttp.ClientSession] = None):
+        super().__init__(session)
         self.api_key = settings.TWITTER_API_KEY
         self.api_secret = settings.TWITTER_API_SECRET
         self.access_token = settings.TWITTER_ACCESS_TOKEN
@@ -163,6 +277,7 @@ class TwitterService(BaseSocialPlatform):
             return True
         return False
     
+    @circuit_breaker("twitter")
     async def publish_post(self, post: PostCreate) -> Dict[str, Any]:
         """Публикация твита"""
         if not self.is_connected:
@@ -200,10 +315,20 @@ class TwitterService(BaseSocialPlatform):
 class TelegramService(BaseSocialPlatform):
     """Сервис для работы с Telegram"""
     
-    def __init__(self):
-        super().__init__()
+    name = "telegram"
+    
+    def __init__(
+        self,
+        session: Optional[aiohttp.ClientSession] = None,
+        channel_id: Optional[str] = None
+    ):
+        super().__init__(session)
+        self.api_url = settings.TELEGRAM_API_URL.rstrip("/")
+        self.rate_limiter = telegram_rate_limiter
+        self.file_cache = telegram_file_cache
         self.bot_token = settings.TELEGRAM_BOT_TOKEN
-        self.channel_id = settings.TELEGRAM_CHANNEL_ID
+        # channel_id — публикация в другой канал тем же ботом
+        self.channel_id = channel_id or settings.TELEGRAM_CHANNEL_ID
     
     async def connect(self) -> bool:
         """Подключение к Telegram"""
@@ -241,23 +366,33 @@ class TelegramService(BaseSocialPlatform):
         else:
             message_text = base_text
 
-        # Определяем метод: sendPhoto если есть image_url, иначе sendMessage
-        is_photo = getattr(post, "image_url", None) is not None
-        if is_photo:
-            api_url = f"https://api.telegram.org/bot{self.bot_token}/sendPhoto"
-            # Telegram ограничивает caption до ~1024 символов
-            caption = message_text
-            if len(caption) > 1024:
-                caption = caption[:1021] + "..."
+        # Определяем метод: sendMediaGroup для карусели, sendPhoto если есть
+        # изображение, иначе sendMessage
+        image_urls = list(getattr(post, "image_urls", None) or [])
+        if not image_urls and getattr(post, "image_url", None) is not None:
+            image_urls = [post.image_url]
+        # Telegram ограничивает caption до ~1024 символов
+        caption = message_text
+        if len(caption) > 1024:
+            caption = caption[:1021] + "..."
+        is_album = len(image_urls) > 1
+        is_photo = len(image_urls) == 1
+        if is_album:
+            api_url = f"{self.api_url}/bot{self.bot_token}/sendMediaGroup"
+            payload = {
+                "chat_id": self.channel_id,
+                "disable_notification": False
+            }
+        elif is_photo:
+            api_url = f"{self.api_url}/bot{self.bot_token}/sendPhoto"
             payload = {
                 "chat_id": self.channel_id,
-                "photo": post.image_url,
                 "caption": caption,
                 "parse_mode": "HTML",
                 "disable_notification": False
             }
         else:
-            api_url = f"https://api.telegram.org/bot{self.bot_token}/sendMessage"
+            api_url = f"{self.api_url}/bot{self.bot_token}/sendMessage"
             payload = {
                 "chat_id": self.channel_id,
                 "text": message_text,
@@ -265,24 +400,14 @@ class TelegramService(BaseSocialPlatform):
                 "disable_web_page_preview": False
             }
         
-        async with aiohttp.ClientSession() as session:
-            async def request_with_retry() -> Dict[str, Any]:
-                for attempt in range(3):
-                    try:
-                        async with session.post(api_url, json=payload, timeout=20) as resp:
-                            data = await resp.json()
-                            if resp.status == 200 and data.get("ok"):
-                                return data
-                            # Если ошибка, пробуем повторить (кроме 4xx, кроме rate limit 429)
-                            if 400 <= resp.status < 500 and resp.status != 429:
-                                raise Exception(f"Telegram API error {resp.status}: {data}")
-                    except Exception as e:
-                        if attempt == 2:
-                            raise e
-                        await asyncio.sleep(1.5 * (attempt + 1))
-                raise Exception("Failed to send message to Telegram after retries")
-
-            data = await request_with_retry()
+        if is_album:
+            messages = await self._send_album(api_url, payload, image_urls, caption)
+            # id и ссылка поста — по первому сообщению альбома
+            data = {"result": messages[0] if messages else {}}
+        elif is_photo:
+            data = await self._send_photo(api_url, payload, image_urls[0])
+        else:
+            data = await self._send(api_url, payload)
 
         result = data.get("result", {})
         message_id = result.get("message_id")
@@ -302,6 +427,145 @@ class TelegramService(BaseSocialPlatform):
             "platform": "telegram"
         }
     
+    async def _send_album(
+        self,
+        api_url: str,
+        payload: Dict[str, Any],
+        image_urls: List[str],
+        caption: str
+    ) -> List[Dict[str, Any]]:
+        """Карусель через sendMediaGroup: до 10 изображений в одном запросе
+
+        Больший набор делится на почти равные альбомы (в альбоме должно быть
+        не меньше 2 элементов), подпись — у первого элемента первого альбома.
+        Возвращает отправленные сообщения по порядку.
+        """
+        messages: List[Dict[str, Any]] = []
+        for index, chunk in enumerate(_album_chunks(image_urls)):
+            messages.extend(await self._send_media_group(
+                api_url, payload, chunk, caption if index == 0 else None
+            ))
+        return messages
+
+    async def _send_media_group(
+        self,
+        api_url: str,
+        payload: Dict[str, Any],
+        image_urls: List[str],
+        caption: Optional[str]
+    ) -> List[Dict[str, Any]]:
+        """Один альбом с подстановкой file_id уже загруженных изображений"""
+
+        def with_media(media_refs: Dict[str, str]) -> Dict[str, Any]:
+            media = [{"type": "photo", "media": media_refs.get(url, url)} for url in image_urls]
+            if caption:
+                media[0]["caption"] = caption
+                media[0]["parse_mode"] = "HTML"
+            return {**payload, "media": media}
+
+        if not settings.TELEGRAM_FILE_CACHE_ENABLED:
+            data = await self._send(api_url, with_media({}), messages=len(image_urls))
+            return data.get("result") or []
+
+        cached, owned = await self.file_cache.claim_many(self.bot_token, image_urls)
+        uploaded: Dict[str, Optional[str]] = {}
+        try:
+            try:
+                data = await self._send(api_url, with_media(cached), messages=len(image_urls))
+            except TelegramAPIError as e:
+                if not cached or e.status != 400 or "file" not in e.description.lower():
+                    raise
+                # Какой из file_id отвергнут, неизвестно — загружаем альбом по URL заново
+                for url in cached:
+                    self.file_cache.discard(self.bot_token, url)
+                cached = {}
+                data = await self._send(api_url, with_media({}), messages=len(image_urls))
+            messages = data.get("result") or []
+            for url, message in zip(image_urls, messages):
+                if url in owned:
+                    uploaded[url] = _photo_file_id(message)
+            return messages
+        finally:
+            # Завершаем только свои захваты: URL, повторно загруженные после
+            # отказа file_id, мог уже захватить другой запрос, и его ожидание
+            # нельзя ни завершить, ни сбросить чужим результатом
+            for url in owned:
+                self.file_cache.finish_upload(self.bot_token, url, uploaded.get(url))
+
+    async def _send_photo(self, api_url: str, payload: Dict[str, Any], image_url: str) -> Dict[str, Any]:
+        """sendPhoto по file_id, если изображение уже загружалось этим ботом
+
+        Иначе фото отправляется по URL, а file_id из ответа запоминается.
+        Одновременные отправки одного URL ждут первую загрузку. Отвергнутый
+        Telegram file_id удаляется, и фото отправляется по URL заново.
+        """
+        if not settings.TELEGRAM_FILE_CACHE_ENABLED:
+            return await self._send(api_url, {**payload, "photo": image_url})
+
+        file_id, _ = await self.file_cache.claim(self.bot_token, image_url)
+        if file_id is not None:
+            try:
+                return await self._send(api_url, {**payload, "photo": file_id})
+            except TelegramAPIError as e:
+                if e.status != 400 or "file" not in e.description.lower():
+                    raise
+                self.file_cache.discard(self.bot_token, image_url)
+            file_id, _ = await self.file_cache.claim(self.bot_token, image_url)
+            if file_id is not None:
+                return await self._send(api_url, {**payload, "photo": file_id})
+
+        new_file_id = None
+        try:
+            data = await self._send(api_url, {**payload, "photo": image_url})
+            new_file_id = _photo_file_id(data.get("result"))
+            return data
+        finally:
+            self.file_cache.finish_upload(self.bot_token, image_url, new_file_id)
+    
+    async def _send(self, api_url: str, payload: Dict[str, Any], messages: int = 1) -> Dict[str, Any]:
+        """Запрос к Bot API через общую очередь отправки
+
+        messages — сколько сообщений запрос создаёт в чате (элементы альбома).
+
+        429 повторяется после паузы ровно на retry_after из ответа (не больше
+        TELEGRAM_RATE_LIMIT_MAX_RETRIES раз), сетевые ошибки и 5xx — с
+        нарастающей паузой, остальные 4xx не повторяются. Автомат защиты
+        стоит только вокруг самого HTTP-запроса: ожидание в очереди (минуты
+        при лимите чата) не считается медленным вызовом Telegram.
+        """
+        # Общая сессия: соединение, DNS и TLS переиспользуются между сообщениями
+        session = self.get_session()
+        chat_id = payload["chat_id"]
+        errors = 0
+        rate_limited = 0
+        while True:
+            await self.rate_limiter.acquire(chat_id, messages)
+            try:
+                async with circuit_guard(
+                    "telegram", excluded_exceptions=(TelegramAPIError, TelegramRateLimitError)
+                ):
+                    async with session.post(api_url, json=payload, timeout=20) as resp:
+                        status = resp.status
+                        data = await resp.json()
+                    _raise_for_response(status, data)
+                return data
+            except TelegramRateLimitError as e:
+                rate_limited += 1
+                if rate_limited > settings.TELEGRAM_RATE_LIMIT_MAX_RETRIES:
+                    raise
+                self.rate_limiter.on_rate_limited(chat_id, e.retry_after, messages)
+                continue
+            except (TelegramAPIError, CircuitOpenError):
+                raise
+            except Exception as e:
+                # Сетевые ошибки и 5xx повторяются, 401/403 — нет
+                errors += 1
+                if errors >= settings.TELEGRAM_MAX_RETRIES or (
+                    isinstance(e, TelegramResponseError) and 400 <= e.status < 500
+                ):
+                    raise
+            await asyncio.sleep(1.5 * errors)
+    
     async def get_post_analytics(self, post_id: str) -> Dict[str, Any]:
         """Получение аналитики поста в Telegram"""
         # Заглушка для демонстрации
@@ -320,3 +584,22 @@ class TelegramService(BaseSocialPlatform):
         """Обновление поста в Telegram"""
         # Заглушка для демонстрации
         return True
+
+
+def _photo_file_id(message: Optional[Dict[str, Any]]) -> Optional[str]:
+    """file_id самого большого размера фото из отправленного сообщения"""
+    sizes = (message or {}).get("photo") or []
+    return sizes[-1].get("file_id") if sizes else None
+
+
+def _album_chunks(image_urls: List[str]) -> List[List[str]]:
+    """Деление набора изображений на почти равные альбомы по 2–10 элементов"""
+    parts = -(-len(image_urls) // TELEGRAM_MEDIA_GROUP_MAX)
+    size, extra = divmod(len(image_urls), parts)
+    chunks = []
+    start = 0
+    for index in range(parts):
+        end = start + size + (1 if index < extra else 0)
+        chunks.append(image_urls[start:end])
+        start = end
+    return chunks
@@ -0,0 +1,147 @@
+from typing import Any, Dict, Optional
+import asyncio
+import time
+
+from app.core.rate_limit import TokenBucket
+
+
+# С какого числа чатов начинается очистка простаивающих бакетов
+IDLE_CHATS_SWEEP_MIN = 1024
+
+
+class TelegramRateLimiter:
+    """Очередь отправки в Telegram Bot API
+
+    Перед каждым запросом резервируется токен в общем бакете бота (~30
+    сообщений в секунду) и в бакете чата (каналы и группы — ~20 в минуту).
+    Резервы выдаются по порядку, поэтому ожидающие отправляются в порядке
+    очереди на максимально допустимой скорости. Запас бакетов (burst)
+    по умолчанию минимальный: сервер считает сообщения в скользящем окне,
+    и полный бакет плюс пополнение за ту же секунду превысил бы лимит.
+    После 429 чат ставится на паузу ровно на retry_after из ответа сервера.
+    Альбом (sendMediaGroup) — один запрос к боту, но в чате это отдельное
+    сообщение на каждый элемент, поэтому бакет чата списывает messages.
+    Бакеты простаивающих чатов (полный бакет, нет паузы) удаляются, когда
+    чатов становится вдвое больше, чем после прошлой очистки: новый бакет
+    того же чата будет таким же полным, а память не растёт с числом чатов.
+    """
+
+    def __init__(
+        self,
+        messages_per_second: float,
+        chat_messages_per_minute: float,
+        burst: int = 1,
+        chat_burst: int = 1
+    ):
+        self.messages_per_second = messages_per_second
+        self.chat_messages_per_minute = chat_messages_per_minute
+        self.chat_burst = chat_burst
+        self.bucket = TokenBucket(burst, messages_per_second)
+        self._chats: Dict[str, TokenBucket] = {}
+        self._blocked_until: Dict[str, float] = {}
+        self._sweep_at = IDLE_CHATS_SWEEP_MIN
+
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.total_requests = 0
+        self.delayed_requests = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.rate_limited_responses = 0
+        self.cancelled_requests = 0
+        self.evicted_chats = 0
+
+    def _chat_bucket(self, chat_id: str) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= self._sweep_at:
+                self._evict_idle_chats()
+            bucket = TokenBucket(self.chat_burst, self.chat_messages_per_minute / 60.0)
+            self._chats[chat_id] = bucket
+        return bucket
+
+    def _evict_idle_chats(self):
+        """Удаление бакетов чатов без резервов и паузы"""
+        for chat_id in [chat_id for chat_id in self._blocked_until if self._blocked_for(chat_id) <= 0]:
+            del self._blocked_until[chat_id]
+        idle = [
+            chat_id for chat_id, bucket in self._chats.items()
+            if bucket.available >= bucket.capacity and chat_id not in self._blocked_until
+        ]
+        for chat_id in idle:
+            del self._chats[chat_id]
+        self.evicted_chats += len(idle)
+        self._sweep_at = max(IDLE_CHATS_SWEEP_MIN, 2 * len(self._chats))
+
+    def _blocked_for(self, chat_id: str) -> float:
+        return self._blocked_until.get(chat_id, 0.0) - time.monotonic()
+
+    async def acquire(self, chat_id: Any, messages: int = 1):
+        """Ожидание своей очереди на отправку messages сообщений в чат одним запросом"""
+        chat_id = str(chat_id)
+        self.total_requests += 1
+        delay = max(
+            self.bucket.reserve(1),
+            self._chat_bucket(chat_id).reserve(messages),
+            self._blocked_for(chat_id)
+        )
+        if delay <= 0:
+            return
+
+        self.delayed_requests += 1
+        self.queue_depth += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        started = time.monotonic()
+        try:
+            await asyncio.sleep(delay)
+            # Пока ждали, чат мог получить 429 с более поздним сроком
+            remaining = self._blocked_for(chat_id)
+            if remaining > 0:
+                await asyncio.sleep(remaining)
+        except asyncio.CancelledError:
+            # Сообщение так и не ушло (таймаут платформы, общий срок публикации):
+            # резерв возвращается, чтобы отменённые не задерживали живые отправки
+            self.cancelled_requests += 1
+            self.bucket.refund(1)
+            self._chat_bucket(chat_id).refund(messages)
+            raise
+        finally:
+            self.queue_depth -= 1
+            waited = time.monotonic() - started
+            self.total_wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def on_rate_limited(self, chat_id: Any, retry_after: Optional[float], messages: int = 1):
+        """Обработка 429: пауза чата на retry_after секунд
+
+        Сообщение не доставлено, поэтому его токены возвращаются в бакеты —
+        повтор ждёт только паузу сервера, а не ещё и свой резерв.
+        """
+        chat_id = str(chat_id)
+        self.rate_limited_responses += 1
+        self.bucket.refund(1)
+        self._chat_bucket(chat_id).refund(messages)
+        seconds = float(retry_after) if retry_after is not None else 1.0
+        self._blocked_until[chat_id] = max(
+            self._blocked_until.get(chat_id, 0.0), time.monotonic() + seconds
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """Метрики очереди и ожидания"""
+        return {
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "total_requests": self.total_requests,
+            "delayed_requests": self.delayed_requests,
+            "total_wait_seconds": round(self.total_wait_seconds, 3),
+            "avg_wait_seconds": (
+                round(self.total_wait_seconds / self.delayed_requests, 3)
+                if self.delayed_requests else 0.0
+            ),
+            "max_wait_seconds": round(self.max_wait_seconds, 3),
+            "rate_limited_responses": self.rate_limited_responses,
+            "cancelled_requests": self.cancelled_requests,
+            "chats": len(self._chats),
+            "evicted_chats": self.evicted_chats,
+            "blocked_chats": sum(1 for chat_id in self._blocked_until if self._blocked_for(chat_id) > 0)
+        }
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Нагрузочный тест пайплайна генерации контента без сети
+
+ContentGenerator.generate_content работает на SimulatedBackend: задержки,
+скорость генерации и доля ошибок/429/бракованных постов задаются параметрами ниже или
+настройками SIMULATOR_*. Каждый запрос использует свой продукт, чтобы кэш
+ответов не искажал результат.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import datetime
+from typing import List
+
+from app.models.content import ContentGenerationRequest
+from app.models.product import PlatformType, Product
+from app.services.ai.openai_service import OpenAIService
+from app.services.ai.prompts import PREFIX_CACHE_MIN_TOKENS
+from app.services.ai.simulator import SimulatedBackend
+from app.services.content.generator import ContentGenerator
+
+
+def _product(index: int) -> Product:
+    now = datetime.now()
+    return Product(
+        id=index,
+        name=f"Тестовый продукт {index}",
+        description="Продукт для нагрузочного теста",
+        target_audience="малый бизнес",
+        category="технологии",
+        keywords=["автоматизация", "smm"],
+        platforms=[PlatformType.TELEGRAM],
+        created_at=now,
+        updated_at=now
+    )
+
+
+async def run(args) -> List[float]:
+    backend = SimulatedBackend(
+        latency_distribution=args.distribution,
+        latency_mean=args.latency,
+        latency_sigma=args.sigma,
+        tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        malformed_post_rate=args.malformed_post_rate,
+        prefix_cache_min_tokens=args.prefix_cache_min_tokens,
+        seed=args.seed
+    )
+    service = OpenAIService(backend=backend)
+    generator = ContentGenerator(service)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    failures = 0
+
+    async def one(index: int) -> float:
+        nonlocal failures
+        request = ContentGenerationRequest(
+            product_id=index,
+            post_count=args.posts,
+            platforms=[PlatformType.TELEGRAM],
+            include_images=True
+        )
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await generator.generate_content(_product(index), request)
+            except Exception:
+                failures += 1
+            return time.perf_counter() - started
+
+    samples = await asyncio.gather(*(one(index) for index in range(args.requests)))
+    print(f"LLM-запросов к бэкенду: {backend.requests}, ошибок генерации: {failures}")
+    structured = service.get_stats()["structured"]
+    accepted = structured["posts_accepted"]
+    print(
+        f"постов принято: {accepted}, отбраковано: {structured['posts_rejected']}, "
+        f"догенераций: {structured['post_repair_requests']}, "
+        f"невалидных ответов: {structured['invalid_responses']}, "
+        f"догенераций на принятый пост: "
+        f"{structured['post_repair_requests'] / accepted if accepted else 0:.2f}"
+    )
+    for kind, counters in service.get_stats()["prompt_cache"].items():
+        print(
+            f"кэш префиксов {kind:>18}: запросов {counters['requests']:4d} "
+            f"(от {PREFIX_CACHE_MIN_TOKENS} токенов: {counters['cacheable_requests']:4d}), "
+            f"токенов промпта {counters['prompt_tokens']:7d}, из кэша {counters['cached_tokens']:7d} "
+            f"({counters['cached_ratio']:.1%})"
+        )
+    return samples
+
+
+def _report(samples: List[float], wall: float):
+    samples_ms = sorted(s * 1000 for s in samples)
+    p95 = samples_ms[max(0, int(len(samples_ms) * 0.95) - 1)]
+    print(
+        f"mean={statistics.mean(samples_ms):8.1f}ms "
+        f"p50={statistics.median(samples_ms):8.1f}ms p95={p95:8.1f}ms "
+        f"throughput={len(samples) / wall:6.2f} req/s"
+    )
+
+
+async def main(args):
+    print(
+        f"📍 simulated, запросов: {args.requests}, параллельно: {args.concurrency}, "
+        f"постов: {args.posts}"
+    )
+    started = time.perf_counter()
+    samples = await run(args)
+    _report(samples, time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--posts", type=int, default=3)
+    parser.add_argument("--distribution", default="lognormal",
+                        choices=["lognormal", "normal", "exponential", "constant"])
+    parser.add_argument("--latency", type=float, default=0.8, help="Среднее время до первого токена, с")
+    parser.add_argument("--sigma", type=float, default=0.5)
+    parser.add_argument("--tokens-per-second", type=float, default=80.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-post-rate", type=float, default=0.0,
+                        help="Доля постов, не проходящих проверку")
+    parser.add_argument("--prefix-cache-min-tokens", type=int, default=1024,
+                        help="С какой длины промпта имитируется кэш префиксов")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк накладных расходов на запрос к OpenAI
+
+Сравнивает два режима:
+- before: новый OpenAIService и AsyncOpenAI на каждый запрос (как было раньше)
+- after: общий клиент с пулом keep-alive соединений
+
+По умолчанию запросы идут в локальную заглушку /v1/chat/completions, поэтому
+измеряется только стоимость клиента и соединения (без TLS и без LLM).
+Для реального API укажите --base-url и OPENAI_API_KEY.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List, Optional, Tuple
+
+import openai
+from aiohttp import web
+
+from app.services.ai.openai_service import OpenAIService, create_openai_client
+
+
+async def _fake_completion(request: web.Request) -> web.Response:
+    await request.read()
+    return web.json_response({
+        "id": "chatcmpl-bench",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": "bench",
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": "ok"},
+            "finish_reason": "stop"
+        }],
+        "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}
+    })
+
+
+async def start_stub_server() -> Tuple[web.AppRunner, str]:
+    """Запуск локальной заглушки OpenAI API"""
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", _fake_completion)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/v1"
+
+
+async def run_before(base_url: str, requests: int, concurrency: int) -> List[float]:
+    """Новый клиент на каждый запрос"""
+
+    async def one() -> float:
+        started = time.perf_counter()
+        client = openai.AsyncOpenAI(api_key="bench", base_url=base_url)
+        service = OpenAIService(client)
+        await service.generate_text("ping", use_cache=False)
+        elapsed = time.perf_counter() - started
+        await client.close()
+        return elapsed
+
+    return await _run(one, requests, concurrency)
+
+
+async def run_after(base_url: str, requests: int, concurrency: int) -> List[float]:
+    """Общий клиент с пулом соединений"""
+    client = create_openai_client(base_url=base_url)
+    service = OpenAIService(client)
+
+    async def one() -> float:
+        started = time.perf_counter()
+        await service.generate_text("ping", use_cache=False)
+        return time.perf_counter() - started
+
+    try:
+        return await _run(one, requests, concurrency)
+    finally:
+        await client.close()
+
+
+async def _run(func, requests: int, concurrency: int) -> List[float]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def guarded() -> float:
+        async with semaphore:
+            return await func()
+
+    return await asyncio.gather(*(guarded() for _ in range(requests)))
+
+
+def _report(label: str, samples: List[float], wall: float):
+    samples_ms = sorted(s * 1000 for s in samples)
+    p95 = samples_ms[int(len(samples_ms) * 0.95) - 1]
+    print(
+        f"{label:<8} mean={statistics.mean(samples_ms):7.2f}ms "
+        f"p50={statistics.median(samples_ms):7.2f}ms p95={p95:7.2f}ms "
+        f"throughput={len(samples) / wall:8.1f} req/s"
+    )
+
+
+async def main(base_url: Optional[str], requests: int, concurrency: int):
+    runner = None
+    if base_url is None:
+        runner, base_url = await start_stub_server()
+
+    print(f"📍 {base_url}, запросов: {requests}, параллельно: {concurrency}")
+    try:
+        for label, func in (("before", run_before), ("after", run_after)):
+            started = time.perf_counter()
+            samples = await func(base_url, requests, concurrency)
+            _report(label, samples, time.perf_counter() - started)
+    finally:
+        if runner is not None:
+            await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--base-url", default=None, help="URL API (по умолчанию локальная заглушка)")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.base_url, args.requests, args.concurrency))
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк публикации в Telegram: своя HTTP-сессия на сообщение против общей
+
+Сравнивает два режима:
+- before: TelegramService с новой aiohttp.ClientSession на каждое сообщение (как было раньше)
+- after: общая сессия платформы с пулом keep-alive соединений и кэшем DNS
+
+По умолчанию сообщения уходят в локальную заглушку Bot API
+(/bot<token>/sendMessage), поэтому измеряется только стоимость сессии и
+соединения. Через --connection-setup можно добавить к каждому новому
+соединению задержку, имитирующую TLS-рукопожатие с настоящим API.
+Лимиты Bot API в бенчмарке сняты: измеряется HTTP, а не очередь отправки.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List, Optional, Tuple
+
+import aiohttp
+from aiohttp import web
+
+from app.core.config import settings
+from app.models.content import PostCreate
+from app.services.social.platforms import TelegramService, close_platform_sessions
+from app.services.social.rate_limiter import TelegramRateLimiter
+
+
+# Очередь без ограничений: заглушка не считает лимиты, а ждать 20 сообщений
+# в минуту на чат значило бы мерить лимитер вместо сессии
+UNLIMITED = 10 ** 9
+unlimited_rate_limiter = TelegramRateLimiter(
+    messages_per_second=UNLIMITED,
+    chat_messages_per_minute=UNLIMITED,
+    burst=UNLIMITED,
+    chat_burst=UNLIMITED
+)
+
+
+def _service(session: Optional[aiohttp.ClientSession] = None) -> TelegramService:
+    service = TelegramService(session=session)
+    service.rate_limiter = unlimited_rate_limiter
+    return service
+
+
+def _make_stub(connection_setup: float) -> web.Application:
+    message_ids = iter(range(1, 10 ** 9))
+    seen_transports = set()
+
+    async def send_message(request: web.Request) -> web.Response:
+        await request.read()
+        # Первый запрос на соединении платит за его установку
+        transport = id(request.transport)
+        if connection_setup and transport not in seen_transports:
+            seen_transports.add(transport)
+            await asyncio.sleep(connection_setup)
+        return web.json_response({"ok": True, "result": {"message_id": next(message_ids)}})
+
+    app = web.Application()
+    app.router.add_post("/bot{token}/sendMessage", send_message)
+    return app
+
+
+async def start_stub_server(connection_setup: float) -> Tuple[web.AppRunner, str]:
+    """Запуск локальной заглушки Telegram Bot API"""
+    runner = web.AppRunner(_make_stub(connection_setup))
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+def _post(index: int) -> PostCreate:
+    return PostCreate(product_id=1, text=f"Сообщение {index}", platforms=[])
+
+
+async def run_before(requests: int, concurrency: int) -> List[float]:
+    """Новая сессия на каждое сообщение"""
+
+    async def one(index: int) -> float:
+        started = time.perf_counter()
+        async with aiohttp.ClientSession() as session:
+            await _service(session).publish_post(_post(index))
+        return time.perf_counter() - started
+
+    return await _run(one, requests, concurrency)
+
+
+async def run_after(requests: int, concurrency: int) -> List[float]:
+    """Общая сессия платформы"""
+
+    async def one(index: int) -> float:
+        started = time.perf_counter()
+        await _service().publish_post(_post(index))
+        return time.perf_counter() - started
+
+    try:
+        return await _run(one, requests, concurrency)
+    finally:
+        await close_platform_sessions()
+
+
+async def _run(func, requests: int, concurrency: int) -> List[float]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def guarded(index: int) -> float:
+        async with semaphore:
+            return await func(index)
+
+    return await asyncio.gather(*(guarded(index) for index in range(requests)))
+
+
+def _report(label: str, samples: List[float], wall: float):
+    samples_ms = sorted(s * 1000 for s in samples)
+    p95 = samples_ms[int(len(samples_ms) * 0.95) - 1]
+    print(
+        f"{label:<8} mean={statistics.mean(samples_ms):7.2f}ms "
+        f"p50={statistics.median(samples_ms):7.2f}ms p95={p95:7.2f}ms "
+        f"throughput={len(samples) / wall:8.1f} msg/s"
+    )
+
+
+async def main(requests: int, concurrency: int, connection_setup: float):
+    runner, api_url = await start_stub_server(connection_setup)
+    settings.TELEGRAM_API_URL = api_url
+    settings.TELEGRAM_BOT_TOKEN = "bench"
+    settings.TELEGRAM_CHANNEL_ID = "@bench"
+    settings.TELEGRAM_CTA_SUFFIX = None
+
+    print(f"📍 {api_url}, сообщений: {requests}, параллельно: {concurrency}")
+    try:
+        for label, func in (("before", run_before), ("after", run_after)):
+            started = time.perf_counter()
+            samples = await func(requests, concurrency)
+            _report(label, samples, time.perf_counter() - started)
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--connection-setup", type=float, default=0.0,
+                        help="Задержка на установку каждого нового соединения, с")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.requests, args.concurrency, args.connection_setup))
@@ -0,0 +1,68 @@
+"""
+Общие фикстуры офлайн-тестов
+
+Тесты не ходят в сеть: LLM — SimulatedBackend или заглушки, время в
+ограничителях, кэше и автоматах защиты — поддельные часы.
+"""
+
+import pytest
+
+from app.core import circuit_breaker, rate_limit
+from app.services.ai import cache
+from app.services.ai import rate_limiter as llm_rate_limiter
+from app.services.social import rate_limiter as telegram_rate_limiter
+
+
+class FakeClock:
+    """Часы тестов: время идёт только по advance()"""
+
+    def __init__(self, start: float = 1000.0):
+        self.now = start
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def fake_clock(monkeypatch) -> FakeClock:
+    """Подмена time.monotonic в модулях с таймерами (цикл событий идёт по настоящему времени)"""
+    clock = FakeClock()
+    for module in (rate_limit, circuit_breaker, cache, llm_rate_limiter, telegram_rate_limiter):
+        monkeypatch.setattr(module, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def simulated_service(monkeypatch):
+    """Фабрика OpenAIService на SimulatedBackend без задержек
+
+    У сервиса свои кэш, ограничитель и single-flight, автоматы защиты
+    выключены — тесты не влияют друг на друга через общее состояние.
+    """
+    from app.core.config import settings
+    from app.services.ai.cache import ResponseCache
+    from app.services.ai.openai_service import OpenAIService
+    from app.services.ai.rate_limiter import LLMRateLimiter
+    from app.services.ai.simulator import SimulatedBackend
+    from app.services.ai.singleflight import SingleFlight
+
+    monkeypatch.setattr(settings, "CIRCUIT_BREAKER_ENABLED", False)
+
+    def create(requests_per_minute: int = 6000, tokens_per_minute: int = 1000000, **backend_options):
+        options = {
+            "latency_distribution": "constant",
+            "latency_mean": 0.0,
+            "tokens_per_second": 1000000.0,
+            "seed": 1
+        }
+        options.update(backend_options)
+        service = OpenAIService(backend=SimulatedBackend(**options))
+        service.cache = ResponseCache()
+        service.singleflight = SingleFlight()
+        service.rate_limiter = LLMRateLimiter(requests_per_minute, tokens_per_minute)
+        return service
+
+    return create
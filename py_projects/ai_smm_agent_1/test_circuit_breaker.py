@@ -0,0 +1,159 @@
+"""
+Тесты автомата защиты внешних зависимостей
+"""
+
+import asyncio
+
+import pytest
+
+from app.core import circuit_breaker
+from app.core.circuit_breaker import (
+    CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, get_circuit_breaker
+)
+
+
+class Rejected(Exception):
+    """Ошибка клиента, которая не говорит о состоянии зависимости"""
+
+
+def _breaker(**options) -> CircuitBreaker:
+    defaults = {"window": 4, "min_calls": 4, "open_seconds": 30.0, "slow_call_seconds": 5.0}
+    defaults.update(options)
+    return CircuitBreaker("test", **defaults)
+
+
+async def _call(breaker: CircuitBreaker, error=None, duration: float = 0.0, clock=None, expected: float = 0.0):
+    async with breaker.guard(expected):
+        if clock is not None:
+            clock.advance(duration)
+        if error is not None:
+            raise error
+
+
+def _run(breaker: CircuitBreaker, **options):
+    try:
+        asyncio.run(_call(breaker, **options))
+    except Exception as e:
+        return e
+    return None
+
+
+def test_opens_on_failure_rate_and_rejects(fake_clock):
+    breaker = _breaker()
+    for _ in range(2):
+        _run(breaker)
+    for _ in range(2):
+        _run(breaker, error=Exception("сбой"))
+    assert breaker.state == OPEN
+    assert isinstance(_run(breaker), CircuitOpenError)
+    assert breaker.stats()["rejected_calls"] == 1
+
+
+def test_open_half_open_closed(fake_clock):
+    breaker = _breaker()
+    for _ in range(4):
+        _run(breaker, error=Exception("сбой"))
+    assert breaker.state == OPEN
+
+    fake_clock.advance(30.0)
+    assert _run(breaker) is None
+    assert breaker.state == CLOSED
+    assert breaker.stats()["calls_in_window"] == 0
+
+
+def test_failed_probe_opens_again(fake_clock):
+    breaker = _breaker()
+    for _ in range(4):
+        _run(breaker, error=Exception("сбой"))
+    fake_clock.advance(30.0)
+    _run(breaker, error=Exception("сбой"))
+    assert breaker.state == OPEN
+    assert breaker.times_opened == 2
+    assert isinstance(_run(breaker), CircuitOpenError)
+
+
+def test_half_open_admits_limited_probes(fake_clock):
+    breaker = _breaker(half_open_max_calls=1)
+    for _ in range(4):
+        _run(breaker, error=Exception("сбой"))
+    fake_clock.advance(30.0)
+
+    async def scenario():
+        probe_started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def probe():
+            async with breaker.guard():
+                probe_started.set()
+                await release.wait()
+
+        task = asyncio.create_task(probe())
+        await probe_started.wait()
+        assert breaker.state == HALF_OPEN
+        with pytest.raises(CircuitOpenError):
+            await _call(breaker)
+        release.set()
+        await task
+
+    asyncio.run(scenario())
+    assert breaker.state == CLOSED
+
+
+def test_slow_calls_open_unless_expected(fake_clock):
+    breaker = _breaker()
+    for _ in range(4):
+        _run(breaker, duration=6.0, clock=fake_clock, expected=10.0)
+    assert breaker.state == CLOSED
+    assert breaker.stats()["slow_call_rate"] == 0.0
+
+    for _ in range(4):
+        _run(breaker, duration=6.0, clock=fake_clock)
+    assert breaker.state == OPEN
+
+
+def test_excluded_exceptions_and_cancellation_are_not_counted(fake_clock):
+    breaker = _breaker(excluded_exceptions=(Rejected,))
+    for _ in range(10):
+        _run(breaker, error=Rejected("отказ"))
+
+    async def cancelled():
+        async def hang():
+            async with breaker.guard():
+                await asyncio.sleep(10)
+
+        task = asyncio.create_task(hang())
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancelled())
+    assert breaker.state == CLOSED
+    assert breaker.stats()["calls_in_window"] == 0
+
+
+def test_registry_rejects_conflicting_settings(monkeypatch):
+    monkeypatch.setattr(circuit_breaker, "_breakers", {})
+    breaker = get_circuit_breaker("dependency", 5.0, (Rejected,))
+    assert get_circuit_breaker("dependency", 5.0, (Rejected,)) is breaker
+    with pytest.raises(ValueError):
+        get_circuit_breaker("dependency", 6.0, (Rejected,))
+    with pytest.raises(ValueError):
+        get_circuit_breaker("dependency", 5.0)
+
+
+def test_telegram_client_errors_are_excluded_from_the_breaker():
+    from app.services.social.platforms import (
+        TelegramAPIError, TelegramRateLimitError, TelegramResponseError, _raise_for_response
+    )
+
+    _raise_for_response(200, {"ok": True})
+    with pytest.raises(TelegramRateLimitError) as rate_limited:
+        _raise_for_response(429, {"parameters": {"retry_after": 3}})
+    assert rate_limited.value.retry_after == 3
+    with pytest.raises(TelegramAPIError):
+        _raise_for_response(400, {"description": "Bad Request: message is too long"})
+    for status in (401, 403, 502):
+        with pytest.raises(TelegramResponseError) as error:
+            _raise_for_response(status, {})
+        assert not isinstance(error.value, TelegramAPIError)
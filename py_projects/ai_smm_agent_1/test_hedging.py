@@ -0,0 +1,96 @@
+"""
+Тесты хеджирования медленных запросов
+"""
+
+import asyncio
+
+import pytest
+
+from app.services.ai.hedging import LatencyHistogram, RequestHedger
+
+
+def _warmed_hedger(latency: float = 0.01, **options) -> RequestHedger:
+    hedger = RequestHedger(percentile=0.9, min_samples=5, **options)
+    for _ in range(5):
+        hedger.latencies.record(latency)
+    return hedger
+
+
+def test_percentile_of_window():
+    histogram = LatencyHistogram(window=3)
+    assert histogram.percentile(0.5) is None
+    for value in (5.0, 1.0, 2.0, 3.0):
+        histogram.record(value)
+    assert len(histogram) == 3
+    assert histogram.percentile(0.0) == 1.0
+    assert histogram.percentile(0.99) == 3.0
+
+
+def test_no_hedge_until_enough_samples():
+    hedger = RequestHedger(min_samples=5)
+
+    async def call():
+        await asyncio.sleep(0.01)
+        return "ответ"
+
+    assert hedger.hedge_delay() is None
+    assert asyncio.run(hedger.run(call)) == "ответ"
+    assert hedger.hedges == 0
+    assert len(hedger.latencies) == 1
+
+
+def test_slow_call_is_hedged_and_loser_cancelled():
+    hedger = _warmed_hedger(budget_ratio=1.0)
+    attempts = []
+
+    async def call():
+        attempts.append(asyncio.current_task())
+        # Первая попытка «зависает», дубль отвечает быстро
+        await asyncio.sleep(10 if len(attempts) == 1 else 0.01)
+        return len(attempts)
+
+    result = asyncio.run(hedger.run(call))
+    assert result == 2
+    assert hedger.hedges == 1
+    assert hedger.hedge_wins == 1
+    assert attempts[0].cancelled()
+
+
+def test_budget_limits_hedges():
+    hedger = _warmed_hedger(budget_ratio=0.0)
+
+    async def call():
+        await asyncio.sleep(0.03)
+        return "ответ"
+
+    assert asyncio.run(hedger.run(call)) == "ответ"
+    assert hedger.hedges == 0
+    assert hedger.skipped_by_budget == 1
+
+
+def test_error_is_raised_when_no_attempt_succeeds():
+    hedger = _warmed_hedger(budget_ratio=1.0)
+
+    async def call():
+        await asyncio.sleep(0.02)
+        raise ValueError("сбой")
+
+    with pytest.raises(ValueError):
+        asyncio.run(hedger.run(call))
+
+
+def test_failed_primary_is_rescued_by_hedge():
+    hedger = _warmed_hedger(budget_ratio=1.0)
+    attempts = 0
+
+    async def call():
+        nonlocal attempts
+        attempts += 1
+        if attempts == 1:
+            await asyncio.sleep(0.05)
+            raise ValueError("сбой")
+        await asyncio.sleep(0.01)
+        return "ответ"
+
+    assert asyncio.run(hedger.run(call)) == "ответ"
+    assert hedger.hedge_wins == 1
@@ -0,0 +1,167 @@
+"""
+Тесты постоянного кэша file_id Telegram
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from app.services.social.media_cache import TelegramFileCache
+
+
+BOT = "123:secret"
+URL = "https://example.com/a.png"
+
+
+def read_file(path) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_concurrent_claims_share_one_upload(tmp_path):
+    cache = TelegramFileCache(str(tmp_path / "file_ids.json"), save_delay=0.0)
+
+    async def scenario():
+        file_id, owner = await cache.claim(BOT, URL)
+        assert (file_id, owner) == (None, True)
+        waiters = [asyncio.create_task(cache.claim(BOT, URL)) for _ in range(3)]
+        await asyncio.sleep(0)
+        cache.finish_upload(BOT, URL, "file-1")
+        results = await asyncio.gather(*waiters)
+        await cache.flush()
+        return results
+
+    assert asyncio.run(scenario()) == [("file-1", False)] * 3
+    stats = cache.stats()
+    assert stats["misses"] == 1
+    assert stats["shared_uploads"] == 3
+    assert cache.get(BOT, URL) == "file-1"
+
+
+def test_failed_upload_hands_claim_to_next_waiter(tmp_path):
+    cache = TelegramFileCache(str(tmp_path / "file_ids.json"))
+
+    async def scenario():
+        await cache.claim(BOT, URL)
+        waiter = asyncio.create_task(cache.claim(BOT, URL))
+        await asyncio.sleep(0)
+        cache.finish_upload(BOT, URL, None)
+        return await waiter
+
+    assert asyncio.run(scenario()) == (None, True)
+
+
+def test_file_id_is_per_bot_and_token_secret_is_not_stored(tmp_path):
+    path = tmp_path / "file_ids.json"
+    cache = TelegramFileCache(str(path), save_delay=0.0)
+
+    async def scenario():
+        await cache.claim(BOT, URL)
+        cache.finish_upload(BOT, URL, "file-1")
+        await cache.flush()
+
+    asyncio.run(scenario())
+    assert cache.get("456:other", URL) is None
+    text = path.read_text(encoding="utf-8")
+    assert "secret" not in text
+    assert URL not in text
+    assert list(read_file(path).values()) == ["file-1"]
+
+
+def test_claim_many_releases_owned_claims_on_error(tmp_path):
+    cache = TelegramFileCache(str(tmp_path / "file_ids.json"))
+    urls = [f"https://example.com/{i}.png" for i in range(3)]
+
+    # Медиа захватываются по порядку ключей: чужое — последним
+    busy = max(urls, key=lambda url: cache._key(BOT, url))
+
+    async def scenario():
+        # Одно медиа уже загружается другим запросом — claim_many ждёт его
+        await cache.claim(BOT, busy)
+        task = asyncio.create_task(cache.claim_many(BOT, urls))
+        await asyncio.sleep(0)
+        assert len(cache._uploads) == 3
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # Захваченные claim_many медиа освобождены, чужой захват остался
+        return set(cache._uploads)
+
+    remaining = asyncio.run(scenario())
+    assert remaining == {cache._key(BOT, busy)}
+
+
+def test_claim_many_splits_cached_and_owned(tmp_path):
+    cache = TelegramFileCache(str(tmp_path / "file_ids.json"), save_delay=0.0)
+    urls = ["https://example.com/1.png", "https://example.com/2.png", "https://example.com/1.png"]
+
+    async def scenario():
+        await cache.claim(BOT, urls[0])
+        cache.finish_upload(BOT, urls[0], "file-1")
+        result = await cache.claim_many(BOT, urls)
+        await cache.flush()
+        return result
+
+    cached, owned = asyncio.run(scenario())
+    assert cached == {urls[0]: "file-1"}
+    assert owned == [urls[1]]
+
+
+def test_discard_removes_entry(tmp_path):
+    path = tmp_path / "file_ids.json"
+    cache = TelegramFileCache(str(path), save_delay=0.0)
+
+    async def scenario():
+        await cache.claim(BOT, URL)
+        cache.finish_upload(BOT, URL, "file-1")
+        cache.discard(BOT, URL)
+        cache.discard(BOT, URL)
+        await cache.flush()
+
+    asyncio.run(scenario())
+    assert cache.get(BOT, URL) is None
+    assert cache.stats()["invalidations"] == 1
+    assert read_file(path) == {}
+
+
+def test_oldest_entries_are_evicted_over_max_size(tmp_path):
+    cache = TelegramFileCache(str(tmp_path / "file_ids.json"), max_size=2, save_delay=0.0)
+    urls = [f"https://example.com/{i}.png" for i in range(3)]
+
+    async def scenario():
+        for i, url in enumerate(urls):
+            await cache.claim(BOT, url)
+            cache.finish_upload(BOT, url, f"file-{i}")
+        await cache.flush()
+
+    asyncio.run(scenario())
+    assert cache.stats()["size"] == 2
+    assert cache.get(BOT, urls[0]) is None
+    assert cache.get(BOT, urls[2]) == "file-2"
+
+
+def test_changes_are_batched_into_one_write_and_flushed(tmp_path, monkeypatch):
+    path = tmp_path / "file_ids.json"
+    cache = TelegramFileCache(str(path), save_delay=60.0)
+    writes = []
+    write = cache._write
+    monkeypatch.setattr(cache, "_write", lambda entries: (writes.append(len(entries)), write(entries)))
+
+    async def scenario():
+        for i in range(5):
+            url = f"https://example.com/{i}.png"
+            await cache.claim(BOT, url)
+            cache.finish_upload(BOT, url, f"file-{i}")
+        await asyncio.sleep(0)
+        assert writes == []
+        # flush не ждёт save_delay
+        await cache.flush()
+
+    asyncio.run(scenario())
+    assert writes == [5]
+    assert len(read_file(path)) == 5
+
+    # Новый экземпляр читает сохранённую карту с диска
+    reloaded = TelegramFileCache(str(path))
+    assert reloaded.get(BOT, "https://example.com/4.png") == "file-4"
@@ -0,0 +1,146 @@
+"""
+Тесты упаковки мелких задач в один запрос к LLM
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from app.services.ai.packer import PackedTask, RequestPacker, pack_max_tokens, parse_pack_response
+
+
+def _task(number: int, max_tokens: int = 50) -> PackedTask:
+    return PackedTask(f"промпт {number}", f"задача {number}", max_tokens)
+
+
+class StubLLM:
+    """Заглушка вызовов пакета и одиночных задач"""
+
+    def __init__(self, answer_pack=None, fail_pack: bool = False):
+        self.answer_pack = answer_pack
+        self.fail_pack = fail_pack
+        self.packs = []
+        self.singles = []
+
+    async def run_pack(self, prompt: str, max_tokens: int) -> str:
+        self.packs.append(prompt)
+        if self.fail_pack:
+            raise Exception("сбой пакета")
+        return json.dumps(self.answer_pack(prompt.split("\n")), ensure_ascii=False)
+
+    async def run_single(self, task: PackedTask) -> str:
+        self.singles.append(task.prompt)
+        return f"одиночный ответ на {task.prompt}"
+
+
+def _packer(llm: StubLLM, **options) -> RequestPacker:
+    return RequestPacker(
+        build_prompt=lambda tasks: "\n".join(task.details for task in tasks),
+        run_pack=llm.run_pack,
+        run_single=llm.run_single,
+        **options
+    )
+
+
+def test_parse_pack_response_by_task_number():
+    response = json.dumps({
+        "1": {"hashtags": ["кофе"]},
+        "2": "текст",
+        "3": "",
+        "7": "лишний",
+        "x": "мусор"
+    }, ensure_ascii=False)
+    values = parse_pack_response(response, 3)
+    assert json.loads(values[1]) == {"hashtags": ["кофе"]}
+    assert values[2] == "текст"
+    assert 3 not in values
+    assert 7 not in values
+
+
+def test_pack_answers_are_demultiplexed_to_callers():
+    llm = StubLLM(answer_pack=lambda lines: {str(i + 1): f"ответ: {line}" for i, line in enumerate(lines)})
+
+    async def scenario():
+        packer = _packer(llm, max_wait=0.01)
+        return packer, await asyncio.gather(*(packer.submit(_task(n)) for n in range(1, 4)))
+
+    packer, results = asyncio.run(scenario())
+    assert results == ["ответ: задача 1", "ответ: задача 2", "ответ: задача 3"]
+    assert len(llm.packs) == 1
+    assert llm.singles == []
+    assert packer.stats()["packed_tasks"] == 3
+
+
+def test_missing_answers_fall_back_to_single_calls():
+    llm = StubLLM(answer_pack=lambda lines: {"2": "ответ 2"})
+
+    async def scenario():
+        packer = _packer(llm, max_wait=0.01)
+        return packer, await asyncio.gather(*(packer.submit(_task(n)) for n in range(1, 4)))
+
+    packer, results = asyncio.run(scenario())
+    assert results[1] == "ответ 2"
+    assert results[0] == "одиночный ответ на промпт 1"
+    assert results[2] == "одиночный ответ на промпт 3"
+    assert packer.stats()["fallback_tasks"] == 2
+
+
+def test_failed_pack_falls_back_for_every_task():
+    llm = StubLLM(fail_pack=True)
+
+    async def scenario():
+        packer = _packer(llm, max_wait=0.01)
+        return await asyncio.gather(*(packer.submit(_task(n)) for n in range(1, 3)))
+
+    results = asyncio.run(scenario())
+    assert results == ["одиночный ответ на промпт 1", "одиночный ответ на промпт 2"]
+
+
+def test_single_task_is_not_packed():
+    llm = StubLLM(answer_pack=lambda lines: {})
+
+    async def scenario():
+        return await _packer(llm, max_wait=0.01).submit(_task(1))
+
+    assert asyncio.run(scenario()) == "одиночный ответ на промпт 1"
+    assert llm.packs == []
+
+
+def test_pack_is_flushed_at_max_size():
+    llm = StubLLM(answer_pack=lambda lines: {str(i + 1): line for i, line in enumerate(lines)})
+
+    async def scenario():
+        packer = _packer(llm, max_wait=10.0, max_size=2)
+        return await asyncio.gather(*(packer.submit(_task(n)) for n in range(1, 5)))
+
+    results = asyncio.run(scenario())
+    assert results == ["задача 1", "задача 2", "задача 3", "задача 4"]
+    assert len(llm.packs) == 2
+
+
+def test_pack_is_flushed_before_exceeding_max_tokens():
+    llm = StubLLM(answer_pack=lambda lines: {str(i + 1): line for i, line in enumerate(lines)})
+
+    async def scenario():
+        packer = _packer(llm, max_wait=0.01, max_tokens=pack_max_tokens([_task(1)] * 2))
+        return await asyncio.gather(*(packer.submit(_task(n)) for n in range(1, 5)))
+
+    results = asyncio.run(scenario())
+    assert results == ["задача 1", "задача 2", "задача 3", "задача 4"]
+    assert [prompt.count("\n") + 1 for prompt in llm.packs] == [2, 2]
+
+
+def test_single_task_error_reaches_its_caller():
+    async def run_single(task):
+        raise ValueError("сбой задачи")
+
+    async def run_pack(prompt, max_tokens):
+        return "{}"
+
+    async def scenario():
+        packer = RequestPacker(lambda tasks: "", run_pack, run_single, max_wait=0.01)
+        await packer.submit(_task(1))
+
+    with pytest.raises(ValueError):
+        asyncio.run(scenario())
@@ -0,0 +1,132 @@
+"""
+Тесты токен-бакета и ограничителя RPM/TPM для LLM
+"""
+
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.core.rate_limit import TokenBucket
+from app.services.ai.rate_limiter import LLMRateLimiter, parse_reset_duration
+
+
+def test_bucket_reserve_returns_delay_until_covered(fake_clock):
+    bucket = TokenBucket(capacity=2, refill_per_second=1.0)
+    assert bucket.reserve(1) == 0.0
+    assert bucket.reserve(1) == 0.0
+    assert bucket.reserve(1) == pytest.approx(1.0)
+    # Очередь сохраняется: следующий ждёт и свой токен, и долг предыдущего
+    assert bucket.reserve(1) == pytest.approx(2.0)
+    fake_clock.advance(2.0)
+    assert bucket.available == pytest.approx(0.0)
+
+
+def test_bucket_refund_is_capped_by_capacity(fake_clock):
+    bucket = TokenBucket(capacity=5, refill_per_second=1.0)
+    bucket.reserve(3)
+    bucket.refund(10)
+    assert bucket.available == pytest.approx(5.0)
+    bucket.refund(-2)
+    assert bucket.available == pytest.approx(3.0)
+
+
+def test_bucket_limit_to_only_lowers(fake_clock):
+    bucket = TokenBucket(capacity=10, refill_per_second=1.0)
+    bucket.limit_to(4)
+    assert bucket.available == pytest.approx(4.0)
+    bucket.limit_to(8)
+    assert bucket.available == pytest.approx(4.0)
+
+
+def test_parse_reset_duration():
+    assert parse_reset_duration("1s") == pytest.approx(1.0)
+    assert parse_reset_duration("6m0s") == pytest.approx(360.0)
+    assert parse_reset_duration("20ms") == pytest.approx(0.02)
+    assert parse_reset_duration("2.5") == pytest.approx(2.5)
+    assert parse_reset_duration(None) is None
+    assert parse_reset_duration("скоро") is None
+
+
+def test_cancelled_waiter_returns_reservation(fake_clock):
+    async def scenario():
+        limiter = LLMRateLimiter(requests_per_minute=60, tokens_per_minute=6000)
+        await limiter.acquire(6000)
+        waiter = asyncio.create_task(limiter.acquire(3000))
+        await asyncio.sleep(0)
+        assert limiter.queue_depth == 1
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return limiter
+
+    limiter = asyncio.run(scenario())
+    assert limiter.queue_depth == 0
+    assert limiter.tokens.available == pytest.approx(0.0)
+    assert limiter.requests.available == pytest.approx(59.0)
+
+
+def test_retry_after_wins_over_reset_headers(fake_clock):
+    limiter = LLMRateLimiter(requests_per_minute=60, tokens_per_minute=6000)
+    limiter.on_rate_limited({"retry-after": "1", "x-ratelimit-reset-tokens": "50s"})
+    assert limiter.stats()["blocked_for_seconds"] == pytest.approx(1.0)
+
+    limiter = LLMRateLimiter(requests_per_minute=60, tokens_per_minute=6000)
+    limiter.on_rate_limited({"retry-after-ms": "200", "retry-after": "1"})
+    assert limiter.stats()["blocked_for_seconds"] == pytest.approx(0.2)
+
+
+def test_reset_headers_are_a_fallback_and_the_nearest_wins(fake_clock):
+    limiter = LLMRateLimiter(requests_per_minute=60, tokens_per_minute=6000)
+    limiter.on_rate_limited({"x-ratelimit-reset-requests": "2s", "x-ratelimit-reset-tokens": "50s"})
+    assert limiter.stats()["blocked_for_seconds"] == pytest.approx(2.0)
+
+
+def test_exhausted_quota_is_refilled_by_the_bucket_not_blocked(fake_clock):
+    limiter = LLMRateLimiter(requests_per_minute=60, tokens_per_minute=6000)
+    limiter.update_from_headers({
+        "x-ratelimit-remaining-requests": "0",
+        "x-ratelimit-reset-requests": "60s"
+    })
+    assert limiter.stats()["blocked_for_seconds"] == 0.0
+    assert limiter.requests.reserve(1) == pytest.approx(1.0)
+
+
+def test_reconcile_refunds_unused_estimate(fake_clock):
+    limiter = LLMRateLimiter(requests_per_minute=60, tokens_per_minute=6000)
+    asyncio.run(limiter.acquire(1000))
+    limiter.reconcile(1000, 300)
+    assert limiter.tokens.available == pytest.approx(5700.0)
+    limiter.reconcile(1000, None)
+    assert limiter.tokens.available == pytest.approx(5700.0)
+
+
+def test_failed_call_refunds_its_estimate(fake_clock, simulated_service):
+    service = simulated_service(error_rate=1.0)
+    with pytest.raises(Exception):
+        asyncio.run(service.generate_text("привет", max_tokens=500, use_cache=False))
+    assert service.rate_limiter.tokens.available == pytest.approx(1000000.0)
+
+
+def test_rate_limited_retries_do_not_leak_tokens(fake_clock, simulated_service, monkeypatch):
+    monkeypatch.setattr(settings, "OPENAI_RATE_LIMIT_MAX_RETRIES", 2)
+    service = simulated_service(rate_limit_rate=1.0)
+    with pytest.raises(Exception):
+        asyncio.run(service.generate_text("привет", max_tokens=500, use_cache=False))
+    stats = service.rate_limiter.stats()
+    assert stats["rate_limited_responses"] == 3
+    assert service.rate_limiter.tokens.available == pytest.approx(1000000.0)
+
+
+def test_stream_settles_on_delivered_tokens(fake_clock, simulated_service):
+    service = simulated_service()
+
+    async def scenario():
+        stream = service.stream_text("привет", max_tokens=500)
+        async for _ in stream:
+            break
+        await stream.aclose()
+
+    asyncio.run(scenario())
+    used = 1000000.0 - service.rate_limiter.tokens.available
+    assert 0 < used < 500
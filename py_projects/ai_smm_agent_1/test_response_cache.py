@@ -0,0 +1,49 @@
+"""
+Тесты LRU/TTL-кэша ответов LLM
+"""
+
+from app.services.ai.cache import ResponseCache
+
+
+def test_hit_and_miss_counters(fake_clock):
+    cache = ResponseCache(max_size=4, default_ttl=10.0)
+    assert cache.get("a") is None
+    cache.set("a", "ответ")
+    assert cache.get("a") == "ответ"
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_entry_expires_after_ttl(fake_clock):
+    cache = ResponseCache(max_size=4, default_ttl=10.0)
+    cache.set("a", "ответ")
+    cache.set("b", "короткий", ttl=1.0)
+    fake_clock.advance(1.0)
+    assert cache.get("b") is None
+    assert cache.get("a") == "ответ"
+    fake_clock.advance(9.0)
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_least_recently_used_is_evicted(fake_clock):
+    cache = ResponseCache(max_size=2, default_ttl=10.0)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_zero_ttl_is_not_stored(fake_clock):
+    cache = ResponseCache(max_size=2, default_ttl=10.0)
+    cache.set("a", 1, ttl=0)
+    assert cache.get("a") is None
+
+
+def test_key_depends_on_every_part():
+    assert ResponseCache.make_key("gpt", 0.7, "промпт") == ResponseCache.make_key("gpt", 0.7, "промпт")
+    assert ResponseCache.make_key("gpt", 0.7, "промпт") != ResponseCache.make_key("gpt", 0.8, "промпт")
@@ -0,0 +1,99 @@
+"""
+Тесты объединения одинаковых запросов (single-flight)
+"""
+
+import asyncio
+
+import pytest
+
+from app.services.ai.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "ответ"
+
+    async def scenario():
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.do("k", fetch) for _ in range(5)))
+        return flight, results
+
+    flight, results = asyncio.run(scenario())
+    assert results == ["ответ"] * 5
+    assert calls == 1
+    assert flight.stats()["saved_calls"] == 4
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_error_is_shared_and_not_remembered():
+    attempts = 0
+
+    async def fetch():
+        nonlocal attempts
+        attempts += 1
+        await asyncio.sleep(0)
+        raise ValueError("сбой")
+
+    async def scenario():
+        flight = SingleFlight()
+        first = await asyncio.gather(flight.do("k", fetch), flight.do("k", fetch), return_exceptions=True)
+        with pytest.raises(ValueError):
+            await flight.do("k", fetch)
+        return first
+
+    first = asyncio.run(scenario())
+    assert all(isinstance(error, ValueError) for error in first)
+    assert attempts == 2
+
+
+def test_cancelling_one_waiter_keeps_the_task_for_others():
+    async def fetch():
+        await asyncio.sleep(0.02)
+        return "ответ"
+
+    async def scenario():
+        flight = SingleFlight()
+        first = asyncio.create_task(flight.do("k", fetch))
+        second = asyncio.create_task(flight.do("k", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second, first.cancelled()
+
+    result, cancelled = asyncio.run(scenario())
+    assert result == "ответ"
+    assert cancelled
+
+
+def test_last_waiter_cancel_cancels_the_task_and_next_call_starts_fresh():
+    started = []
+
+    async def fetch():
+        started.append(asyncio.current_task())
+        await asyncio.sleep(10)
+        return "старый"
+
+    async def fresh():
+        return "новый"
+
+    async def scenario():
+        flight = SingleFlight()
+        waiter = asyncio.create_task(flight.do("k", fetch))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        # Отменённая задача ещё не завершилась, но новый вызов её не ждёт
+        result = await flight.do("k", fresh)
+        await asyncio.sleep(0)
+        return flight, result
+
+    flight, result = asyncio.run(scenario())
+    assert result == "новый"
+    assert started[0].cancelled()
+    assert flight.stats()["executed"] == 2
+    assert flight.stats()["in_flight"] == 0
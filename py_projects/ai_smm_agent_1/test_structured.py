@@ -0,0 +1,83 @@
+"""
+Тесты структурированных ответов: разбор по схеме и потоковый разбор массива
+"""
+
+import json
+
+import pytest
+
+from app.services.ai.structured import (
+    HashtagsOutput, JSONArrayStream, PostsOutput, StructuredOutputError, parse_structured
+)
+
+
+POSTS = {
+    "posts": [
+        {"text": "Первый пост: скобки { и [ внутри строки, кавычка \" и слэш \\"},
+        {"text": "Второй пост\n\nс абзацем", "extra": {"nested": [1, 2, {"deep": "}"}]}},
+        {"text": "Третий 🙂"}
+    ]
+}
+RESPONSE = json.dumps(POSTS, ensure_ascii=False)
+
+
+def _feed(chunks):
+    parser = JSONArrayStream("posts")
+    items = []
+    for chunk in chunks:
+        items.extend(parser.feed(chunk))
+    return parser, items
+
+
+def test_stream_yields_items_in_one_chunk():
+    parser, items = _feed([RESPONSE])
+    assert items == POSTS["posts"]
+    assert parser.done
+
+
+@pytest.mark.parametrize("split", range(1, len(RESPONSE)))
+def test_stream_yields_same_items_at_every_split(split):
+    parser, items = _feed([RESPONSE[:split], RESPONSE[split:]])
+    assert items == POSTS["posts"]
+    assert parser.done
+
+
+def test_stream_char_by_char_emits_each_item_when_closed():
+    parser = JSONArrayStream("posts")
+    emitted_at = []
+    for position, char in enumerate(RESPONSE):
+        if parser.feed(char):
+            emitted_at.append(position)
+    assert len(emitted_at) == 3
+    # Объект отдаётся сразу на своей закрывающей скобке, а не в конце ответа
+    assert RESPONSE[emitted_at[0]] == "}"
+    assert emitted_at[-1] == len(RESPONSE) - 3
+
+
+def test_truncated_stream_is_not_done_and_keeps_partial_item():
+    cut = RESPONSE.index("Третий") + 3
+    parser, items = _feed([RESPONSE[:cut]])
+    assert items == POSTS["posts"][:2]
+    assert not parser.done
+
+
+def test_other_arrays_are_ignored():
+    response = json.dumps({"meta": [{"text": "не пост"}], "posts": [{"text": "пост"}]}, ensure_ascii=False)
+    parser, items = _feed([response])
+    assert items == [{"text": "пост"}]
+
+
+def test_parse_structured_accepts_fenced_json():
+    output = parse_structured(f"```json\n{RESPONSE}\n```", PostsOutput)
+    assert [post.text for post in output.posts] == [post["text"] for post in POSTS["posts"]]
+
+
+@pytest.mark.parametrize("text", [
+    "просто текст",
+    '{"posts": [{"text": "обрыв',
+    '["не объект"]',
+    '{"hashtags": "не список"}'
+])
+def test_parse_structured_rejects_invalid_answers(text):
+    with pytest.raises(StructuredOutputError):
+        parse_structured(text, HashtagsOutput)
@@ -0,0 +1,106 @@
+"""
+Тесты отправки каруселей в Telegram: деление на альбомы и file_id
+"""
+
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.services.social.media_cache import TelegramFileCache
+from app.services.social.platforms import (
+    TELEGRAM_MEDIA_GROUP_MAX,
+    TelegramAPIError,
+    TelegramService,
+    _album_chunks
+)
+
+
+BOT = "123:secret"
+
+
+def urls(count: int):
+    return [f"https://example.com/{i}.png" for i in range(count)]
+
+
+@pytest.mark.parametrize("count", range(2, 101))
+def test_album_chunks_are_balanced_and_within_limits(count):
+    chunks = _album_chunks(urls(count))
+    sizes = [len(chunk) for chunk in chunks]
+    assert len(chunks) == -(-count // TELEGRAM_MEDIA_GROUP_MAX)
+    assert all(2 <= size <= TELEGRAM_MEDIA_GROUP_MAX for size in sizes)
+    assert max(sizes) - min(sizes) <= 1
+    # Порядок изображений сохраняется
+    assert [url for chunk in chunks for url in chunk] == urls(count)
+
+
+def test_album_chunks_examples():
+    assert [len(chunk) for chunk in _album_chunks(urls(2))] == [2]
+    assert [len(chunk) for chunk in _album_chunks(urls(10))] == [10]
+    # Не 10 + 1: в альбоме Telegram должно быть хотя бы 2 элемента
+    assert [len(chunk) for chunk in _album_chunks(urls(11))] == [6, 5]
+    assert [len(chunk) for chunk in _album_chunks(urls(91))] == [10] + [9] * 9
+
+
+def make_service(tmp_path, monkeypatch, send):
+    monkeypatch.setattr(settings, "TELEGRAM_FILE_CACHE_ENABLED", True)
+    service = TelegramService(channel_id="@channel")
+    service.bot_token = BOT
+    service.file_cache = TelegramFileCache(str(tmp_path / "file_ids.json"), save_delay=0.0)
+    monkeypatch.setattr(service, "_send", send)
+    return service
+
+
+def sent_messages(media):
+    return {"ok": True, "result": [
+        {"photo": [{"file_id": f"file-{item['media']}"}]} for item in media
+    ]}
+
+
+def test_caption_goes_only_to_first_album(tmp_path, monkeypatch):
+    calls = []
+
+    async def send(api_url, payload, messages=1):
+        calls.append((payload["media"], messages))
+        return sent_messages(payload["media"])
+
+    service = make_service(tmp_path, monkeypatch, send)
+    result = asyncio.run(service._send_album("url", {"chat_id": "@channel"}, urls(23), "подпись"))
+
+    assert len(result) == 23
+    assert [messages for _, messages in calls] == [8, 8, 7]
+    captions = [item.get("caption") for media, _ in calls for item in media]
+    assert captions == ["подпись"] + [None] * 22
+
+
+def test_rejected_file_id_does_not_finish_foreign_claim(tmp_path, monkeypatch):
+    album = urls(2)
+    cached_url, new_url = album
+    calls = []
+
+    async def send(api_url, payload, messages=1):
+        calls.append([item["media"] for item in payload["media"]])
+        if len(calls) == 1:
+            raise TelegramAPIError(400, {"description": "Bad Request: wrong file identifier"})
+        # Пока альбом повторно шёл по URL, отвергнутое медиа захватил другой запрос
+        assert await service.file_cache.claim(BOT, cached_url) == (None, True)
+        return sent_messages(payload["media"])
+
+    service = make_service(tmp_path, monkeypatch, send)
+
+    async def scenario():
+        await service.file_cache.claim(BOT, cached_url)
+        service.file_cache.finish_upload(BOT, cached_url, "stale")
+        messages = await service._send_media_group("url", {"chat_id": "@channel"}, album, None)
+        await service.file_cache.flush()
+        return messages
+
+    assert len(asyncio.run(scenario())) == 2
+    assert calls == [["stale", new_url], album]
+    cache = service.file_cache
+    # Свой захват завершён с file_id из ответа
+    assert cache.get(BOT, new_url) == f"file-{new_url}"
+    # Чужой захват не завершён и не перезаписан результатом альбома
+    assert cache._key(BOT, cached_url) in cache._uploads
+    assert cache.get(BOT, cached_url) is None
+    assert cache.stats()["invalidations"] == 1
@@ -0,0 +1,94 @@
+"""
+Тесты очереди отправки в Telegram: бакеты бота и чатов, 429, очистка
+"""
+
+import asyncio
+
+import pytest
+
+from app.services.social import rate_limiter as telegram_rate_limiter
+from app.services.social.rate_limiter import TelegramRateLimiter
+
+
+def make_limiter() -> TelegramRateLimiter:
+    return TelegramRateLimiter(messages_per_second=30, chat_messages_per_minute=20)
+
+
+def test_second_message_to_chat_waits_for_chat_bucket(fake_clock):
+    limiter = make_limiter()
+    limiter._chat_bucket("1").reserve(1)
+    # 20 сообщений в минуту — следующий токен чата через 3 секунды
+    assert limiter._chat_bucket("1").reserve(1) == pytest.approx(3.0)
+    # Другой чат не ждёт чужой очереди
+    assert limiter._chat_bucket("2").reserve(1) == 0.0
+
+
+def test_cancelled_send_returns_reservation(fake_clock):
+    async def scenario():
+        limiter = make_limiter()
+        await limiter.acquire("1")
+        waiter = asyncio.create_task(limiter.acquire("1"))
+        await asyncio.sleep(0)
+        assert limiter.queue_depth == 1
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return limiter
+
+    limiter = asyncio.run(scenario())
+    stats = limiter.stats()
+    assert stats["queue_depth"] == 0
+    assert stats["cancelled_requests"] == 1
+    # Остался только резерв первого, уже отправленного сообщения
+    assert limiter._chat_bucket("1").available == pytest.approx(0.0)
+    assert limiter.bucket.available == pytest.approx(0.0)
+
+
+def test_rate_limited_pauses_chat_and_refunds_tokens(fake_clock):
+    limiter = make_limiter()
+    asyncio.run(limiter.acquire("1"))
+    limiter.on_rate_limited("1", retry_after=5)
+
+    assert limiter._chat_bucket("1").available == pytest.approx(1.0)
+    assert limiter._blocked_for("1") == pytest.approx(5.0)
+    assert limiter.stats()["blocked_chats"] == 1
+
+    # Более ранний срок не сокращает уже назначенную паузу
+    limiter.on_rate_limited("1", retry_after=1)
+    assert limiter._blocked_for("1") == pytest.approx(5.0)
+
+    fake_clock.advance(5.0)
+    assert limiter.stats()["blocked_chats"] == 0
+
+
+def test_album_charges_chat_per_item_and_bot_once(fake_clock):
+    limiter = TelegramRateLimiter(
+        messages_per_second=30, chat_messages_per_minute=20, burst=10, chat_burst=10
+    )
+    asyncio.run(limiter.acquire("1", messages=4))
+    assert limiter._chat_bucket("1").available == pytest.approx(6.0)
+    assert limiter.bucket.available == pytest.approx(9.0)
+
+    limiter.on_rate_limited("1", retry_after=1, messages=4)
+    assert limiter._chat_bucket("1").available == pytest.approx(10.0)
+    assert limiter.bucket.available == pytest.approx(10.0)
+
+
+def test_idle_chats_are_evicted_but_busy_and_blocked_are_kept(fake_clock, monkeypatch):
+    monkeypatch.setattr(telegram_rate_limiter, "IDLE_CHATS_SWEEP_MIN", 4)
+    limiter = make_limiter()
+    for chat_id in ("idle-1", "idle-2", "busy", "blocked"):
+        limiter._chat_bucket(chat_id)
+    limiter._chat_bucket("busy").reserve(1)
+    limiter.on_rate_limited("blocked", retry_after=30)
+
+    # Пятый чат запускает очистку
+    limiter._chat_bucket("new")
+    assert set(limiter._chats) == {"busy", "blocked", "new"}
+    assert limiter.stats()["evicted_chats"] == 2
+
+    # Истёкшая пауза тоже перестаёт удерживать чат
+    fake_clock.advance(60.0)
+    limiter._evict_idle_chats()
+    assert limiter._chats == {}
+    assert limiter._blocked_until == {}